@@ -1,19 +1,53 @@
 """文档处理智能体 - 简化版本，仅支持本地文件"""
 import asyncio
+import hashlib
+import importlib
+import io
 import os
-from typing import List, Dict, Any, Optional, Union
+import threading
+from typing import List, Dict, Any, Optional, Union, BinaryIO, TYPE_CHECKING
 
 from agentscope.agent import AgentBase
 from agentscope.message import Msg
-from agentscope.model import DashScopeChatModel
-from agentscope.memory import InMemoryMemory
 
-from processors.pdf_processor import PDFProcessor
-from processors.word_processor import WordProcessor
-from processors.text_processor import TextProcessor
-from processors.markdown_processor import MarkdownProcessor
-from processors.image_processor import ImageProcessor
+from utils.async_vector_store import AsyncVectorStore
 from utils.vector_store import VectorStore
+from utils.archive_reader import ArchiveReader, is_archive, member_source
+from utils.checkpoint import IngestJournal
+from utils.dedupe import ChunkDeduplicator
+from utils.file_scanner import FileScanner
+from utils.bounded_memory import BoundedMemory
+from utils.metrics import metrics
+from utils.profiler import OperationProfiler
+
+if TYPE_CHECKING:
+    from agentscope.model import DashScopeChatModel
+    from processors.chunk import ChunkBatch
+
+
+# 处理器类型 -> (模块路径, 类名)，处理器在第一次遇到对应类型的文件时才导入和创建
+PROCESSOR_CLASSES = {
+    'pdf': ('processors.pdf_processor', 'PDFProcessor'),
+    'word': ('processors.word_processor', 'WordProcessor'),
+    'text': ('processors.text_processor', 'TextProcessor'),
+    'markdown': ('processors.markdown_processor', 'MarkdownProcessor'),
+    'image': ('processors.image_processor', 'ImageProcessor')
+}
+
+
+def make_chunk_ids(source: str, texts: List[str]) -> List[str]:
+    """由来源和块内容哈希生成确定性的文档块ID
+
+    重复导入同一文件时内容未变的块ID不变，不需要重新嵌入；同一文件中内容相同的块按出现次序区分。
+    """
+    prefix = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    ids, seen = [], {}
+    for text in texts:
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(f"{prefix}-{digest}" if occurrence == 0 else f"{prefix}-{digest}-{occurrence}")
+    return ids
 
 
 class DocumentAgent(AgentBase):
@@ -22,8 +56,15 @@ class DocumentAgent(AgentBase):
     def __init__(
         self,
         name: str = "DocumentAgent",
-        model: Optional[DashScopeChatModel] = None,
+        model: Optional["DashScopeChatModel"] = None,
         vector_store: Optional[VectorStore] = None,
+        memory: Optional[BoundedMemory] = None,
+        profiler: Optional[OperationProfiler] = None,
+        journal_dir: Optional[str] = None,
+        processor_options: Optional[Dict[str, Any]] = None,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+        async_store: Optional[AsyncVectorStore] = None,
+        archive_options: Optional[Dict[str, Any]] = None,
         **kwargs
     ):
         super().__init__()
@@ -32,20 +73,31 @@ class DocumentAgent(AgentBase):
         # 初始化模型
         self.model = model
         
-        # 初始化记忆
-        self.memory = InMemoryMemory()
+        # 初始化记忆（有界，超出部分本地折叠）
+        self.memory = memory or BoundedMemory()
         
         # 初始化向量存储
         self.vector_store = vector_store or VectorStore()
         
-        # 初始化文档处理器（移除网页处理器）
-        self.processors = {
-            'pdf': PDFProcessor(),
-            'word': WordProcessor(),
-            'text': TextProcessor(),
-            'markdown': MarkdownProcessor(),
-            'image': ImageProcessor()
-        }
+        # 向量存储的异步门面：写入由单个写入线程执行并合并小批量写入；为空时在默认线程池中直接读写
+        self.async_store = async_store
+        
+        # 操作级剖析（默认关闭）
+        self.profiler = profiler or OperationProfiler()
+        
+        # 近重复块检测（为空时不去重）
+        self.deduplicator = deduplicator
+        
+        # 批量导入检查点日志目录，默认放在向量库目录下
+        self.journal_dir = journal_dir or os.path.join(self.vector_store.persist_directory, "ingest_journal")
+        
+        # 文档处理器按需创建（移除网页处理器），processor_options 传给处理器构造函数（chunk_size、chunking 等）
+        self.processor_options = processor_options or {}
+        self.processors = {}
+        self._processors_lock = threading.Lock()
+        
+        # 压缩包读取选项（max_member_bytes、buffer_bytes），传给 ArchiveReader
+        self.archive_options = archive_options or {}
         
         # 支持的文件扩展名
         self.supported_extensions = {
@@ -60,11 +112,36 @@ class DocumentAgent(AgentBase):
             '.jpeg': 'image',
             '.tiff': 'image',
             '.bmp': 'image',
-            '.gif': 'image'
+            '.gif': 'image',
+            '.zip': 'archive',
+            '.tar': 'archive',
+            '.tgz': 'archive',
+            '.tar.gz': 'archive'
         }
     
-    async def process_document_async(self, file_path: str) -> Dict[str, Any]:
-        """异步处理单个文档"""
+    def get_processor(self, processor_type: str):
+        """获取处理器，首次使用时导入并创建"""
+        processor = self.processors.get(processor_type)
+        if processor is None:
+            with self._processors_lock:
+                processor = self.processors.get(processor_type)
+                if processor is None:
+                    module_name, class_name = PROCESSOR_CLASSES[processor_type]
+                    processor_class = getattr(importlib.import_module(module_name), class_name)
+                    processor = processor_class(**self.processor_options)
+                    self.processors[processor_type] = processor
+        return processor
+    
+    def detect_type(self, name: str) -> Optional[str]:
+        """按文件名判断处理器类型，压缩包返回 archive，不支持时返回 None"""
+        if is_archive(name):
+            return "archive"
+        _, ext = os.path.splitext(name.lower())
+        return self.supported_extensions.get(ext)
+    
+    async def process_document_async(self, file_path: str, source: Optional[str] = None,
+                                     journal: Optional[IngestJournal] = None) -> Dict[str, Any]:
+        """异步处理单个文档，source 用于覆盖元数据中记录的来源（如上传的临时文件），journal 用于记录检查点"""
         try:
             # 检查文件是否存在
             if not os.path.exists(file_path):
@@ -73,58 +150,383 @@ class DocumentAgent(AgentBase):
                     "error": f"文件不存在: {file_path}"
                 }
             
-            # 获取文件扩展名
-            _, ext = os.path.splitext(file_path.lower())
+            # 按扩展名选择对应的处理器
+            processor_type = self.detect_type(file_path)
+            if processor_type is None:
+                return self._unsupported_result(file_path)
+            if processor_type == "archive":
+                return await self.process_archive_async(file_path, source=source, journal=journal)
+            processor = self.get_processor(processor_type)
+            labels = {"processor": processor_type}
             
-            if ext not in self.supported_extensions:
-                return {
-                    "success": False,
-                    "error": f"不支持的文件类型: {ext}",
-                    "supported_types": list(self.supported_extensions.keys())
-                }
+            with metrics.span("document_agent.process", labels):
+                loop = asyncio.get_event_loop()
+                if self.async_store is None:
+                    # 异步处理文档（提取、分块和写入在同一个线程池任务中完成）
+                    chunks, sync_stats = await loop.run_in_executor(
+                        None, self._ingest_file, processor, processor_type, file_path, source, journal
+                    )
+                else:
+                    # 提取和分块在默认线程池中执行，向量库读写交给异步门面
+                    chunks = await loop.run_in_executor(
+                        None, self._process_file, processor, processor_type, file_path, source or file_path
+                    )
+                    sync_stats = await self._store_chunks_async(chunks, file_path, journal)
             
-            # 选择对应的处理器
-            processor_type = self.supported_extensions[ext]
-            processor = self.processors[processor_type]
+            return self._document_result(source or file_path, processor_type, chunks, sync_stats)
             
-            # 异步处理文档
-            loop = asyncio.get_event_loop()
-            chunks = await loop.run_in_executor(None, processor.process_file, file_path)
+        except Exception as e:
+            metrics.inc("documents_processed_total", labels={"status": "error"})
+            return {
+                "success": False,
+                "error": str(e),
+                "file_path": file_path
+            }
+    
+    async def process_bytes_async(self, data: bytes, name: str) -> Dict[str, Any]:
+        """异步处理内存中的文档内容（如上传的文件），不写临时文件；name 为文件名，同时作为元数据中的来源"""
+        try:
+            processor_type = self.detect_type(name)
+            if processor_type is None:
+                return self._unsupported_result(name)
+            if processor_type == "archive":
+                return await self.process_archive_async(io.BytesIO(data), source=name)
+            processor = self.get_processor(processor_type)
             
-            # 存储到向量数据库
-            texts = [chunk["content"] for chunk in chunks]
-            metadatas = [chunk["metadata"] for chunk in chunks]
+            with metrics.span("document_agent.process", {"processor": processor_type}):
+                loop = asyncio.get_event_loop()
+                chunks = await loop.run_in_executor(
+                    None, self._process_stream, processor, processor_type, io.BytesIO(data), name
+                )
+                sync_stats = await self._store_chunks_async(chunks)
             
-            await loop.run_in_executor(None, self.vector_store.add_documents, texts, metadatas)
+            return self._document_result(name, processor_type, chunks, sync_stats)
             
+        except Exception as e:
+            metrics.inc("documents_processed_total", labels={"status": "error"})
             return {
-                "success": True,
-                "file_path": file_path,
-                "processor_type": processor_type,
-                "chunks_count": len(chunks),
-                "message": f"成功处理文档 {file_path}，生成 {len(chunks)} 个文本块"
+                "success": False,
+                "error": str(e),
+                "file_path": name
             }
-            
+    
+    async def process_archive_async(self, archive: Union[str, BinaryIO], source: Optional[str] = None,
+                                    journal: Optional[IngestJournal] = None) -> Dict[str, Any]:
+        """异步处理压缩包：成员逐个读出并交给对应的处理器，写入上一个成员的同时解析下一个成员（最多缓冲一个已解析的成员）
+
+        成员的来源记录为 <压缩包>!/<成员路径>，元数据中另有 archive 和 archive_member 字段；重新导入时删除压缩包中已不存在的成员。
+        archive 为流时 source 必须提供（如上传的文件名），这时不记录检查点。
+        """
+        archive_source = source or archive
+        # 检查点按压缩包文件的大小和修改时间判断是否变化
+        journal_path = archive if journal is not None and isinstance(archive, str) else None
+        if journal_path is not None:
+            # 中断时整个压缩包（连同已写入的成员）在下次导入前回滚
+            journal.begin(archive_source)
+        reader = ArchiveReader(
+            archive,
+            name=archive_source,
+            include=lambda name: self.detect_type(name) not in (None, "archive"),
+            **self.archive_options
+        )
+        loop = asyncio.get_event_loop()
+        members = iter(reader)
+        # 成员写入完成后立即并入汇总并释放其文档块，同一时刻最多持有一个正在写入和一个正在解析的成员；
+        # 检查点只需要块数和首尾块ID，不保留全部块ID
+        totals = {"members": 0, "chunks": 0, "added": 0, "deleted": 0, "duplicates": 0}
+        errors, seen = [], set()
+        first_id = last_id = None
+        pending = None
+        
+        try:
+            with metrics.span("document_agent.archive"):
+                while True:
+                    item = await loop.run_in_executor(None, self._next_archive_member, members, archive_source)
+                    if pending is not None:
+                        member_name, processor_type, chunks, sync_stats, error = await pending
+                        pending = None
+                        if error is None:
+                            # 按成员记录处理指标
+                            self._document_result(member_source(archive_source, member_name), processor_type,
+                                                  chunks, sync_stats)
+                            totals["members"] += 1
+                            totals["chunks"] += len(chunks)
+                            totals["added"] += sync_stats["added"]
+                            totals["deleted"] += sync_stats["deleted"]
+                            totals["duplicates"] += sync_stats.get("duplicates", 0)
+                            if chunks.ids:
+                                first_id = first_id or chunks.ids[0]
+                                last_id = chunks.ids[-1]
+                        else:
+                            metrics.inc("documents_processed_total", labels={"status": "error"})
+                            errors.append({"member": member_name, "error": error})
+                        chunks = None
+                    if item is None:
+                        break
+                    seen.add(member_source(archive_source, item[0]))
+                    pending = asyncio.ensure_future(self._store_member_async(item, journal_path, journal))
+                
+                # 压缩包完整读完后删除已不在压缩包中的成员
+                deleted_members = 0
+                if not errors:
+                    for stale in await self._archive_sources_async(archive_source) - seen:
+                        await self.delete_source_async(stale)
+                        deleted_members += 1
         except Exception as e:
+            if pending is not None:
+                await asyncio.gather(pending, return_exceptions=True)
+            metrics.inc("documents_processed_total", labels={"status": "error"})
             return {
                 "success": False,
                 "error": str(e),
-                "file_path": file_path
+                "file_path": archive_source
             }
+        finally:
+            try:
+                members.close()
+            except ValueError:
+                # 被取消时工作线程可能仍在读取成员，生成器由垃圾回收关闭
+                pass
+        
+        if journal is not None and journal_path is not None and not errors:
+            journal.commit_range(archive_source, journal_path, totals["chunks"], first_id, last_id)
+        
+        result = {
+            "success": not errors,
+            "file_path": archive_source,
+            "processor_type": "archive",
+            "chunks_count": totals["chunks"],
+            "chunks_added": totals["added"],
+            "chunks_deleted": totals["deleted"],
+            "chunks_duplicated": totals["duplicates"],
+            "reembed_ratio": totals["added"] / totals["chunks"] if totals["chunks"] else 0.0,
+            "members": totals["members"],
+            "members_deleted": deleted_members,
+            "members_failed": errors,
+            "members_skipped": [{"member": name, "reason": reason} for name, reason in reader.skipped],
+            "message": f"成功处理压缩包 {archive_source}，{totals['members']} 个成员生成 {totals['chunks']} 个文本块（新嵌入 {totals['added']} 个）"
+        }
+        if errors:
+            result["error"] = f"压缩包 {archive_source} 中 {len(errors)} 个成员处理失败: {errors[0]['error']}"
+        return result
+    
+    async def _store_member_async(self, item: tuple, journal_path: Optional[str],
+                                  journal: Optional[IngestJournal]) -> tuple:
+        """写入一个已解析的成员，返回 (成员路径, 处理器类型, 文档块, 同步统计, 错误)"""
+        member_name, processor_type, chunks, error = item
+        if error is not None:
+            return member_name, processor_type, None, None, error
+        try:
+            sync_stats = await self._store_chunks_async(chunks, journal_path, journal)
+        except Exception as e:
+            return member_name, processor_type, chunks, None, str(e)
+        return member_name, processor_type, chunks, sync_stats, None
+    
+    def _next_archive_member(self, members, archive_source: str) -> Optional[tuple]:
+        """在工作线程中读出下一个成员并解析，返回 (成员路径, 处理器类型, 文档块, 错误)，没有更多成员时返回 None"""
+        for member_name, stream in members:
+            processor_type = self.detect_type(member_name)
+            source = member_source(archive_source, member_name)
+            try:
+                chunks = self._process_stream(self.get_processor(processor_type), processor_type, stream, source)
+            except Exception as e:
+                return member_name, processor_type, None, str(e)
+            chunks.extra = dict(chunks.extra or {}, archive=archive_source, archive_member=member_name)
+            return member_name, processor_type, chunks, None
+        return None
+    
+    def archive_sources(self, archive_source: str) -> set:
+        """属于该压缩包的成员来源（向量库元数据中的和去重引用记录中的）
+
+        去重时块的所属来源可能转移给其他文件，块上保留的 archive 字段不再可靠，只保留 <压缩包>!/ 开头的来源。
+        """
+        prefix = member_source(archive_source, "")
+        sources = {source for source in self.vector_store.get_sources({"archive": archive_source})
+                   if source.startswith(prefix)}
+        if self.deduplicator is not None:
+            sources.update(self.deduplicator.sources_with_prefix(prefix))
+        return sources
+    
+    async def _archive_sources_async(self, archive_source: str) -> set:
+        """向量库中属于该压缩包的来源"""
+        if self.async_store is not None:
+            return await self.async_store.read(self.archive_sources, archive_source)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.archive_sources, archive_source)
+    
+    def _document_result(self, display_path: str, processor_type: str, chunks: "ChunkBatch",
+                         sync_stats: Dict[str, Any]) -> Dict[str, Any]:
+        """记录处理成功的指标并组装结果"""
+        metrics.inc("documents_processed_total", labels={"processor": processor_type, "status": "success"})
+        metrics.inc("chunks_written_total", len(chunks), {"processor": processor_type})
+        
+        return {
+            "success": True,
+            "file_path": display_path,
+            "processor_type": processor_type,
+            "chunks_count": len(chunks),
+            "chunks_added": sync_stats["added"],
+            "chunks_deleted": sync_stats["deleted"],
+            "chunks_duplicated": sync_stats.get("duplicates", 0),
+            "reembed_ratio": sync_stats["added"] / len(chunks) if chunks else 0.0,
+            "message": f"成功处理文档 {display_path}，生成 {len(chunks)} 个文本块（新嵌入 {sync_stats['added']} 个）"
+        }
+    
+    def _unsupported_result(self, name: str) -> Dict[str, Any]:
+        _, ext = os.path.splitext(name.lower())
+        return {
+            "success": False,
+            "error": f"不支持的文件类型: {ext}",
+            "supported_types": list(self.supported_extensions.keys())
+        }
+    
+    def _ingest_file(self, processor, processor_type: str, file_path: str, source: Optional[str],
+                     journal: Optional[IngestJournal] = None) -> tuple:
+        """在工作线程中处理文件并增量同步到向量数据库，返回 (文档块, 同步统计)；开启剖析时按文件和处理器类型采集"""
+        source = source or file_path
+        with self.profiler.profile("ingest", {"processor": processor_type, "file": source}):
+            chunks = self._assign_ids(processor.process_file(file_path), source)
+            sync_stats = self._sync_chunks(chunks, file_path, journal)
+        return chunks, sync_stats
+    
+    def _process_file(self, processor, processor_type: str, file_path: str, source: str) -> "ChunkBatch":
+        """在工作线程中处理文件（不写入向量库），开启剖析时按文件和处理器类型采集"""
+        with self.profiler.profile("ingest", {"processor": processor_type, "file": source}):
+            return self._assign_ids(processor.process_file(file_path), source)
+    
+    def _process_stream(self, processor, processor_type: str, stream: BinaryIO, source: str) -> "ChunkBatch":
+        """在工作线程中处理二进制流（不写入向量库），开启剖析时按来源和处理器类型采集"""
+        with self.profiler.profile("ingest", {"processor": processor_type, "file": source}):
+            return self._assign_ids(processor.process_stream(stream, source), source)
+    
+    @staticmethod
+    def _assign_ids(chunks: "ChunkBatch", source: str) -> "ChunkBatch":
+        """设置来源和确定性的文档块ID"""
+        # 存储到向量数据库：批次原样传给向量存储，元数据在写入时按窗口生成
+        chunks.source = source
+        chunks.ids = make_chunk_ids(source, chunks.texts)
+        return chunks
+    
+    def _sync_chunks(self, chunks: "ChunkBatch", file_path: Optional[str] = None,
+                     journal: Optional[IngestJournal] = None) -> Dict[str, Any]:
+        """在工作线程中把文档块增量同步到向量数据库；journal 记录检查点，file_path 为检查点中记录大小和修改时间的文件"""
+        if journal is not None:
+            journal.begin(chunks.source)
+        if self.deduplicator is not None:
+            sync_stats = self._dedupe_sync(chunks)
+        else:
+            sync_stats = self.vector_store.sync_source(chunks)
+        if journal is not None:
+            journal.commit(chunks.source, file_path, chunks.ids)
+        return sync_stats
+    
+    def _dedupe_sync(self, chunks: "ChunkBatch") -> Dict[str, Any]:
+        """去重同步由多次向量库调用组成，整体作为一个写入操作（不跨越索引世代切换，切换时去重状态随集合一起替换）"""
+        with self.vector_store.writing():
+            return self.deduplicator.sync_source(self.vector_store, chunks)
+    
+    async def _store_chunks_async(self, chunks: "ChunkBatch", file_path: Optional[str] = None,
+                                  journal: Optional[IngestJournal] = None) -> Dict[str, Any]:
+        """异步把文档块增量同步到向量数据库：有异步门面时写入交给写入线程（去重同步整体作为一个写操作），否则在默认线程池中执行"""
+        if self.async_store is None:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self._sync_chunks, chunks, file_path, journal)
+        if journal is not None:
+            journal.begin(chunks.source)
+        if self.deduplicator is not None:
+            sync_stats = await self.async_store.write(self._dedupe_sync, chunks)
+        else:
+            sync_stats = await self.async_store.sync_source(chunks)
+        if journal is not None:
+            journal.commit(chunks.source, file_path, chunks.ids)
+        return sync_stats
     
     def process_document(self, file_path: str) -> Dict[str, Any]:
         """同步处理文档的包装方法"""
         return asyncio.run(self.process_document_async(file_path))
     
-    async def batch_process_documents_async(self, file_paths: List[str]) -> List[Dict[str, Any]]:
-        """异步批量处理文档"""
-        tasks = [self.process_document_async(file_path) for file_path in file_paths]
-        results = await asyncio.gather(*tasks)
-        return results
+    def open_journal(self, file_paths: Union[List[str], str]) -> IngestJournal:
+        """打开检查点日志：相同的文件列表对应同一个日志；也可以传入字符串键（如目录导入时使用目录路径）"""
+        material = file_paths if isinstance(file_paths, str) else "\n".join(sorted(file_paths))
+        key = hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.journal_dir, f"{self.vector_store.collection_name}-{key}.jsonl")
+        return IngestJournal(path, collection_id=self.vector_store.get_collection_id()).open()
+    
+    async def rollback_uncommitted(self, journal: IngestJournal) -> int:
+        """回滚上次中断时写入一半的文件，返回回滚的文件数"""
+        sources = journal.uncommitted()
+        for source in sources:
+            await self.delete_source_async(source)
+            journal.rolled_back(source)
+        return len(sources)
+    
+    def delete_source(self, source: str) -> int:
+        """删除来源的文档块；启用去重时只删除不再被其他来源引用的块。压缩包同时删除其所有成员（来源为 <压缩包>!/<成员>）"""
+        sources = [source]
+        if is_archive(source):
+            sources.extend(sorted(self.archive_sources(source)))
+        deleted = 0
+        for target in sources:
+            if self.deduplicator is not None:
+                with self.vector_store.writing():
+                    deleted += self.deduplicator.remove_source(self.vector_store, target)
+            else:
+                deleted += self.vector_store.delete_by_source(target)
+        return deleted
+    
+    async def delete_source_async(self, source: str) -> int:
+        """异步删除来源的文档块（有异步门面时在写入线程中按顺序执行）"""
+        if self.async_store is not None:
+            return await self.async_store.write(self.delete_source, source)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.delete_source, source)
     
-    def batch_process_documents(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+    async def remove_source_async(self, source: str, journal: Optional[IngestJournal] = None) -> int:
+        """删除来源的所有文档块（如源文件已被删除），同时移除检查点记录"""
+        deleted = await self.delete_source_async(source)
+        if journal is not None and source in journal.entries:
+            journal.rolled_back(source)
+        return deleted
+    
+    def skipped_result(self, file_path: str, journal: IngestJournal) -> Dict[str, Any]:
+        """已提交且未变化的文件的处理结果"""
+        return {
+            "success": True,
+            "skipped": True,
+            "file_path": file_path,
+            "chunks_count": journal.entries[file_path]["chunks"],
+            "message": f"文档 {file_path} 已导入且未变化，跳过"
+        }
+    
+    async def batch_process_documents_async(self, file_paths: List[str], resume: bool = True) -> List[Dict[str, Any]]:
+        """异步批量处理文档，resume 为真时使用检查点日志跳过已完成的文件，并回滚中断时写入一半的文件"""
+        if not resume:
+            tasks = [self.process_document_async(file_path) for file_path in file_paths]
+            return await asyncio.gather(*tasks)
+        
+        loop = asyncio.get_event_loop()
+        journal = await loop.run_in_executor(None, self.open_journal, file_paths)
+        try:
+            await self.rollback_uncommitted(journal)
+            
+            return await asyncio.gather(*[self.process_journaled_async(file_path, journal) for file_path in file_paths])
+        finally:
+            journal.close()
+    
+    async def process_journaled_async(self, file_path: str, journal: IngestJournal) -> Dict[str, Any]:
+        """按检查点日志处理单个文件：未变化时跳过，已变化时增量同步（只重新嵌入内容变化的块）"""
+        if journal.is_committed(file_path, file_path):
+            return self.skipped_result(file_path, journal)
+        return await self.process_document_async(file_path, journal=journal)
+    
+    def batch_process_documents(self, file_paths: List[str], resume: bool = True) -> List[Dict[str, Any]]:
         """同步批量处理文档的包装方法"""
-        return asyncio.run(self.batch_process_documents_async(file_paths))
+        return asyncio.run(self.batch_process_documents_async(file_paths, resume))
+    
+    def scan_directory(self, root: str, include: Optional[List[str]] = None,
+                       exclude: Optional[List[str]] = None) -> FileScanner:
+        """创建目录扫描器，只包含支持的文件类型"""
+        return FileScanner(root, self.supported_extensions.keys(), include=include, exclude=exclude)
     
     def get_vector_store_info(self) -> Dict[str, Any]:
         """获取向量存储信息"""
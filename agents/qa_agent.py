@@ -1,15 +1,21 @@
 """问答智能体 - AgentScope 1.0异步版本 + DashScope API"""
 import asyncio
+import json
 import os
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, TYPE_CHECKING
 
 from agentscope.agent import AgentBase
 from agentscope.message import Msg
-from agentscope.model import DashScopeChatModel
-from agentscope.memory import InMemoryMemory
 from agentscope.formatter import DashScopeChatFormatter
 
+from utils.async_vector_store import AsyncVectorStore
 from utils.vector_store import VectorStore
+from utils.bounded_memory import BoundedMemory
+from utils.metrics import metrics
+from utils.profiler import OperationProfiler
+
+if TYPE_CHECKING:
+    from agentscope.model import DashScopeChatModel
 
 
 class QAAgent(AgentBase):
@@ -18,30 +24,45 @@ class QAAgent(AgentBase):
     def __init__(
         self,
         name: str = "QAAgent",
-        model: Optional[DashScopeChatModel] = None,
+        model: Optional["DashScopeChatModel"] = None,
         vector_store: Optional[VectorStore] = None,
+        memory: Optional[BoundedMemory] = None,
+        profiler: Optional[OperationProfiler] = None,
+        async_store: Optional[AsyncVectorStore] = None,
         **kwargs
     ):
         super().__init__()
         self.name = name
 
-        # 初始化模型
-        self.model = DashScopeChatModel(
-            model_name="qwen-max",
-            api_key=os.environ["DASHSCOPE_API_KEY"],
-            stream=False,
-            enable_thinking=False,
-        )
+        # 初始化模型（未传入时使用默认的DashScope模型）
+        if model is None:
+            from agentscope.model import DashScopeChatModel
+            
+            model = DashScopeChatModel(
+                model_name="qwen-max",
+                api_key=os.environ["DASHSCOPE_API_KEY"],
+                stream=False,
+                enable_thinking=False,
+            )
+        self.model = model
         
         # 初始化格式化器
         self.formatter = DashScopeChatFormatter()
         
-        # 初始化记忆
-        self.memory = InMemoryMemory()
+        # 初始化记忆（有界，较早的对话由模型滚动摘要）
+        self.memory = memory or BoundedMemory()
+        if self.memory.summarizer is None:
+            self.memory.summarizer = self.summarize_memory_async
         
         # 初始化向量存储
         self.vector_store = vector_store or VectorStore()
         
+        # 向量存储的异步门面（检索在专用读线程池中执行，带超时）；为空时使用默认线程池
+        self.async_store = async_store
+        
+        # 操作级剖析（默认关闭）
+        self.profiler = profiler or OperationProfiler()
+        
         # 系统提示词
         self.sys_prompt = """你是一个智能文档问答助手。你的任务是基于用户提供的文档内容回答问题。
 
@@ -56,65 +77,92 @@ class QAAgent(AgentBase):
 当前可用的文档内容将在每次问答时提供给你。"""
     
     async def search_relevant_documents_async(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """异步搜索相关文档"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.vector_store.search, query, n_results)
+        """异步搜索相关文档（计时包含线程池排队时间）"""
+        with metrics.span("qa_agent.search"):
+            if self.async_store is not None:
+                return await self.async_store.read(self._search, self.vector_store.search, query, n_results)
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self._search, self.vector_store.search, query, n_results)
+    
+    def _search(self, search, query: str, n_results: int) -> List[Dict[str, Any]]:
+        """在工作线程中执行检索，开启剖析时按查询采集"""
+        with self.profiler.profile("search", {"query": query[:40], "n_results": n_results}):
+            return search(query, n_results)
     
     def search_relevant_documents(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """同步搜索相关文档的包装方法"""
         return asyncio.run(self.search_relevant_documents_async(query, n_results))
     
-    async def generate_answer_async(self, question: str, relevant_docs: List[Dict[str, Any]]) -> str:
-        """异步使用DashScope API基于相关文档生成答案"""
+    async def generate_answer_async(self, question: str, relevant_docs: List[Dict[str, Any]],
+                                    history: Optional[List[Msg]] = None) -> str:
+        """异步使用DashScope API基于相关文档生成答案，history 为会话记忆（早期对话摘要 + 最近的对话原文）"""
         if not relevant_docs:
             return "抱歉，我在文档中没有找到与您问题相关的信息。请确保已经上传了相关文档，或者尝试用不同的方式提问。"
         
-        # 构建上下文
-        context = "基于以下文档内容：\n\n"
-        for i, doc in enumerate(relevant_docs, 1):
-            source = doc["metadata"].get("source", "未知来源")
-            content = doc["content"][:800] + "..." if len(doc["content"]) > 800 else doc["content"]
-            context += f"文档片段 {i} (来源: {source}):\n{content}\n\n"
-        
-        # 构建消息
-        messages = [
-            Msg(name="system", content=self.sys_prompt, role="system"),
-            Msg(name="user", content=f"{context}\n用户问题: {question}\n\n请基于上述文档内容回答用户的问题。如果文档中没有足够的信息来回答问题，请明确说明。", role="user")
-        ]
-        
         try:
-            # 格式化消息
-            formatted_messages = await self.formatter.format(messages)
+            with metrics.span("qa_agent.build_prompt"):
+                # 构建上下文
+                context = "基于以下文档内容：\n\n"
+                for i, doc in enumerate(relevant_docs, 1):
+                    source = doc["metadata"].get("source", "未知来源")
+                    content = doc["content"][:800] + "..." if len(doc["content"]) > 800 else doc["content"]
+                    context += f"文档片段 {i} (来源: {source}):\n{content}\n\n"
+                
+                # 构建消息：系统提示词（附带早期对话摘要）+ 最近的对话 + 本次问题
+                messages = self._history_messages(history)
+                messages.append(
+                    Msg(name="user", content=f"{context}\n用户问题: {question}\n\n请基于上述文档内容回答用户的问题。如果文档中没有足够的信息来回答问题，请明确说明。", role="user")
+                )
+                
+                # 格式化消息
+                formatted_messages = await self.formatter.format(messages)
 
             # 调用模型 (DashScopeChatModel 使用 __call__ 方法)
-            response = await self.model(formatted_messages)
+            with metrics.span("qa_agent.model_call"):
+                response = await self.model(formatted_messages)
 
-            # ChatResponse 是字典类型，尝试不同的键
-            if response:
-                # 尝试常见的响应键
-                if 'text' in response:
-                    return response['text']
-                elif 'content' in response:
-                    return response['content']
-                elif 'message' in response:
-                    return response['message']
-                elif 'choices' in response and response['choices']:
-                    return response['choices'][0]['message']['content']
-                else:
-                    # 如果响应为空，返回所有键用于调试
-                    return f"响应为空或格式未知。可用键: {list(response.keys())}"
-            else:
-                return "模型返回空响应，请检查API密钥和网络连接"
+            return self._parse_response(response)
                 
         except Exception as e:
             return f"调用DashScope API时出现错误: {str(e)}"
     
+    def _history_messages(self, history: Optional[List[Msg]]) -> List[Msg]:
+        """把会话记忆转换为提示消息：摘要并入系统提示词，对话原文按原角色保留"""
+        sys_prompt = self.sys_prompt
+        turns = []
+        for msg in history or []:
+            if msg.role == "system":
+                sys_prompt += f"\n\n{msg.content}"
+            else:
+                turns.append(Msg(name=msg.name, content=msg.content, role=msg.role))
+        return [Msg(name="system", content=sys_prompt, role="system")] + turns
+    
+    @staticmethod
+    def _parse_response(response) -> str:
+        """从模型响应中提取文本"""
+        # ChatResponse 是字典类型，尝试不同的键
+        if response:
+            # 尝试常见的响应键
+            if 'text' in response:
+                return response['text']
+            elif 'content' in response:
+                return response['content']
+            elif 'message' in response:
+                return response['message']
+            elif 'choices' in response and response['choices']:
+                return response['choices'][0]['message']['content']
+            else:
+                # 如果响应为空，返回所有键用于调试
+                return f"响应为空或格式未知。可用键: {list(response.keys())}"
+        else:
+            return "模型返回空响应，请检查API密钥和网络连接"
+    
     def generate_answer(self, question: str, relevant_docs: List[Dict[str, Any]]) -> str:
         """同步生成答案的包装方法"""
         return asyncio.run(self.generate_answer_async(question, relevant_docs))
     
-    async def __call__(self, x: Union[Msg, None] = None) -> Msg:
-        """异步处理问题并回复答案"""
+    async def __call__(self, x: Union[Msg, None] = None, memory: Optional[BoundedMemory] = None) -> Msg:
+        """异步处理问题并回复答案，memory 为空时使用智能体自身的记忆（多会话时传入会话记忆）"""
         if x is None:
             return Msg(
                 name=self.name,
@@ -122,25 +170,31 @@ class QAAgent(AgentBase):
                 role="assistant"
             )
         
-        # 添加到记忆
-        await self.memory.add(x)
+        memory = memory if memory is not None else self.memory
+        
+        # 本次问题之前的对话（摘要 + 最近的原文）作为回答的上下文，再把问题添加到记忆
+        history = await memory.get_memory()
+        await memory.add(x)
         
         question = x.content
         
         # 检查是否是问候或帮助请求
         if any(keyword in question.lower() for keyword in ["你好", "帮助", "help", "功能"]):
+            metrics.inc("questions_total", labels={"kind": "greeting"})
             response_msg = Msg(
                 name=self.name,
                 content="您好！我是智能文档问答助手。我可以基于已上传和处理的文档回答您的问题。请直接提出您想了解的问题，我会在文档中搜索相关信息并为您解答。",
                 role="assistant"
             )
         else:
+            metrics.inc("questions_total", labels={"kind": "retrieval"})
             try:
-                # 异步搜索相关文档,可以在(question，n_results=10)自定义同时处理文件的数量
-                relevant_docs = await self.search_relevant_documents_async(question)
-                
-                # 异步生成答案
-                answer = await self.generate_answer_async(question, relevant_docs)
+                with metrics.span("qa_agent.answer"):
+                    # 异步搜索相关文档,可以在(question，n_results=10)自定义同时处理文件的数量
+                    relevant_docs = await self.search_relevant_documents_async(question)
+                    
+                    # 异步生成答案
+                    answer = await self.generate_answer_async(question, relevant_docs, history)
                 
                 # 添加来源信息
                 if relevant_docs:
@@ -148,6 +202,9 @@ class QAAgent(AgentBase):
                     for doc in relevant_docs:
                         source = doc["metadata"].get("source", "未知来源")
                         sources.add(source)  # 确保 source 是完整的文件路径字符串
+                        # 去重合并的文档块记录了所有包含该内容的来源
+                        if doc["metadata"].get("sources"):
+                            sources.update(json.loads(doc["metadata"]["sources"]))
 
                     source_info = "\n\n📚 参考来源：\n" + "\n".join(f"• {source}" for source in sources)
                     if answer:
@@ -170,7 +227,7 @@ class QAAgent(AgentBase):
                 )
         
         # 添加回复到记忆
-        await self.memory.add(response_msg)
+        await memory.add(response_msg)
         
         return response_msg
     
@@ -213,27 +270,30 @@ class QAAgent(AgentBase):
             # 调用模型 (DashScopeChatModel 使用 __call__ 方法)
             response = await self.model(formatted_messages)
 
-            # ChatResponse 是字典类型，尝试不同的键
-            if response:
-                # 尝试常见的响应键
-                if 'text' in response:
-                    return response['text']
-                elif 'content' in response:
-                    return response['content']
-                elif 'message' in response:
-                    return response['message']
-                elif 'choices' in response and response['choices']:
-                    return response['choices'][0]['message']['content']
-                else:
-                    # 如果响应为空，返回所有键用于调试
-                    return f"响应为空或格式未知。可用键: {list(response.keys())}"
-            else:
-                return "模型返回空响应，请检查API密钥和网络连接"
+            return self._parse_response(response)
 
-                
         except Exception as e:
             return f"生成摘要时出现错误：{str(e)}"
     
     def get_conversation_summary(self, messages: List[Msg]) -> str:
         """同步生成对话摘要的包装方法"""
-        return asyncio.run(self.get_conversation_summary_async(messages))
\ No newline at end of file
+        return asyncio.run(self.get_conversation_summary_async(messages))
+    
+    async def summarize_memory_async(self, previous_summary: str, messages: List[Msg]) -> str:
+        """将较早的对话合并进滚动摘要，供有界记忆在后台调用（失败时抛出异常）"""
+        conversation = "\n".join([f"{msg.name}: {msg.content}" for msg in messages])
+        prompt = f"已有摘要：\n{previous_summary or '无'}\n\n新增对话：\n{conversation}"
+        
+        summary_messages = [
+            Msg(name="system", content="请将新增对话合并进已有摘要，生成一个更新后的简洁摘要，保留主要话题、关键问题和答案、重要结论。请用中文回答，不超过500字。", role="system"),
+            Msg(name="user", content=prompt, role="user")
+        ]
+        
+        formatted_messages = await self.formatter.format(summary_messages)
+        response = await self.model(formatted_messages)
+        if not response:
+            raise RuntimeError("模型返回空响应")
+        summary = self._parse_response(response)
+        if not isinstance(summary, str):
+            summary = str(summary)
+        return summary
\ No newline at end of file
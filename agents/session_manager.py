@@ -0,0 +1,133 @@
+"""多会话管理 - 共享模型和向量存储，按会话隔离对话记忆"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+from agentscope.message import Msg
+
+from agents.qa_agent import QAAgent
+from utils.bounded_memory import BoundedMemory
+
+
+class Session:
+    """单个会话的状态"""
+
+    __slots__ = ("session_id", "memory", "created_at", "last_active", "_lock")
+
+    def __init__(self, session_id: str, memory: BoundedMemory):
+        self.session_id = session_id
+        self.memory = memory
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self._lock = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """会话内的问答串行执行，避免同一会话的记忆交错写入"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+
+class SessionManager:
+    """会话管理类
+
+    所有会话共享同一个 QAAgent（即同一个模型客户端和 VectorStore），
+    每个会话只持有自己的 BoundedMemory。会话保存在按访问顺序排列的 OrderedDict 中，
+    查找、创建和LRU淘汰都是 O(1)；空闲超时的会话在每次访问时从队首顺带清理。
+    """
+
+    def __init__(
+        self,
+        qa_agent: QAAgent,
+        max_sessions: int = 1000,
+        idle_timeout: float = 1800,
+        memory_factory: Optional[Callable[[], BoundedMemory]] = None
+    ):
+        self.qa_agent = qa_agent
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self.memory_factory = memory_factory or BoundedMemory
+
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    @classmethod
+    def from_config(cls, qa_agent: QAAgent, config: Optional[Dict[str, Any]] = None) -> "SessionManager":
+        """根据配置文件创建会话管理器"""
+        config = config or {}
+        session_config = config.get("sessions", {})
+        memory_config = config.get("memory", {})
+        return cls(
+            qa_agent=qa_agent,
+            max_sessions=session_config.get("max_sessions", 1000),
+            idle_timeout=session_config.get("idle_timeout", 1800),
+            memory_factory=lambda: BoundedMemory.from_config(memory_config, qa_agent.summarize_memory_async)
+        )
+
+    def get_session(self, session_id: str) -> Session:
+        """获取会话，不存在时创建"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            else:
+                session = Session(session_id, self.memory_factory())
+                self._sessions[session_id] = session
+            session.last_active = now
+            self._evict_locked(now)
+        return session
+
+    def _evict_locked(self, now: float):
+        """淘汰空闲超时和超出容量的会话（调用方需持有锁）"""
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            idle = now - oldest.last_active
+            if len(self._sessions) > self.max_sessions or (self.idle_timeout and idle > self.idle_timeout):
+                del self._sessions[oldest_id]
+                self._evicted += 1
+            else:
+                break
+
+    def evict_idle(self) -> int:
+        """主动清理空闲会话，返回清理数量"""
+        with self._lock:
+            before = self._evicted
+            self._evict_locked(time.monotonic())
+            return self._evicted - before
+
+    def remove_session(self, session_id: str) -> bool:
+        """删除会话"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def has_session(self, session_id: str) -> bool:
+        """会话是否存在"""
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def ask_async(self, session_id: str, question: str) -> Msg:
+        """在指定会话中提问"""
+        session = self.get_session(session_id)
+        user_msg = Msg(name="user", content=question, role="user")
+        async with session.lock:
+            response = await self.qa_agent(user_msg, memory=session.memory)
+        session.last_active = time.monotonic()
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取会话统计信息"""
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_timeout": self.idle_timeout,
+                "evicted_sessions": self._evicted
+            }
@@ -0,0 +1,149 @@
+"""压缩包导入基准 - 比较先解压到临时目录再按文件处理，和按成员直接以流的形式处理
+
+生成一个包含 N 个文本/Markdown 成员的 .zip（或 .tar.gz），两种模式都只做读取、解析和分块（不写向量库）：
+- extract：解压到临时目录，再对每个文件调用 process_file（原来的上传/压缩包导入方式）；
+- stream：ArchiveReader 逐个读出成员，直接调用 process_stream。
+
+报告耗时、成员吞吐，以及进程写入的字节数（/proc/self/io 的 wchar，其他平台不报告）。
+
+使用方法：
+    python -m benchmarks.bench_archive --members 2000 --member-kb 64 --format zip --output archive.json
+"""
+import argparse
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from typing import Dict, Any, Optional
+
+from benchmarks.common import environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from processors.markdown_processor import MarkdownProcessor
+from processors.text_processor import TextProcessor
+from utils.archive_reader import ArchiveReader
+
+
+def written_bytes() -> Optional[int]:
+    """进程累计传给 write 系统调用的字节数"""
+    try:
+        with open("/proc/self/io", "r") as file:
+            for line in file:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def build_archive(path: str, fmt: str, members: int, member_kb: int, seed: int) -> int:
+    """生成压缩包，返回成员总字节数"""
+    generator = CorpusGenerator(seed=seed)
+    total = 0
+    staging = tempfile.mkdtemp(prefix="docmate_archive_src_")
+    try:
+        names = []
+        for index in range(members):
+            name = f"docs/{index // 100:03d}/doc_{index:06d}.{'md' if index % 2 else 'txt'}"
+            text = []
+            size = 0
+            while size < member_kb * 1024:
+                sentence = generator.sentence()
+                text.append(sentence)
+                size += len(sentence.encode("utf-8")) + 1
+            full_path = os.path.join(staging, name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w", encoding="utf-8") as file:
+                file.write("\n".join(text))
+            total += size
+            names.append(name)
+        if fmt == "zip":
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name in names:
+                    archive.write(os.path.join(staging, name), name)
+        else:
+            with tarfile.open(path, "w:gz") as archive:
+                for name in names:
+                    archive.add(os.path.join(staging, name), name)
+    finally:
+        shutil.rmtree(staging)
+    return total
+
+
+def run_mode(mode: str, archive_path: str, processors: Dict[str, Any]) -> Dict[str, Any]:
+    chunks = 0
+    members = 0
+    before = written_bytes()
+    start = time.perf_counter()
+    if mode == "extract":
+        target = tempfile.mkdtemp(prefix="docmate_archive_extract_")
+        try:
+            if archive_path.endswith(".zip"):
+                with zipfile.ZipFile(archive_path) as archive:
+                    archive.extractall(target)
+            else:
+                with tarfile.open(archive_path, "r:*") as archive:
+                    archive.extractall(target)
+            for root, _, files in os.walk(target):
+                for name in files:
+                    processor = processors[os.path.splitext(name)[1]]
+                    chunks += len(processor.process_file(os.path.join(root, name)))
+                    members += 1
+        finally:
+            shutil.rmtree(target)
+    else:
+        for name, stream in ArchiveReader(archive_path):
+            chunks += len(processors[os.path.splitext(name)[1]].process_stream(stream, name))
+            members += 1
+    elapsed = time.perf_counter() - start
+    after = written_bytes()
+    return {
+        "seconds": elapsed,
+        "members": members,
+        "members_per_s": members / elapsed,
+        "chunks": chunks,
+        "written_bytes": after - before if before is not None and after is not None else None
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    processors = {".txt": TextProcessor(), ".md": MarkdownProcessor()}
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="docmate_archive_") as temp_dir:
+        archive_path = os.path.join(temp_dir, "docs.zip" if args.format == "zip" else "docs.tar.gz")
+        content_bytes = build_archive(archive_path, args.format, args.members, args.member_kb, args.seed)
+        archive_bytes = os.path.getsize(archive_path)
+        for mode in args.modes.split(","):
+            result = run_mode(mode, archive_path, processors)
+            results[mode] = result
+            written = f"{result['written_bytes'] / 1024 / 1024:.1f}MB" if result["written_bytes"] is not None else "未知"
+            print(
+                f"📦 {mode:7s} | {result['seconds']:.2f}s | {result['members_per_s']:.0f} 成员/s"
+                f" | {result['chunks']} 个文本块 | 写入 {written}"
+            )
+
+    return {
+        "benchmark": "archive",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "archive": {"content_bytes": content_bytes, "archive_bytes": archive_bytes},
+        "modes": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="压缩包导入基准（解压到磁盘 vs 按成员流式处理）")
+    parser.add_argument("--modes", default="extract,stream", help="逗号分隔的模式：extract、stream")
+    parser.add_argument("--format", default="zip", choices=["zip", "tar.gz"], help="压缩包格式")
+    parser.add_argument("--members", type=int, default=2000, help="成员数")
+    parser.add_argument("--member-kb", type=int, default=64, help="每个成员的大小（KB）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""异步向量存储基准 - 大量小文件并发导入的同时持续检索，比较默认线程池和异步门面
+
+- default：与原来的 DocumentAgent / QAAgent 一样，解析加同步写入作为一个任务、检索作为另一个任务，
+  都提交到事件循环的默认线程池，检索要排在导入任务后面；
+- async：解析在默认线程池，检索在 AsyncVectorStore 的专用读线程池，写入交给单个写入线程并合并相邻的小批量写入。
+
+解析用 sleep 模拟（PDF解析、OCR等释放GIL的耗时），嵌入使用哈希嵌入。报告检索延迟分位数、导入吞吐、
+Chroma写入调用次数，async 模式还报告每次写入合并的请求数。
+
+使用方法：
+    python -m benchmarks.bench_async_store --rows 20000 --files 400 --ingest-concurrency 16 --output async_store.json
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, Any, List
+
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from processors.chunk import ChunkBatch
+from utils.async_vector_store import AsyncVectorStore
+from utils.embeddings import HashEmbeddingFunction
+from utils.metrics import metrics
+from utils.vector_store import VectorStore
+
+
+def build_store(persist_directory: str, rows: int, seed: int) -> VectorStore:
+    """构造带有 rows 行已有数据的向量库（随机归一化嵌入）"""
+    import numpy as np
+
+    embedding_function = HashEmbeddingFunction()
+    rng = np.random.default_rng(seed)
+    generator = CorpusGenerator(seed=seed)
+    vector_store = VectorStore(persist_directory, "documents", embedding_function, write_batch_size=5000)
+    for offset in range(0, rows, 5000):
+        count = min(5000, rows - offset)
+        embeddings = rng.standard_normal((count, embedding_function.dim)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        vector_store.add_documents(
+            [generator.sentence() for _ in range(count)],
+            [{"source": f"/data/base/file_{(offset + i) % 1000:06d}.txt"} for i in range(count)],
+            ids=[f"base-{offset + i:09d}" for i in range(count)],
+            embeddings=embeddings
+        )
+    return vector_store
+
+
+def make_files(mode: str, count: int, chunks_per_file: int, seed: int) -> List[ChunkBatch]:
+    generator = CorpusGenerator(seed=seed)
+    files = []
+    for index in range(count):
+        chunks = ChunkBatch(f"/data/{mode}/file_{index:06d}.txt", "text",
+                            [generator.sentence() for _ in range(chunks_per_file)])
+        chunks.ids = [f"{mode}-{index:06d}-{position}" for position in range(chunks_per_file)]
+        files.append(chunks)
+    return files
+
+
+async def run_mode(mode: str, vector_store: VectorStore, args, queries: List[str]) -> Dict[str, Any]:
+    files = make_files(mode, args.files, args.chunks_per_file, args.seed + 1)
+    store = AsyncVectorStore(vector_store, read_workers=args.read_workers,
+                             coalesce_max_rows=args.coalesce_max_rows, coalesce_wait_ms=args.coalesce_wait_ms)
+    loop = asyncio.get_running_loop()
+    parse_seconds = args.parse_ms / 1000
+    metrics.reset()
+
+    def parse(chunks: ChunkBatch) -> ChunkBatch:
+        time.sleep(parse_seconds)
+        return chunks
+
+    def parse_and_sync(chunks: ChunkBatch):
+        return vector_store.sync_source(parse(chunks))
+
+    async def ingest_file(chunks: ChunkBatch):
+        if mode == "default":
+            await loop.run_in_executor(None, parse_and_sync, chunks)
+        else:
+            await store.sync_source(await loop.run_in_executor(None, parse, chunks))
+
+    pending = list(reversed(files))
+
+    async def ingest_worker():
+        while pending:
+            await ingest_file(pending.pop())
+
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    async def query_worker(index: int):
+        i = index
+        while not done.is_set():
+            start = time.perf_counter()
+            if mode == "default":
+                await loop.run_in_executor(None, vector_store.search, queries[i % len(queries)], 5)
+            else:
+                await store.search(queries[i % len(queries)], 5)
+            latencies.append((time.perf_counter() - start) * 1000)
+            i += args.query_concurrency
+            await asyncio.sleep(args.think_ms / 1000)
+
+    queriers = [asyncio.ensure_future(query_worker(i)) for i in range(args.query_concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*[ingest_worker() for _ in range(args.ingest_concurrency)])
+    elapsed = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*queriers)
+
+    histograms = metrics.to_dict()["histograms"]
+    result = {
+        "search_latency_ms": percentiles(latencies, (50, 95, 99)),
+        "searches": len(latencies),
+        "files_per_s": args.files / elapsed,
+        "ingest_seconds": elapsed,
+        "chroma_add_calls": sum(item["count"] for item in histograms.get("vector_store.add_seconds", []))
+    }
+    if mode == "async":
+        result["store"] = store.get_stats()
+        result["coalesced_requests_histogram"] = histograms.get("async_vector_store_coalesced_requests", [])
+    store.close()
+    return result
+
+
+def run(args) -> Dict[str, Any]:
+    generator = CorpusGenerator(seed=args.seed + 2)
+    queries = [generator.sentence() for _ in range(200)]
+    metrics.configure({"enabled": True})
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="docmate_async_store_") as temp_dir:
+        vector_store = build_store(os.path.join(temp_dir, "chroma_db"), args.rows, args.seed)
+        for mode in args.modes.split(","):
+            result = asyncio.run(run_mode(mode, vector_store, args, queries))
+            results[mode] = result
+            latency = result["search_latency_ms"]
+            print(
+                f"🗄️ {mode:7s} | 检索 p50 {latency['p50']:.1f}ms p95 {latency['p95']:.1f}ms p99 {latency['p99']:.1f}ms"
+                f" | 导入 {result['files_per_s']:.1f} 文件/s | Chroma写入 {result['chroma_add_calls']} 次"
+            )
+    metrics.configure({"enabled": False})
+
+    return {
+        "benchmark": "async_store",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "modes": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="异步向量存储基准（默认线程池 vs 专用读线程池 + 单写入线程合并写入）")
+    parser.add_argument("--modes", default="default,async", help="逗号分隔的模式：default、async")
+    parser.add_argument("--rows", type=int, default=20000, help="向量库已有行数")
+    parser.add_argument("--files", type=int, default=400, help="导入的文件数")
+    parser.add_argument("--chunks-per-file", type=int, default=4, help="每个文件的文档块数")
+    parser.add_argument("--parse-ms", type=float, default=20, help="模拟每个文件的解析耗时（毫秒）")
+    parser.add_argument("--ingest-concurrency", type=int, default=16, help="并发导入的文件数")
+    parser.add_argument("--query-concurrency", type=int, default=2, help="并发检索数")
+    parser.add_argument("--think-ms", type=float, default=5, help="每个检索协程两次检索之间的间隔（毫秒）")
+    parser.add_argument("--read-workers", type=int, default=4, help="异步门面读线程池大小")
+    parser.add_argument("--coalesce-max-rows", type=int, default=2048, help="合并写入的最大行数")
+    parser.add_argument("--coalesce-wait-ms", type=float, default=10, help="写入线程等待合并的最长时间（毫秒）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""文档块内存基准 - 比较嵌套字典和列式 ChunkBatch 两种表示在百万级文档块导入时的内存占用
+
+两种表示使用同一组块文本，只统计文本之外的开销：
+- dicts：处理器返回 ``[{"content", "metadata": {...}}]``，再拆出 texts / metadatas / ids 三个并行列表（之前的导入路径）；
+- batch：处理器返回 ``ChunkBatch``，只额外生成 ids，元数据在写入时按窗口生成。
+
+每种表示分别测量：准备完成后常驻的内存、准备 + 写入（写入端为空实现，只生成Chroma需要的参数）过程中的峰值，
+以及不开 tracemalloc 时的耗时。
+
+使用方法：
+    python -m benchmarks.bench_chunk_memory --chunks 1000000 --files 100 --output chunk_memory.json
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import List, Dict, Any, Tuple
+
+from agents.document_agent import make_chunk_ids
+from benchmarks.common import environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from processors.chunk import ChunkBatch
+from utils.vector_store import VectorStore
+
+
+class SinkVectorStore(VectorStore):
+    """不计算嵌入、不写入Chroma的向量存储，只接收每个写入窗口的参数"""
+
+    def __init__(self, write_batch_size: int):
+        super().__init__(write_batch_size=write_batch_size)
+        self.written = 0
+
+    def _write(self, texts, metadatas, ids, embeddings, upsert):
+        self.written += len(texts)
+
+
+def make_texts(chunks: int, files: int, chunk_chars: int, seed: int) -> List[Tuple[str, List[str]]]:
+    """生成 (来源, 块文本列表)，每个块都是独立的字符串对象"""
+    generator = CorpusGenerator(seed=seed)
+    pool = "".join(generator.paragraphs(chunk_chars * 64))
+    per_file = chunks // files
+    result = []
+    for f in range(files):
+        source = f"/data/docs/file_{f:05d}.txt"
+        texts = []
+        for i in range(per_file):
+            offset = (f * per_file + i) * 7 % (len(pool) - chunk_chars)
+            texts.append(f"{i:07d}" + pool[offset:offset + chunk_chars - 7])
+        result.append((source, texts))
+    return result
+
+
+def prepare_dicts(source: str, texts: List[str]):
+    """之前的导入路径：处理器输出嵌套字典，DocumentAgent 再拆成三个并行列表"""
+    chunks = [
+        {"content": chunk, "metadata": {"source": source, "type": "text", "chunk_index": i}}
+        for i, chunk in enumerate(texts)
+    ]
+    chunk_texts = [chunk["content"] for chunk in chunks]
+    metadatas = [chunk["metadata"] for chunk in chunks]
+    for metadata in metadatas:
+        metadata["source"] = source
+    ids = make_chunk_ids(source, chunk_texts)
+    return chunks, chunk_texts, metadatas, ids
+
+
+def prepare_batch(source: str, texts: List[str]) -> ChunkBatch:
+    # 处理器返回的分块列表直接成为批次的文本列
+    chunks = ChunkBatch(source, "text", texts)
+    chunks.ids = make_chunk_ids(source, chunks.texts)
+    return chunks
+
+
+def write_dicts(store: SinkVectorStore, prepared):
+    _, chunk_texts, metadatas, ids = prepared
+    store.add_documents(chunk_texts, metadatas, ids=ids, upsert=True)
+
+
+def write_batch(store: SinkVectorStore, chunks: ChunkBatch):
+    store.add_chunks(chunks)
+
+
+MODES = {
+    "dicts": (prepare_dicts, write_dicts),
+    "batch": (prepare_batch, write_batch)
+}
+
+
+def run_mode(mode: str, corpus, write_batch_size: int, trace: bool) -> Dict[str, Any]:
+    """准备所有文件的块（全部常驻，相当于一个百万块的导入批次），再逐个写入"""
+    prepare, write = MODES[mode]
+    store = SinkVectorStore(write_batch_size)
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    prepared = [prepare(source, texts) for source, texts in corpus]
+    prepared_at = time.perf_counter()
+    retained = tracemalloc.get_traced_memory()[0] if trace else 0
+    for item in prepared:
+        write(store, item)
+    written_at = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    chunks = store.written
+    del prepared
+    gc.collect()
+    return {
+        "chunks": chunks,
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "bytes_per_chunk": retained / chunks if chunks else 0.0,
+        "prepare_seconds": prepared_at - start,
+        "write_seconds": written_at - prepared_at
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    corpus = make_texts(args.chunks, args.files, args.chunk_chars, args.seed)
+    text_bytes = sum(len(text) for _, texts in corpus for text in texts)
+    results = {}
+    for mode in args.modes.split(","):
+        memory = run_mode(mode, corpus, args.write_batch_size, trace=True)
+        timing = run_mode(mode, corpus, args.write_batch_size, trace=False)
+        memory["prepare_seconds"] = timing["prepare_seconds"]
+        memory["write_seconds"] = timing["write_seconds"]
+        results[mode] = memory
+        print(
+            f"🧮 {mode:6s} | 常驻 {memory['retained_bytes'] / 2 ** 20:8.1f} MB（{memory['bytes_per_chunk']:.0f} B/块）"
+            f" | 峰值 {memory['peak_bytes'] / 2 ** 20:8.1f} MB"
+            f" | 准备 {memory['prepare_seconds']:.2f}s 写入 {memory['write_seconds']:.2f}s"
+        )
+
+    return {
+        "benchmark": "chunk_memory",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "text_chars": text_bytes,
+        "modes": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文档块内存基准（嵌套字典 vs 列式批次）")
+    parser.add_argument("--chunks", type=int, default=1000000, help="文档块总数")
+    parser.add_argument("--files", type=int, default=100, help="文件数（来源字符串按文件共享）")
+    parser.add_argument("--chunk-chars", type=int, default=100, help="每个块的字符数")
+    parser.add_argument("--write-batch-size", type=int, default=512, help="向量存储每次写入的块数")
+    parser.add_argument("--modes", default="dicts,batch", help="逗号分隔的表示方式")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
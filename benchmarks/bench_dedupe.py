@@ -0,0 +1,164 @@
+"""近重复去重基准 - 在包含大量模板变体的合成语料上比较去重前后的索引大小和导入吞吐
+
+语料由若干"模板"文档和它们的变体组成（变体只改动少量句子，模拟同一政策/模板的不同版本）。
+
+使用方法：
+    python -m benchmarks.bench_dedupe --templates 10 --variants 20 --size-kb 16 --output dedupe.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List, Dict, Any
+
+from agents.document_agent import DocumentAgent, make_chunk_ids
+from benchmarks.common import environment_info, write_results
+from benchmarks.corpus import CorpusGenerator, write_txt
+from utils.dedupe import ChunkDeduplicator
+from processors.text_processor import TextProcessor
+from utils.embeddings import HashEmbeddingFunction
+from utils.vector_store import VectorStore
+
+
+def generate_variants(output_dir: str, templates: int, variants: int, size_kb: int,
+                      edit_ratio: float, seed: int) -> List[str]:
+    """生成模板及其变体文件，每个变体随机改写 edit_ratio 比例的段落"""
+    os.makedirs(output_dir, exist_ok=True)
+    generator = CorpusGenerator(seed=seed)
+    rng = random.Random(seed)
+    paths = []
+    for t in range(templates):
+        base = generator.paragraphs(size_kb * 512)
+        for v in range(variants):
+            paragraphs = list(base)
+            for _ in range(max(1, int(len(paragraphs) * edit_ratio))):
+                position = rng.randrange(len(paragraphs))
+                paragraphs[position] = generator.paragraph()
+            # 模拟版本号、日期等字段不同
+            paragraphs.insert(0, f"版本 V{v}.{rng.randint(0, 9)} 生效日期 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+            path = os.path.join(output_dir, f"template_{t:03d}_v{v:03d}.txt")
+            write_txt(path, paragraphs)
+            paths.append(path)
+    return paths
+
+
+def ingest(paths: List[str], temp_dir: str, name: str, dedupe: bool, args) -> Dict[str, Any]:
+    vector_store = VectorStore(
+        persist_directory=os.path.join(temp_dir, name),
+        collection_name=name,
+        embedding_function=HashEmbeddingFunction(dim=args.dim)
+    )
+    deduplicator = None
+    if dedupe:
+        deduplicator = ChunkDeduplicator.for_vector_store(vector_store, {"threshold": args.threshold})
+    agent = DocumentAgent(
+        model=None,
+        vector_store=vector_store,
+        processor_options={"chunk_size": args.chunk_size, "chunking": args.chunking},
+        deduplicator=deduplicator
+    )
+
+    start = time.perf_counter()
+    results = agent.batch_process_documents(paths, resume=False)
+    elapsed = time.perf_counter() - start
+    failed = [result for result in results if not result["success"]]
+    if failed:
+        raise RuntimeError(failed[0]["error"])
+
+    chunks = sum(result["chunks_count"] for result in results)
+    stored = vector_store.collection.count()
+    report = {
+        "files": len(paths),
+        "chunks": chunks,
+        "stored_chunks": stored,
+        "duplicates": sum(result.get("chunks_duplicated", 0) for result in results),
+        "ingest_seconds": elapsed,
+        "files_per_s": len(paths) / elapsed if elapsed else 0.0
+    }
+    if dedupe:
+        report["index_db_bytes"] = os.path.getsize(deduplicator.db_path)
+        deduplicator.close()
+    return report
+
+
+class NullVectorStore:
+    """不做任何写入的向量存储，用于单独测量去重本身（签名 + LSH查找 + 引用表）的吞吐"""
+
+    def add_chunks(self, *args, **kwargs):
+        pass
+
+    def update_metadatas(self, ids, metadatas):
+        pass
+
+    def delete_ids(self, ids):
+        pass
+
+    def refresh_doc_vectors(self, sources):
+        pass
+
+
+def measure_throughput(paths: List[str], temp_dir: str, args) -> Dict[str, Any]:
+    """单线程顺序去重所有文件的块，返回块/秒"""
+    processor = TextProcessor(chunk_size=args.chunk_size, chunking=args.chunking)
+    files = []
+    for path in paths:
+        chunks = processor.process_file(path)
+        chunks.ids = make_chunk_ids(path, chunks.texts)
+        files.append(chunks)
+
+    deduplicator = ChunkDeduplicator(os.path.join(temp_dir, "throughput.sqlite3"), threshold=args.threshold)
+    store = NullVectorStore()
+    total = sum(len(chunks) for chunks in files)
+    start = time.perf_counter()
+    for chunks in files:
+        deduplicator.sync_source(store, chunks)
+    elapsed = time.perf_counter() - start
+    deduplicator.close()
+    return {"chunks": total, "seconds": elapsed, "chunks_per_s": total / elapsed if elapsed else 0.0}
+
+
+def run(args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="docmate_dedupe_") as temp_dir:
+        paths = generate_variants(os.path.join(temp_dir, "corpus"), args.templates, args.variants,
+                                  args.size_kb, args.edit_ratio, args.seed)
+        baseline = ingest(paths, temp_dir, "dedupe_off", False, args)
+        deduped = ingest(paths, temp_dir, "dedupe_on", True, args)
+        throughput = measure_throughput(paths, temp_dir, args)
+
+    reduction = 1 - deduped["stored_chunks"] / baseline["stored_chunks"] if baseline["stored_chunks"] else 0.0
+    print(
+        f"🧹 存储块数 {baseline['stored_chunks']} -> {deduped['stored_chunks']}（减少 {reduction:.1%}），"
+        f"去重吞吐 {throughput['chunks_per_s']:.0f} 块/s，"
+        f"导入 {baseline['files_per_s']:.1f} -> {deduped['files_per_s']:.1f} 文件/s"
+    )
+    return {
+        "benchmark": "dedupe",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "baseline": baseline,
+        "dedupe": deduped,
+        "dedupe_throughput": throughput,
+        "index_size_reduction": reduction
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="近重复去重基准")
+    parser.add_argument("--templates", type=int, default=10, help="模板数量")
+    parser.add_argument("--variants", type=int, default=20, help="每个模板的变体数量")
+    parser.add_argument("--size-kb", type=int, default=16, help="模板的大致大小（KB）")
+    parser.add_argument("--edit-ratio", type=float, default=0.05, help="每个变体改写的段落比例")
+    parser.add_argument("--threshold", type=float, default=0.85, help="近重复判定阈值")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="分块大小")
+    parser.add_argument("--chunking", default="content", help="分块方式：fixed / content")
+    parser.add_argument("--dim", type=int, default=256, help="哈希嵌入维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""嵌入服务基准 - 并发查询和批量导入同时进行时，比较调用线程内联计算嵌入和嵌入服务动态批处理
+
+嵌入函数为模拟模型：哈希嵌入加上每次调用的固定开销和每条文本的开销（sleep，释放GIL），
+同一时刻只执行一次推理，模拟推理占满CPU时调用之间相互竞争。离线环境下无法下载Chroma默认模型，
+固定开销和单条开销可以按实际模型的测量值设置。
+
+负载：若干查询线程连续发起单条文本的查询嵌入，同时若干导入线程连续嵌入 write_batch_size 条文本的窗口。
+报告查询延迟分位数、查询吞吐、导入吞吐，嵌入服务模式还报告批大小和排队时间直方图。
+
+使用方法：
+    python -m benchmarks.bench_embedding_service --query-threads 16 --bulk-threads 1 --duration 10 --output embedding_service.json
+"""
+import argparse
+import threading
+import time
+from typing import Dict, Any, List
+
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from utils.embedding_service import EmbeddingService, INTERACTIVE, BULK
+from utils.embeddings import HashEmbeddingFunction
+from utils.metrics import metrics
+
+
+class SimulatedModelEmbedding:
+    """模拟嵌入模型：每次调用 call_ms + 每条文本 per_text_ms，推理串行执行"""
+
+    def __init__(self, dim: int, call_ms: float, per_text_ms: float):
+        self.inner = HashEmbeddingFunction(dim=dim)
+        self.call_seconds = call_ms / 1000
+        self.per_text_seconds = per_text_ms / 1000
+        self.calls = 0
+        self._device = threading.Lock()
+
+    def __call__(self, input: List[str]) -> list:
+        with self._device:
+            self.calls += 1
+            time.sleep(self.call_seconds + self.per_text_seconds * len(input))
+            return self.inner(input)
+
+
+def run_mode(mode: str, args, queries: List[str], documents: List[str]) -> Dict[str, Any]:
+    model = SimulatedModelEmbedding(args.dim, args.call_ms, args.per_text_ms)
+    service = None
+    if mode == "service":
+        service = EmbeddingService(model, max_batch_size=args.max_batch_size,
+                                   interactive_wait_ms=args.interactive_wait_ms, bulk_wait_ms=args.bulk_wait_ms)
+        embed = service.embed
+    else:
+        embed = lambda texts, priority: model(texts)
+    metrics.reset()
+
+    stop = threading.Event()
+    latencies: List[float] = []
+    bulk_texts = [0]
+    lock = threading.Lock()
+
+    def query_worker(index: int):
+        i = index
+        while not stop.is_set():
+            start = time.perf_counter()
+            embed([queries[i % len(queries)]], INTERACTIVE)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+            i += args.query_threads
+            if args.think_ms:
+                time.sleep(args.think_ms / 1000)
+
+    def bulk_worker(index: int):
+        offset = index * args.write_batch_size
+        while not stop.is_set():
+            window = [documents[(offset + j) % len(documents)] for j in range(args.write_batch_size)]
+            embed(window, BULK)
+            with lock:
+                bulk_texts[0] += len(window)
+            offset += args.write_batch_size * args.bulk_threads
+
+    threads = [threading.Thread(target=query_worker, args=(i,)) for i in range(args.query_threads)]
+    threads += [threading.Thread(target=bulk_worker, args=(i,)) for i in range(args.bulk_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "query_latency_ms": percentiles(latencies, (50, 95, 99)),
+        "queries_per_s": len(latencies) / elapsed,
+        "bulk_texts_per_s": bulk_texts[0] / elapsed,
+        "model_calls": model.calls
+    }
+    if service is not None:
+        service.close()
+        histograms = metrics.to_dict()["histograms"]
+        result["service"] = service.get_stats()
+        result["batch_size_histogram"] = histograms.get("embedding_service_batch_size", [])
+        result["queue_seconds_histogram"] = histograms.get("embedding_service_queue_seconds", [])
+    return result
+
+
+def run(args) -> Dict[str, Any]:
+    generator = CorpusGenerator(seed=args.seed)
+    queries = [generator.sentence() for _ in range(500)]
+    documents = [generator.sentence() for _ in range(5000)]
+    metrics.configure({"enabled": True})
+
+    results = {}
+    for mode in args.modes.split(","):
+        result = run_mode(mode, args, queries, documents)
+        results[mode] = result
+        latency = result["query_latency_ms"]
+        batch_text = f" | 平均批大小 {result['service']['mean_batch_size']:.1f}" if "service" in result else ""
+        print(
+            f"⚡ {mode:7s} | 查询 p50 {latency['p50']:.1f}ms p95 {latency['p95']:.1f}ms p99 {latency['p99']:.1f}ms"
+            f" | {result['queries_per_s']:.0f} 查询/s | 导入 {result['bulk_texts_per_s']:.0f} 条/s"
+            f" | 模型调用 {result['model_calls']}{batch_text}"
+        )
+    metrics.configure({"enabled": False})
+
+    return {
+        "benchmark": "embedding_service",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "modes": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入服务基准（内联计算 vs 动态批处理）")
+    parser.add_argument("--modes", default="inline,service", help="逗号分隔的模式：inline、service")
+    parser.add_argument("--query-threads", type=int, default=16, help="并发查询线程数")
+    parser.add_argument("--think-ms", type=float, default=0, help="每个查询线程两次查询之间的间隔（毫秒）")
+    parser.add_argument("--bulk-threads", type=int, default=1, help="并发导入线程数")
+    parser.add_argument("--write-batch-size", type=int, default=512, help="每个导入窗口的文本数")
+    parser.add_argument("--duration", type=float, default=10, help="每种模式的运行时长（秒）")
+    parser.add_argument("--call-ms", type=float, default=4, help="模拟模型每次调用的固定开销（毫秒）")
+    parser.add_argument("--per-text-ms", type=float, default=0.25, help="模拟模型每条文本的开销（毫秒）")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="嵌入服务每批最多文本数")
+    parser.add_argument("--interactive-wait-ms", type=float, default=2, help="查询凑批的最长等待（毫秒）")
+    parser.add_argument("--bulk-wait-ms", type=float, default=20, help="导入凑批的最长等待（毫秒）")
+    parser.add_argument("--dim", type=int, default=256, help="哈希嵌入维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
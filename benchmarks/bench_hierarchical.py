@@ -0,0 +1,157 @@
+"""两阶段检索基准 - 随语料规模增长比较直接检索全部文档块和"文档级粗检索 + 块级细检索"的延迟与召回率
+
+语料按主题生成：每个文档属于一个主题（同主题的文档互为干扰项），块文本混合主题词、文档专有词和通用词；
+查询从随机文档的随机块中抽取若干词。召回率以直接检索（flat）的 top-k 结果为基准，
+同时报告查询来源块的命中率。文档按规模递增分批导入同一个集合，文档级索引在导入同步时维护。
+
+使用方法：
+    python -m benchmarks.bench_hierarchical --sizes 500,2000,8000 --top-documents 10,50 --output hierarchical.json
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from typing import List, Dict, Any, Tuple
+
+from agents.document_agent import make_chunk_ids
+from benchmarks.common import percentiles, environment_info, write_results
+from processors.chunk import ChunkBatch
+from utils.embeddings import HashEmbeddingFunction
+from utils.vector_store import VectorStore
+
+
+class TopicCorpus:
+    """按主题生成文档块文本"""
+
+    def __init__(self, seed: int, topics: int, words_per_chunk: int = 40):
+        self.rng = random.Random(seed)
+        self.words_per_chunk = words_per_chunk
+        self.common = [self._word() for _ in range(2000)]
+        self.topics = [[self._word() for _ in range(60)] for _ in range(topics)]
+
+    def _word(self) -> str:
+        return "".join(self.rng.choice(string.ascii_lowercase) for _ in range(self.rng.randint(4, 8)))
+
+    def document(self, index: int, chunks: int) -> List[str]:
+        topic = self.topics[index % len(self.topics)]
+        own = [self._word() for _ in range(30)]
+        texts = []
+        for _ in range(chunks):
+            words = []
+            for _ in range(self.words_per_chunk):
+                roll = self.rng.random()
+                pool = topic if roll < 0.35 else own if roll < 0.65 else self.common
+                words.append(self.rng.choice(pool))
+            texts.append(" ".join(words))
+        return texts
+
+    def query(self, text: str) -> str:
+        words = text.split()
+        return " ".join(self.rng.sample(words, 8) + self.rng.sample(self.common, 2))
+
+
+def ingest(vector_store: VectorStore, corpus: TopicCorpus, start: int, end: int, chunks_per_doc: int,
+           documents: List[Tuple[str, List[str]]]):
+    for index in range(start, end):
+        source = f"doc_{index:06d}.txt"
+        texts = corpus.document(index, chunks_per_doc)
+        chunks = ChunkBatch(source, "text", texts)
+        chunks.ids = make_chunk_ids(source, texts)
+        vector_store.sync_source(chunks)
+        documents.append((source, texts))
+
+
+def evaluate(vector_store: VectorStore, queries: List[Tuple[str, str]], k: int,
+             top_documents_list: List[int]) -> Dict[str, Any]:
+    """对同一批查询分别直接检索和两阶段检索"""
+    modes = {"flat": 0, **{f"top{m}": m for m in top_documents_list}}
+    results, latencies = {}, {}
+    for name, top_documents in modes.items():
+        latencies[name], results[name] = [], []
+        for query, _ in queries:
+            start = time.perf_counter()
+            hits = vector_store.search(query, k, top_documents=top_documents)
+            latencies[name].append((time.perf_counter() - start) * 1000)
+            results[name].append(hits)
+
+    report = {}
+    for name in modes:
+        recall, target_hits = [], 0
+        for (_, target_source), flat_hits, hits in zip(queries, results["flat"], results[name]):
+            flat_ids = {hit["id"] for hit in flat_hits}
+            recall.append(len(flat_ids & {hit["id"] for hit in hits}) / len(flat_ids) if flat_ids else 1.0)
+            target_hits += any(hit["metadata"]["source"] == target_source for hit in hits)
+        report[name] = {
+            "latency_ms": percentiles(latencies[name], (50, 95, 99)),
+            "recall_vs_flat": sum(recall) / len(recall),
+            "source_hit_rate": target_hits / len(queries)
+        }
+    return report
+
+
+def run(args) -> Dict[str, Any]:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    top_documents_list = [int(m) for m in args.top_documents.split(",")]
+    corpus = TopicCorpus(args.seed, topics=max(1, sizes[-1] // args.docs_per_topic))
+    rng = random.Random(args.seed + 1)
+
+    stages = []
+    with tempfile.TemporaryDirectory(prefix="docmate_hierarchical_") as temp_dir:
+        vector_store = VectorStore(
+            persist_directory=os.path.join(temp_dir, "chroma_db"),
+            collection_name="hierarchical",
+            embedding_function=HashEmbeddingFunction(dim=args.dim),
+            write_batch_size=2048,
+            doc_index=True
+        )
+        documents: List[Tuple[str, List[str]]] = []
+        for size in sizes:
+            start = time.perf_counter()
+            ingest(vector_store, corpus, len(documents), size, args.chunks_per_doc, documents)
+            ingest_seconds = time.perf_counter() - start
+
+            queries = []
+            for _ in range(args.queries):
+                source, texts = rng.choice(documents)
+                queries.append((corpus.query(rng.choice(texts)), source))
+            report = evaluate(vector_store, queries, args.k, top_documents_list)
+            stages.append({
+                "documents": size,
+                "chunks": vector_store.collection.count(),
+                "ingest_seconds": ingest_seconds,
+                "modes": report
+            })
+            line = " | ".join(
+                f"{name} p50 {result['latency_ms']['p50']:.1f}ms 召回 {result['recall_vs_flat']:.0%} 命中 {result['source_hit_rate']:.0%}"
+                for name, result in report.items()
+            )
+            print(f"📚 {size:7d} 文档 | {line}")
+
+    return {
+        "benchmark": "hierarchical",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "stages": stages
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="两阶段检索基准（延迟与召回率）")
+    parser.add_argument("--sizes", default="500,2000,8000", help="逗号分隔的递增文档数")
+    parser.add_argument("--chunks-per-doc", type=int, default=10, help="每个文档的块数")
+    parser.add_argument("--docs-per-topic", type=int, default=20, help="每个主题的文档数")
+    parser.add_argument("--top-documents", default="10,50", help="逗号分隔的粗检索文档数")
+    parser.add_argument("--queries", type=int, default=200, help="每个规模的查询数")
+    parser.add_argument("--k", type=int, default=5, help="返回的文档块数")
+    parser.add_argument("--dim", type=int, default=256, help="哈希嵌入维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
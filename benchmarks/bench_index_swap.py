@@ -0,0 +1,166 @@
+"""重建索引基准 - 全量重建期间持续检索，比较原地删除重建和索引世代切换
+
+- recreate：原来的做法，删除集合后在同一个集合名下重新写入全部文档块，检索一直使用同一个向量库对象；
+- generations：IndexGenerations 在新集合中写入全部文档块，完成后原子切换，旧集合在进行中的检索结束后删除。
+
+两种模式写入相同的文档块（哈希嵌入），重建期间若干线程持续检索。报告重建耗时、检索延迟分位数、
+失败的检索（抛出异常）、不完整的检索（结果少于 n_results 条）、结果与重建前不一致的检索
+（只检索到部分数据），以及检索不可用或结果不一致的最长连续时间。
+新世代的HNSW图是重新构建的，切换后个别查询的近似检索结果可能与重建前略有不同。
+
+使用方法：
+    python -m benchmarks.bench_index_swap --rows 20000 --query-concurrency 2 --output index_swap.json
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List
+
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from utils.embeddings import HashEmbeddingFunction
+from utils.index_generations import IndexGenerations
+from utils.vector_store import VectorStore
+
+
+def make_rows(rows: int, seed: int) -> List[tuple]:
+    """(ID, 文本, 元数据) 列表，每个来源 10 个文档块"""
+    generator = CorpusGenerator(seed=seed)
+    return [
+        (f"chunk-{index:09d}", generator.sentence(), {"source": f"/data/file_{index // 10:06d}.txt"})
+        for index in range(rows)
+    ]
+
+
+def populate(vector_store: VectorStore, rows: List[tuple], batch_size: int):
+    for start in range(0, len(rows), batch_size):
+        window = rows[start:start + batch_size]
+        vector_store.add_documents([row[1] for row in window], [row[2] for row in window],
+                                   ids=[row[0] for row in window], upsert=True)
+
+
+def run_mode(mode: str, persist_directory: str, rows: List[tuple], queries: List[str], args) -> Dict[str, Any]:
+    embedding_function = HashEmbeddingFunction()
+
+    def create_store(collection_name: str) -> VectorStore:
+        return VectorStore(persist_directory, collection_name, embedding_function, write_batch_size=args.batch_size)
+
+    if mode == "recreate":
+        store = create_store(f"{mode}_documents")
+    else:
+        store = IndexGenerations(create_store, f"{mode}_documents", persist_directory)
+    populate(store, rows, args.batch_size)
+    # 两种模式重建前后的数据相同，结果应与重建前一致
+    expected = [[item["id"] for item in store.search(query, args.n_results)] for query in queries]
+
+    stop = threading.Event()
+    samples: List[tuple] = []
+    samples_lock = threading.Lock()
+
+    def query_worker(index: int):
+        i = index
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                ids = [item["id"] for item in store.search(queries[i % len(queries)], args.n_results)]
+                status = "ok" if ids == expected[i % len(queries)] else (
+                    "incomplete" if len(ids) < args.n_results else "mismatched")
+            except Exception:
+                status = "failed"
+            end = time.perf_counter()
+            with samples_lock:
+                samples.append((start, end, status))
+            i += args.query_concurrency
+            time.sleep(args.think_ms / 1000)
+
+    workers = [threading.Thread(target=query_worker, args=(i,)) for i in range(args.query_concurrency)]
+    for worker in workers:
+        worker.start()
+    time.sleep(args.settle_s)
+
+    start = time.perf_counter()
+    if mode == "recreate":
+        store.delete_collection()
+        populate(store, rows, args.batch_size)
+    else:
+        store.rebuild(lambda new_store, sources: populate(new_store, rows, args.batch_size) if sources is None else None)
+    elapsed = time.perf_counter() - start
+    time.sleep(args.settle_s)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    if mode != "recreate":
+        store.wait_retired()
+
+    # 最长连续不可用时间：从第一次结果不正确的检索开始，到之后第一次结果正确的检索开始
+    samples.sort()
+    outage, outage_start, longest = False, 0.0, 0.0
+    for sample_start, _, status in samples:
+        ok = status == "ok"
+        if not ok and not outage:
+            outage, outage_start = True, sample_start
+        elif ok and outage:
+            outage = False
+            longest = max(longest, sample_start - outage_start)
+    if outage:
+        longest = max(longest, samples[-1][1] - outage_start)
+
+    return {
+        "rebuild_seconds": elapsed,
+        "searches": len(samples),
+        "search_latency_ms": percentiles([(end - begin) * 1000 for begin, end, _ in samples], (50, 95, 99)),
+        "failed_searches": sum(1 for sample in samples if sample[2] == "failed"),
+        "incomplete_searches": sum(1 for sample in samples if sample[2] == "incomplete"),
+        "mismatched_searches": sum(1 for sample in samples if sample[2] == "mismatched"),
+        "longest_outage_s": longest,
+        "final_count": store.collection.count()
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    rows = make_rows(args.rows, args.seed)
+    generator = CorpusGenerator(seed=args.seed + 1)
+    queries = [generator.sentence() for _ in range(200)]
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="docmate_index_swap_") as temp_dir:
+        for mode in args.modes.split(","):
+            result = run_mode(mode, os.path.join(temp_dir, "chroma_db"), rows, queries, args)
+            results[mode] = result
+            latency = result["search_latency_ms"]
+            print(
+                f"🔁 {mode:11s} | 重建 {result['rebuild_seconds']:.2f}s | 检索 {result['searches']} 次"
+                f" p50 {latency['p50']:.1f}ms p99 {latency['p99']:.1f}ms"
+                f" | 失败 {result['failed_searches']} 不完整 {result['incomplete_searches']}"
+                f" 不一致 {result['mismatched_searches']}"
+                f" | 最长不可用 {result['longest_outage_s']:.2f}s"
+            )
+
+    return {
+        "benchmark": "index_swap",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "modes": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建索引基准（原地删除重建 vs 索引世代切换）")
+    parser.add_argument("--modes", default="recreate,generations", help="逗号分隔的模式：recreate、generations")
+    parser.add_argument("--rows", type=int, default=20000, help="文档块数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每次写入的文档块数")
+    parser.add_argument("--n-results", type=int, default=5, help="每次检索返回的结果数")
+    parser.add_argument("--query-concurrency", type=int, default=2, help="并发检索线程数")
+    parser.add_argument("--think-ms", type=float, default=5, help="每个检索线程两次检索之间的间隔（毫秒）")
+    parser.add_argument("--settle-s", type=float, default=0.5, help="重建前后额外检索的时间（秒）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
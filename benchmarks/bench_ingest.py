@@ -0,0 +1,174 @@
+"""导入与检索微基准测试 - 分阶段测量 提取/分块/嵌入/存储 吞吐和查询延迟分位数
+
+完全离线运行：使用确定性的哈希嵌入函数和桩模型，语料由 benchmarks.corpus 生成。
+
+使用方法：
+    python -m benchmarks.bench_ingest --files 10 --size-kb 64 --queries 200 --output bench_ingest.json
+    python -m benchmarks.compare old.json new.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import List, Dict, Any
+
+from agents.document_agent import DocumentAgent
+from agents.qa_agent import QAAgent
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import generate_corpus, CorpusGenerator, FORMATS
+from utils.embeddings import HashEmbeddingFunction
+from utils.stub_model import StubChatModel
+from utils.vector_store import VectorStore
+
+
+def bench_ingestion(agent: DocumentAgent, corpus: Dict[str, List[str]]) -> Dict[str, Any]:
+    """按格式分阶段测量导入吞吐"""
+    vector_store = agent.vector_store
+    results = {}
+    for fmt, paths in corpus.items():
+        processor_type = agent.supported_extensions[f".{fmt}"]
+        processor = agent.get_processor(processor_type)
+        stages = {"extract": 0.0, "chunk": 0.0, "embed": 0.0, "store": 0.0}
+        total_bytes = sum(os.path.getsize(path) for path in paths)
+        total_chars = 0
+        total_chunks = 0
+
+        for path in paths:
+            start = time.perf_counter()
+            text = processor.extract_text(path)
+            extracted = time.perf_counter()
+            chunks = processor.chunk_text(text)
+            chunked = time.perf_counter()
+            embeddings = vector_store.embed(chunks) if chunks else []
+            embedded = time.perf_counter()
+            if chunks:
+                metadatas = [
+                    {"source": path, "type": processor_type, "chunk_index": i}
+                    for i in range(len(chunks))
+                ]
+                vector_store.add_documents(chunks, metadatas, embeddings=embeddings)
+            stored = time.perf_counter()
+
+            stages["extract"] += extracted - start
+            stages["chunk"] += chunked - extracted
+            stages["embed"] += embedded - chunked
+            stages["store"] += stored - embedded
+            total_chars += len(text)
+            total_chunks += len(chunks)
+
+        total_seconds = sum(stages.values())
+        results[fmt] = {
+            "files": len(paths),
+            "bytes": total_bytes,
+            "chars": total_chars,
+            "chunks": total_chunks,
+            "stage_seconds": stages,
+            "stage_chunks_per_s": {
+                stage: (total_chunks / seconds if seconds else 0.0) for stage, seconds in stages.items()
+            },
+            "extract_mb_per_s": total_bytes / 1e6 / stages["extract"] if stages["extract"] else 0.0,
+            "total_seconds": total_seconds,
+            "files_per_s": len(paths) / total_seconds if total_seconds else 0.0
+        }
+    return results
+
+
+def bench_queries(vector_store: VectorStore, queries: List[str], n_results: int) -> Dict[str, Any]:
+    """测量查询延迟：查询嵌入和Chroma检索分开统计"""
+    embed_latencies, search_latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        embedding = vector_store.embed([query])
+        embedded = time.perf_counter()
+        vector_store.collection.query(query_embeddings=embedding, n_results=n_results)
+        searched = time.perf_counter()
+        embed_latencies.append((embedded - start) * 1000)
+        search_latencies.append((searched - embedded) * 1000)
+
+    end_to_end = []
+    for query in queries:
+        start = time.perf_counter()
+        vector_store.search(query, n_results)
+        end_to_end.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "queries": len(queries),
+        "n_results": n_results,
+        "embed_ms": percentiles(embed_latencies),
+        "search_ms": percentiles(search_latencies),
+        "vector_store_search_ms": percentiles(end_to_end)
+    }
+
+
+async def bench_qa(qa_agent: QAAgent, queries: List[str]) -> Dict[str, Any]:
+    """使用桩模型测量完整问答路径（检索 + 构建提示 + 模型调用）的延迟"""
+    from agentscope.message import Msg
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await qa_agent(Msg(name="user", content=query, role="user"))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"questions": len(queries), "latency_ms": percentiles(latencies)}
+
+
+def run(args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="docmate_bench_") as temp_dir:
+        corpus_dir = args.corpus or os.path.join(temp_dir, "corpus")
+        corpus = generate_corpus(corpus_dir, args.files, args.size_kb, args.formats.split(","), args.seed)
+
+        vector_store = VectorStore(
+            persist_directory=os.path.join(temp_dir, "chroma_db"),
+            collection_name="bench_documents",
+            embedding_function=HashEmbeddingFunction(dim=args.dim)
+        )
+        model = StubChatModel()
+        document_agent = DocumentAgent(model=model, vector_store=vector_store)
+        qa_agent = QAAgent(model=model, vector_store=vector_store)
+
+        ingestion = bench_ingestion(document_agent, corpus)
+
+        generator = CorpusGenerator(seed=args.seed + 1)
+        rng = random.Random(args.seed)
+        queries = [generator.sentence()[:rng.randint(8, 40)] for _ in range(args.queries)]
+        retrieval = bench_queries(vector_store, queries, args.n_results)
+        qa = asyncio.run(bench_qa(qa_agent, queries[:args.qa_queries]))
+
+        return {
+            "benchmark": "ingest_retrieval",
+            "environment": environment_info(),
+            "params": {
+                "files_per_format": args.files,
+                "size_kb": args.size_kb,
+                "formats": args.formats,
+                "embedding_dim": args.dim,
+                "seed": args.seed
+            },
+            "collection_count": vector_store.collection.count(),
+            "ingestion": ingestion,
+            "retrieval": retrieval,
+            "qa": qa
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入与检索微基准测试")
+    parser.add_argument("--files", type=int, default=10, help="每种格式的文件数")
+    parser.add_argument("--size-kb", type=int, default=64, help="单个文件的大致大小（KB）")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="逗号分隔的格式列表")
+    parser.add_argument("--corpus", default=None, help="语料输出目录（默认使用临时目录）")
+    parser.add_argument("--queries", type=int, default=200, help="检索查询数量")
+    parser.add_argument("--qa-queries", type=int, default=50, help="完整问答路径的问题数量")
+    parser.add_argument("--n-results", type=int, default=5, help="每次检索返回的结果数")
+    parser.add_argument("--dim", type=int, default=256, help="哈希嵌入维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
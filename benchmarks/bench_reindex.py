@@ -0,0 +1,183 @@
+"""增量重建索引基准 - 在真实的编辑历史上比较固定长度分块和内容定义分块的重新嵌入比例
+
+从git仓库中取出文本/Markdown文件的每个历史版本，按时间顺序逐个导入同一个来源，
+统计每次导入需要重新嵌入的文档块比例（新嵌入块数 / 当前版本块数）。没有足够历史时可使用合成编辑历史。
+
+使用方法：
+    python -m benchmarks.bench_reindex --repo . --paths "*.md" --max-revisions 50
+    python -m benchmarks.bench_reindex --synthetic 30 --output reindex.json
+"""
+import argparse
+import asyncio
+import fnmatch
+import os
+import random
+import subprocess
+import tempfile
+import time
+from typing import List, Dict, Any, Tuple
+
+from agents.document_agent import DocumentAgent
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from utils.embeddings import HashEmbeddingFunction
+from utils.vector_store import VectorStore
+
+
+def _git(repo: str, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout
+
+
+def git_histories(repo: str, patterns: List[str], max_revisions: int) -> Dict[str, List[Tuple[str, str]]]:
+    """返回 {文件路径: [(提交号, 内容), ...]}（从旧到新），跟随重命名"""
+    tracked = [path for path in _git(repo, "ls-files").splitlines()
+               if any(fnmatch.fnmatch(path, pattern) for pattern in patterns)]
+    histories = {}
+    for path in tracked:
+        log = _git(repo, "log", "--follow", "--format=%H", "--name-only", "--", path).split("\n")
+        revisions, commit = [], None
+        for line in log:
+            line = line.strip()
+            if not line:
+                continue
+            if commit is None:
+                commit = line
+            else:
+                revisions.append((commit, line))
+                commit = None
+        revisions.reverse()
+        versions = []
+        for commit, name in revisions[-max_revisions:]:
+            try:
+                versions.append((commit[:8], _git(repo, "show", f"{commit}:{name}")))
+            except subprocess.CalledProcessError:
+                continue
+        if len(versions) > 1:
+            histories[path] = versions
+    return histories
+
+
+def synthetic_history(edits: int, size_chars: int, seed: int) -> List[Tuple[str, str]]:
+    """合成编辑历史：每个版本随机插入、删除或改写一个段落"""
+    generator = CorpusGenerator(seed=seed)
+    rng = random.Random(seed)
+    paragraphs = generator.paragraphs(size_chars)
+    versions = [("v0", "\n\n".join(paragraphs))]
+    for i in range(1, edits + 1):
+        action = rng.choice(("insert", "delete", "rewrite", "append"))
+        position = rng.randrange(len(paragraphs))
+        if action == "insert":
+            paragraphs.insert(position, generator.paragraph())
+        elif action == "delete" and len(paragraphs) > 1:
+            paragraphs.pop(position)
+        elif action == "rewrite":
+            paragraphs[position] = paragraphs[position][:len(paragraphs[position]) // 2] + generator.sentence()
+        else:
+            paragraphs.append(generator.paragraph())
+        versions.append((f"v{i}-{action}", "\n\n".join(paragraphs)))
+    return versions
+
+
+async def replay(agent: DocumentAgent, work_dir: str, source: str, versions: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """按顺序导入每个版本，返回每次导入的统计"""
+    extension = os.path.splitext(source)[1] or ".txt"
+    file_path = os.path.join(work_dir, f"version{extension}")
+    records = []
+    for revision, content in versions:
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        start = time.perf_counter()
+        result = await agent.process_document_async(file_path, source=source)
+        elapsed = time.perf_counter() - start
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        records.append({
+            "revision": revision,
+            "chunks": result["chunks_count"],
+            "added": result["chunks_added"],
+            "deleted": result["chunks_deleted"],
+            "reembed_ratio": result["reembed_ratio"],
+            "seconds": elapsed
+        })
+    return records
+
+
+def summarize(updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总重新导入的统计（不含首个版本，首个版本必然全部嵌入）"""
+    chunks = sum(record["chunks"] for record in updates)
+    added = sum(record["added"] for record in updates)
+    return {
+        "updates": len(updates),
+        "chunks": chunks,
+        "reembedded": added,
+        "deleted": sum(record["deleted"] for record in updates),
+        "reembed_ratio": added / chunks if chunks else 0.0,
+        "per_update_ratio": percentiles([record["reembed_ratio"] for record in updates], (50, 90)),
+        "update_ms": percentiles([record["seconds"] * 1000 for record in updates], (50, 90))
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    if args.synthetic:
+        histories = {"synthetic.txt": synthetic_history(args.synthetic, args.size_kb * 512, args.seed)}
+    else:
+        histories = git_histories(args.repo, args.paths.split(","), args.max_revisions)
+    if not histories:
+        raise SystemExit("❌ 没有找到包含多个版本的文件，可使用 --synthetic 生成编辑历史")
+
+    results = {}
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory(prefix="docmate_reindex_") as temp_dir:
+            vector_store = VectorStore(
+                persist_directory=os.path.join(temp_dir, "chroma_db"),
+                collection_name=f"reindex_{mode}",
+                embedding_function=HashEmbeddingFunction(dim=args.dim)
+            )
+            agent = DocumentAgent(
+                model=None,
+                vector_store=vector_store,
+                processor_options={"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap, "chunking": mode}
+            )
+            per_file, all_updates = {}, []
+            for source, versions in histories.items():
+                records = asyncio.run(replay(agent, temp_dir, source, versions))
+                per_file[source] = summarize(records[1:])
+                all_updates.extend(records[1:])
+            overall = summarize(all_updates)
+            results[mode] = {"overall": overall, "files": per_file}
+            print(f"🔁 {mode:8s} | {overall['updates']} 次更新 | 重新嵌入比例 {overall['reembed_ratio']:.1%}")
+
+    return {
+        "benchmark": "reindex",
+        "environment": environment_info(),
+        "params": {
+            "source": "synthetic" if args.synthetic else args.repo,
+            "paths": args.paths,
+            "files": len(histories),
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap
+        },
+        "modes": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="增量重建索引基准（重新嵌入比例）")
+    parser.add_argument("--repo", default=".", help="提供编辑历史的git仓库")
+    parser.add_argument("--paths", default="*.md,*.txt", help="逗号分隔的文件通配符")
+    parser.add_argument("--max-revisions", type=int, default=50, help="每个文件最多重放的版本数")
+    parser.add_argument("--synthetic", type=int, default=0, help="改用合成编辑历史，指定编辑次数")
+    parser.add_argument("--size-kb", type=int, default=64, help="合成文档的大致大小（KB）")
+    parser.add_argument("--modes", default="fixed,content", help="逗号分隔的分块方式")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="分块大小")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="分块重叠")
+    parser.add_argument("--dim", type=int, default=256, help="哈希嵌入维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""多会话基准测试 - 测量每个会话的内存占用和1k活跃会话下的问答吞吐
+
+使用方法：python -m benchmarks.bench_sessions --sessions 1000 --questions 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import List, Dict, Any
+
+from agents.qa_agent import QAAgent
+from agents.session_manager import SessionManager
+from utils.bounded_memory import BoundedMemory
+from utils.stub_model import StubChatModel
+
+
+class StaticVectorStore:
+    """返回固定检索结果的向量存储，排除检索开销，只测量会话层"""
+
+    def __init__(self, n_docs: int = 5):
+        self.docs = [
+            {
+                "content": f"DocMate 基准测试文档片段 {i}，包含一些中文和 English mixed content。" * 5,
+                "metadata": {"source": f"bench_{i}.txt", "type": "text", "chunk_index": i},
+                "id": f"bench-{i}"
+            }
+            for i in range(n_docs)
+        ]
+
+    def search(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+        return self.docs[:n_results]
+
+    def get_collection_info(self) -> Dict[str, Any]:
+        return {"count": len(self.docs), "name": "static"}
+
+
+async def measure_memory_per_session(manager: SessionManager, n_sessions: int, turns: int) -> Dict[str, Any]:
+    """创建 n_sessions 个会话并各进行 turns 轮问答，测量增加的内存"""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for turn in range(turns):
+        await asyncio.gather(*[
+            manager.ask_async(f"session-{i}", f"第{turn}轮问题：文档的主要内容是什么？")
+            for i in range(n_sessions)
+        ])
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "sessions": len(manager),
+        "turns_per_session": turns,
+        "bytes_total": after - before,
+        "bytes_per_session": (after - before) / max(1, len(manager)),
+        "peak_bytes": peak - before
+    }
+
+
+async def measure_throughput(manager: SessionManager, n_sessions: int, n_questions: int, concurrency: int) -> Dict[str, Any]:
+    """以固定并发在 n_sessions 个会话上轮询提问，测量吞吐"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def ask(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await manager.ask_async(f"session-{i % n_sessions}", f"问题 {i}：有哪些重要结论？")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[ask(i) for i in range(n_questions)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "questions": n_questions,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "questions_per_s": n_questions / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    model = StubChatModel(latency_median=args.model_latency, latency_sigma=0.3, seed=0)
+    qa_agent = QAAgent(name="QAAgent", model=model, vector_store=StaticVectorStore())
+    manager = SessionManager(
+        qa_agent,
+        max_sessions=args.sessions,
+        idle_timeout=0,
+        memory_factory=lambda: BoundedMemory(max_turns=args.max_turns)
+    )
+
+    memory = await measure_memory_per_session(manager, args.sessions, args.warm_turns)
+    throughput = await measure_throughput(manager, args.sessions, args.questions, args.concurrency)
+    return {"memory": memory, "throughput": throughput, "stats": manager.get_stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话内存与吞吐基准测试")
+    parser.add_argument("--sessions", type=int, default=1000, help="活跃会话数")
+    parser.add_argument("--questions", type=int, default=10000, help="吞吐测试的问题总数")
+    parser.add_argument("--concurrency", type=int, default=256, help="同时进行的问答数")
+    parser.add_argument("--warm-turns", type=int, default=2, help="测量内存前每个会话的问答轮数")
+    parser.add_argument("--max-turns", type=int, default=20, help="每个会话保留的对话轮数")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="桩模型延迟中位数（秒）")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""多进程只读检索基准 - 比较每个worker各自打开Chroma和共享内存映射索引两种方式的内存占用与吞吐随worker数的变化
+
+先用随机归一化嵌入构造一个集合并发布为共享索引的一个世代，然后对每种方式、每个worker数：
+- 启动对应数量的独立进程（spawn），每个进程打开索引并预热后，在同一时刻开始连续检索固定时长；
+- 每个进程报告查询数、打开索引前后的 PSS（按共享进程数均摊的常驻内存，Linux /proc/self/smaps_rollup）和 RSS；
+- 汇总总吞吐、所有进程的 PSS 之和（实际占用的物理内存）以及索引部分的 PSS（减去打开索引前的解释器基线）。
+
+查询文本由哈希嵌入函数在各worker中计算，与服务端一样受各自进程GIL的限制。
+
+使用方法：
+    python -m benchmarks.bench_shared_index --rows 100000 --workers 1,2,4 --duration 10 --output shared_index.json
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Dict, Any, List
+
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from utils.embeddings import HashEmbeddingFunction
+
+
+def memory_kb() -> Dict[str, int]:
+    """当前进程的 PSS / RSS（KB），不支持 smaps_rollup 的平台只返回峰值RSS"""
+    try:
+        with open("/proc/self/smaps_rollup", "r") as file:
+            values = {}
+            for line in file:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:"):
+                    values[parts[0][:-1].lower()] = int(parts[1])
+            return values
+    except OSError:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": rss, "pss": rss}
+
+
+def open_index(mode: str, args):
+    """在worker进程中打开索引，返回具有 search(query, n_results) 的对象"""
+    embedding_function = HashEmbeddingFunction(dim=args.dim)
+    if mode == "shared":
+        from utils.shared_index import SharedIndexReader
+
+        reader = SharedIndexReader(args.index_dir, embedding_function, check_interval=60)
+        reader.refresh(force=True)
+        return reader
+    from utils.vector_store import VectorStore
+
+    return VectorStore(args.persist_directory, "shared_bench", embedding_function)
+
+
+def worker_main(mode: str, args, queries: List[str], barrier, results):
+    baseline = memory_kb()
+    index = open_index(mode, args)
+    for query in queries[:args.warmup]:
+        index.search(query, args.k)
+    barrier.wait()
+
+    latencies = []
+    deadline = time.perf_counter() + args.duration
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        index.search(queries[i % len(queries)], args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        i += 1
+    # 所有进程都还在运行时测量，先退出的进程不会让其他进程的共享页按更少的进程均摊
+    barrier.wait()
+    memory = memory_kb()
+    barrier.wait()
+    results.put({"queries": i, "latencies": latencies, "baseline": baseline, "memory": memory})
+
+
+def run_workers(mode: str, workers: int, args, queries: List[str]) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker_main, args=(mode, args, queries, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    total_pss = sum(report["memory"].get("pss", 0) for report in reports)
+    baseline_pss = sum(report["baseline"].get("pss", 0) for report in reports)
+    latencies = [latency for report in reports for latency in report["latencies"]]
+    return {
+        "workers": workers,
+        "qps": sum(report["queries"] for report in reports) / args.duration,
+        "latency_ms": percentiles(latencies, (50, 95, 99)),
+        "total_pss_mb": total_pss / 1024,
+        "index_pss_mb": (total_pss - baseline_pss) / 1024,
+        "total_rss_mb": sum(report["memory"].get("rss", 0) for report in reports) / 1024
+    }
+
+
+def build_index(args):
+    """构造Chroma集合并发布为共享索引的第一个世代"""
+    import numpy as np
+
+    from utils.shared_index import IndexPublisher
+    from utils.vector_store import VectorStore
+
+    rng = np.random.default_rng(args.seed)
+    generator = CorpusGenerator(seed=args.seed)
+    vector_store = VectorStore(args.persist_directory, "shared_bench", HashEmbeddingFunction(dim=args.dim),
+                               write_batch_size=5000)
+    for offset in range(0, args.rows, 5000):
+        count = min(5000, args.rows - offset)
+        embeddings = rng.standard_normal((count, args.dim)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        vector_store.add_documents(
+            [generator.sentence() for _ in range(count)],
+            [{"source": f"/data/docs/file_{(offset + i) % 2000:06d}.txt", "chunk_index": (offset + i) // 2000}
+             for i in range(count)],
+            ids=[f"chunk-{offset + i:09d}" for i in range(count)],
+            embeddings=embeddings
+        )
+    IndexPublisher(args.index_dir).publish(vector_store)
+
+
+def run(args) -> Dict[str, Any]:
+    generator = CorpusGenerator(seed=args.seed + 1)
+    queries = [generator.sentence() for _ in range(args.queries)]
+    worker_counts = [int(count) for count in args.workers.split(",")]
+    report: Dict[str, Any] = {}
+
+    with tempfile.TemporaryDirectory(prefix="docmate_shared_index_") as temp_dir:
+        args.persist_directory = os.path.join(temp_dir, "chroma_db")
+        args.index_dir = os.path.join(temp_dir, "shared_index")
+        start = time.perf_counter()
+        build_index(args)
+        report["build_seconds"] = time.perf_counter() - start
+
+        for mode in args.modes.split(","):
+            report[mode] = []
+            for workers in worker_counts:
+                result = run_workers(mode, workers, args, queries)
+                report[mode].append(result)
+                print(
+                    f"🧵 {mode:6s} x{workers} | {result['qps']:7.1f} 查询/s | p50 {result['latency_ms']['p50']:.1f}ms"
+                    f" | PSS 合计 {result['total_pss_mb']:7.1f} MB（索引部分 {result['index_pss_mb']:6.1f} MB）"
+                    f" | RSS 合计 {result['total_rss_mb']:7.1f} MB"
+                )
+        del args.persist_directory, args.index_dir
+
+    return {
+        "benchmark": "shared_index",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        **report
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程只读检索基准（共享内存映射索引 vs 每进程Chroma）")
+    parser.add_argument("--rows", type=int, default=100000, help="集合行数")
+    parser.add_argument("--dim", type=int, default=384, help="嵌入维度")
+    parser.add_argument("--workers", default="1,2,4", help="逗号分隔的worker进程数")
+    parser.add_argument("--modes", default="shared,chroma", help="逗号分隔的方式：shared（共享索引）、chroma（每进程打开Chroma）")
+    parser.add_argument("--duration", type=float, default=10, help="每轮检索时长（秒）")
+    parser.add_argument("--queries", type=int, default=500, help="查询文本数（循环使用）")
+    parser.add_argument("--warmup", type=int, default=20, help="每个worker计时前的预热查询数")
+    parser.add_argument("--k", type=int, default=5, help="返回的文档块数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
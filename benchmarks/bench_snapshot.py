@@ -0,0 +1,194 @@
+"""向量库快照基准 - 导出/导入速度、快照大小、内存映射打开和检索，以及增量快照
+
+先用随机归一化嵌入构造一个集合（不计算嵌入），然后：
+- 完整导出，统计耗时、吞吐和快照大小（与 chroma_db 目录大小对比）；
+- 导入到新的向量库（批量写入Chroma，不重新嵌入），统计行/秒；
+- 直接内存映射打开快照并暴力检索，对比顺序读取快照文件（磁盘带宽参考）和Chroma检索延迟；
+- 修改约1%的行（改写、删除、新增各占三分之一），导出增量快照并增量导入。
+
+使用方法：
+    python -m benchmarks.bench_snapshot --rows 100000 --dim 384 --output snapshot.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Dict, Any, List
+
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+from utils.embeddings import HashEmbeddingFunction
+from utils.snapshot import Snapshot
+from utils.vector_store import VectorStore
+
+
+def directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def read_bandwidth(path: str) -> float:
+    """顺序读取目录下所有文件，返回 MB/s（页缓存命中时即内存带宽）"""
+    start, total = time.perf_counter(), 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            with open(os.path.join(root, name), "rb") as file:
+                while True:
+                    block = file.read(1 << 22)
+                    if not block:
+                        break
+                    total += len(block)
+    return total / 2 ** 20 / (time.perf_counter() - start)
+
+
+def random_rows(rng, generator: CorpusGenerator, start: int, count: int, dim: int, sources: int):
+    import numpy as np
+
+    embeddings = rng.standard_normal((count, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"chunk-{start + i:09d}" for i in range(count)]
+    texts = [generator.sentence() for _ in range(count)]
+    metadatas = [
+        {"source": f"/data/docs/file_{(start + i) % sources:06d}.txt", "type": "text", "chunk_index": (start + i) // sources}
+        for i in range(count)
+    ]
+    return ids, texts, metadatas, embeddings
+
+
+def run(args) -> Dict[str, Any]:
+    import numpy as np
+
+    rng = np.random.default_rng(args.seed)
+    generator = CorpusGenerator(seed=args.seed)
+    embedding_function = HashEmbeddingFunction(dim=args.dim)
+    report: Dict[str, Any] = {}
+
+    with tempfile.TemporaryDirectory(prefix="docmate_snapshot_") as temp_dir:
+        source = VectorStore(os.path.join(temp_dir, "source_db"), "snapshot_source", embedding_function,
+                             write_batch_size=5000)
+        start = time.perf_counter()
+        for offset in range(0, args.rows, 5000):
+            ids, texts, metadatas, embeddings = random_rows(rng, generator, offset, min(5000, args.rows - offset),
+                                                            args.dim, args.sources)
+            source.add_documents(texts, metadatas, ids=ids, embeddings=embeddings)
+        report["build_seconds"] = time.perf_counter() - start
+        chroma_bytes = directory_bytes(source.persist_directory)
+
+        # 完整导出
+        full_path = os.path.join(temp_dir, "snapshot_full")
+        start = time.perf_counter()
+        source.export_snapshot(full_path)
+        export_seconds = time.perf_counter() - start
+        snapshot_bytes = directory_bytes(full_path)
+        report["export"] = {
+            "seconds": export_seconds,
+            "rows_per_s": args.rows / export_seconds,
+            "mb_per_s": snapshot_bytes / 2 ** 20 / export_seconds,
+            "snapshot_bytes": snapshot_bytes,
+            "chroma_db_bytes": chroma_bytes
+        }
+
+        # 导入到新的向量库
+        target = VectorStore(os.path.join(temp_dir, "target_db"), "snapshot_target", embedding_function)
+        result = target.import_snapshot(full_path)
+        report["import"] = {
+            "seconds": result["seconds"],
+            "rows_per_s": result["rows"] / result["seconds"],
+            "mb_per_s": snapshot_bytes / 2 ** 20 / result["seconds"]
+        }
+
+        # 内存映射打开并检索
+        report["read_bandwidth_mb_per_s"] = read_bandwidth(full_path)
+        start = time.perf_counter()
+        snapshot = Snapshot(full_path)
+        open_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        verified = Snapshot(full_path, verify=True)
+        verify_seconds = time.perf_counter() - start
+        del verified
+        queries = [generator.sentence() for _ in range(args.queries)]
+        query_embeddings = embedding_function(queries)
+        mmap_latencies, chroma_latencies, overlap = [], [], []
+        for query, query_embedding in zip(queries, query_embeddings):
+            start = time.perf_counter()
+            hits = snapshot.search(query_embedding, args.k)
+            mmap_latencies.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            chroma_hits = target.search(query, args.k)
+            chroma_latencies.append((time.perf_counter() - start) * 1000)
+            overlap.append(len({hit["id"] for hit in hits} & {hit["id"] for hit in chroma_hits}) / args.k)
+        report["mmap"] = {
+            "open_seconds": open_seconds,
+            "open_verify_seconds": verify_seconds,
+            "search_ms": percentiles(mmap_latencies, (50, 95)),
+            "chroma_search_ms": percentiles(chroma_latencies, (50, 95)),
+            # HNSW是近似检索，暴力检索是精确结果
+            "chroma_overlap": sum(overlap) / len(overlap)
+        }
+
+        # 增量快照：改写、删除、新增各约 delta_ratio/3
+        changed = max(3, int(args.rows * args.delta_ratio) // 3)
+        picked = random.Random(args.seed).sample(range(args.rows), 2 * changed)
+        rewrite_ids = [f"chunk-{i:09d}" for i in picked[:changed]]
+        source.collection.update(ids=rewrite_ids, documents=[generator.sentence() for _ in rewrite_ids],
+                                 embeddings=random_rows(rng, generator, 0, changed, args.dim, args.sources)[3])
+        source.delete_ids([f"chunk-{i:09d}" for i in picked[changed:]])
+        ids, texts, metadatas, embeddings = random_rows(rng, generator, args.rows, changed, args.dim, args.sources)
+        source.add_documents(texts, metadatas, ids=ids, embeddings=embeddings)
+
+        delta_path = os.path.join(temp_dir, "snapshot_delta")
+        start = time.perf_counter()
+        manifest = source.export_snapshot(delta_path, base=full_path)
+        delta_export = time.perf_counter() - start
+        result = target.import_snapshot(delta_path)
+        report["delta"] = {
+            "changed_rows": 3 * changed,
+            "rows": manifest["count"],
+            "deleted": manifest["deleted"],
+            "snapshot_bytes": directory_bytes(delta_path),
+            "export_seconds": delta_export,
+            "import_mode": result["mode"],
+            "import_seconds": result["seconds"],
+            "target_rows": target.collection.count(),
+            "source_rows": source.collection.count()
+        }
+
+    export, imported, mmap_report, delta = report["export"], report["import"], report["mmap"], report["delta"]
+    print(
+        f"📦 导出 {export['rows_per_s']:.0f} 行/s（{export['mb_per_s']:.0f} MB/s），"
+        f"快照 {export['snapshot_bytes'] / 2 ** 20:.1f} MB / chroma_db {export['chroma_db_bytes'] / 2 ** 20:.1f} MB\n"
+        f"📥 导入Chroma {imported['rows_per_s']:.0f} 行/s（{imported['mb_per_s']:.0f} MB/s）| "
+        f"读取带宽 {report['read_bandwidth_mb_per_s']:.0f} MB/s\n"
+        f"🗺️ 映射打开 {mmap_report['open_seconds'] * 1000:.1f}ms（含校验 {mmap_report['open_verify_seconds']:.2f}s）| "
+        f"暴力检索 p50 {mmap_report['search_ms']['p50']:.1f}ms / Chroma p50 {mmap_report['chroma_search_ms']['p50']:.1f}ms\n"
+        f"🔁 增量 {delta['changed_rows']} 行变化 -> 快照 {delta['rows']} 行 + 删除 {delta['deleted']}，"
+        f"{delta['snapshot_bytes'] / 2 ** 20:.2f} MB，导出 {delta['export_seconds']:.1f}s，导入 {delta['import_seconds']:.2f}s"
+    )
+    return {
+        "benchmark": "snapshot",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        **report
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量库快照基准")
+    parser.add_argument("--rows", type=int, default=100000, help="集合行数")
+    parser.add_argument("--dim", type=int, default=384, help="嵌入维度")
+    parser.add_argument("--sources", type=int, default=2000, help="来源文件数")
+    parser.add_argument("--delta-ratio", type=float, default=0.01, help="增量快照中变化的行比例")
+    parser.add_argument("--queries", type=int, default=50, help="检索次数")
+    parser.add_argument("--k", type=int, default=5, help="返回的文档块数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""启动基准测试 - 在全新的解释器中测量模块导入、系统初始化和首次问答耗时
+
+使用方法：python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Any, List
+
+import yaml
+
+# 在子进程中执行的测量脚本
+_CHILD_SCRIPT = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import simple_document_qa
+t1 = time.perf_counter()
+heavy = [name for name in %(heavy)r if name in sys.modules]
+from utils.stub_model import StubChatModel
+qa_system = simple_document_qa.SimpleDocumentQA(config_path=%(config)r, model=StubChatModel())
+t2 = time.perf_counter()
+qa_system.ask_question("文档的主要内容是什么？")
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0,
+    "init_s": t2 - t1,
+    "first_query_s": t3 - t2,
+    "total_s": t3 - t0,
+    "heavy_modules_after_import": heavy
+}))
+'''
+
+HEAVY_MODULES = ["chromadb", "agentscope", "PyPDF2", "docx", "markdown", "PIL", "pytesseract"]
+
+
+def run_once(repo_root: str, config_path: str) -> Dict[str, Any]:
+    """在新的子进程中测量一次冷启动"""
+    script = _CHILD_SCRIPT % {"heavy": HEAVY_MODULES, "config": config_path}
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    # 初始化过程会打印状态信息，最后一行是测量结果
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {}
+    for key in ("import_s", "init_s", "first_query_s", "total_s"):
+        values = [sample[key] for sample in samples]
+        summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+    summary["heavy_modules_after_import"] = samples[-1]["heavy_modules_after_import"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动与首次问答耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="重复次数")
+    parser.add_argument("--config", default=os.path.join("config", "config.yaml"), help="配置文件路径")
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(repo_root, args.config), 'r', encoding='utf-8') as file:
+        config = yaml.safe_load(file) or {}
+
+    with tempfile.TemporaryDirectory(prefix="docmate_startup_") as temp_dir:
+        # 使用临时的向量库目录，避免影响已有数据
+        config.setdefault("vector_store", {})["persist_directory"] = os.path.join(temp_dir, "chroma_db")
+        config_path = os.path.join(temp_dir, "config.yaml")
+        with open(config_path, 'w', encoding='utf-8') as file:
+            yaml.safe_dump(config, file, allow_unicode=True)
+        samples = [run_once(repo_root, config_path) for _ in range(args.runs)]
+
+    print(json.dumps({"runs": args.runs, "startup": summarize(samples)}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
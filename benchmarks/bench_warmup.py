@@ -0,0 +1,159 @@
+"""启动预热基准 - 在全新的解释器中比较冷启动和预热后的首次问答延迟
+
+先构造一个持久化的Chroma集合（随机归一化嵌入，维度与哈希嵌入一致），然后对每种模式重复启动子进程：
+- cold：关闭预热，首次问答时才打开集合、把HNSW索引载入内存；
+- warm：初始化时同步预热（加载嵌入模型、打开集合并执行一次查询）；
+- warm_cached：同步预热，并把首次问答的问题作为常见问题预先计算嵌入放入查询缓存。
+
+每次报告初始化耗时（含预热）、预热各阶段耗时、首次问答和第二次问答（不同问题）的耗时。
+问答使用桩模型，嵌入使用哈希嵌入（离线环境无法加载Chroma默认模型，模型加载耗时在这里接近于零）。
+
+使用方法：
+    python -m benchmarks.bench_warmup --rows 100000 --runs 5 --output warmup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Any, List
+
+import yaml
+
+from benchmarks.common import environment_info, write_results
+from benchmarks.corpus import CorpusGenerator
+
+# 在子进程中执行的测量脚本
+_CHILD_SCRIPT = r'''
+import json, time
+from simple_document_qa import SimpleDocumentQA
+from utils.stub_model import StubChatModel
+t0 = time.perf_counter()
+qa_system = SimpleDocumentQA(config_path=%(config)r, model=StubChatModel())
+t1 = time.perf_counter()
+qa_system.ask_question(%(first)r)
+t2 = time.perf_counter()
+qa_system.ask_question(%(second)r)
+t3 = time.perf_counter()
+print(json.dumps({
+    "init_s": t1 - t0,
+    "warmup": qa_system.warmup_report,
+    "first_query_s": t2 - t1,
+    "second_query_s": t3 - t2
+}))
+'''
+
+MODES = {
+    "cold": {"enabled": False},
+    "warm": {"enabled": True, "blocking": True, "questions": []},
+    "warm_cached": {"enabled": True, "blocking": True}
+}
+
+
+def build_collection(persist_directory: str, rows: int, seed: int):
+    """构造持久化集合，嵌入维度与配置中的哈希嵌入（默认256维）一致"""
+    import numpy as np
+
+    from utils.embeddings import HashEmbeddingFunction
+    from utils.vector_store import VectorStore
+
+    embedding_function = HashEmbeddingFunction()
+    rng = np.random.default_rng(seed)
+    generator = CorpusGenerator(seed=seed)
+    vector_store = VectorStore(persist_directory, "documents", embedding_function, write_batch_size=5000)
+    for offset in range(0, rows, 5000):
+        count = min(5000, rows - offset)
+        embeddings = rng.standard_normal((count, embedding_function.dim)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        vector_store.add_documents(
+            [generator.sentence() for _ in range(count)],
+            [{"source": f"/data/docs/file_{(offset + i) % 2000:06d}.txt"} for i in range(count)],
+            ids=[f"chunk-{offset + i:09d}" for i in range(count)],
+            embeddings=embeddings
+        )
+
+
+def run_once(repo_root: str, config_path: str, first: str, second: str) -> Dict[str, Any]:
+    """在新的子进程中启动一次并问答两次"""
+    script = _CHILD_SCRIPT % {"config": config_path, "first": first, "second": second}
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    # 初始化过程会打印状态信息，最后一行是测量结果
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {}
+    for key in ("init_s", "first_query_s", "second_query_s"):
+        values = [sample[key] for sample in samples]
+        summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+    warmups = [sample["warmup"] for sample in samples if sample["warmup"]]
+    if warmups:
+        summary["warmup"] = {
+            key: statistics.median(warmup[key] for warmup in warmups)
+            for key in ("model_seconds", "index_seconds", "questions_seconds")
+        }
+    return summary
+
+
+def run(args) -> Dict[str, Any]:
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(repo_root, "config", "config.yaml"), "r", encoding="utf-8") as file:
+        base_config = yaml.safe_load(file) or {}
+    generator = CorpusGenerator(seed=args.seed + 1)
+    first, second = generator.sentence(), generator.sentence()
+    frequent = [first] + [generator.sentence() for _ in range(args.questions - 1)]
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="docmate_warmup_") as temp_dir:
+        persist_directory = os.path.join(temp_dir, "chroma_db")
+        build_collection(persist_directory, args.rows, args.seed)
+        for mode in args.modes.split(","):
+            config = json.loads(json.dumps(base_config))
+            config["vector_store"].update(persist_directory=persist_directory, embedding_function="hash")
+            config["ingestion"]["journal_dir"] = os.path.join(temp_dir, "journal")
+            config["warmup"] = dict(MODES[mode])
+            if mode == "warm_cached":
+                config["warmup"]["questions"] = frequent
+            config_path = os.path.join(temp_dir, f"config_{mode}.yaml")
+            with open(config_path, "w", encoding="utf-8") as file:
+                yaml.safe_dump(config, file, allow_unicode=True)
+
+            summary = summarize([run_once(repo_root, config_path, first, second) for _ in range(args.runs)])
+            results[mode] = summary
+            print(
+                f"🔥 {mode:11s} | 初始化 {summary['init_s']['median']:.2f}s"
+                f" | 首次问答 {summary['first_query_s']['median'] * 1000:.1f}ms"
+                f" | 第二次问答 {summary['second_query_s']['median'] * 1000:.1f}ms"
+            )
+
+    return {
+        "benchmark": "warmup",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "modes": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动预热基准（冷启动 vs 预热后的首次问答）")
+    parser.add_argument("--rows", type=int, default=100000, help="集合行数")
+    parser.add_argument("--runs", type=int, default=5, help="每种模式的启动次数")
+    parser.add_argument("--modes", default="cold,warm,warm_cached", help="逗号分隔的模式")
+    parser.add_argument("--questions", type=int, default=100, help="warm_cached 模式预先计算的常见问题数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    write_results(run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""基准测试公共工具 - 分位数统计、运行环境信息和结果输出"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any, Optional
+
+
+def percentiles(values: List[float], points=(50, 90, 95, 99)) -> Dict[str, float]:
+    """计算分位数（最近秩法），返回 {"p50": ..., "mean": ..., "max": ...}"""
+    if not values:
+        return {f"p{point}": 0.0 for point in points}
+    ordered = sorted(values)
+    result = {}
+    for point in points:
+        rank = max(1, int(round(point / 100 * len(ordered) + 0.5)))
+        result[f"p{point}"] = ordered[min(rank, len(ordered)) - 1]
+    result["mean"] = sum(ordered) / len(ordered)
+    result["max"] = ordered[-1]
+    return result
+
+
+def git_revision(repo_root: Optional[str] = None) -> Optional[str]:
+    """当前代码的git提交号，不在git仓库中时返回None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=repo_root or os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment_info() -> Dict[str, Any]:
+    """运行环境信息，便于跨提交对比结果"""
+    return {
+        "git_revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def write_results(results: Dict[str, Any], output_path: Optional[str] = None):
+    """输出JSON结果：指定路径时写文件，否则打印到标准输出"""
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        print(f"📄 结果已写入 {output_path}")
+    else:
+        print(text)
@@ -0,0 +1,53 @@
+"""基准结果对比 - 对比两次运行输出的JSON结果中的数值指标
+
+使用方法：python -m benchmarks.compare baseline.json candidate.json [--threshold 5]
+"""
+import argparse
+import json
+from typing import Dict, Any
+
+
+def flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    """将嵌套结果展开为 {"a.b.c": 数值}"""
+    items = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            items.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        items[prefix] = float(data)
+    return items
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float = 5.0):
+    """打印两次结果中变化超过 threshold 百分比的指标"""
+    old, new = flatten(baseline), flatten(candidate)
+    old_rev = baseline.get("environment", {}).get("git_revision")
+    new_rev = candidate.get("environment", {}).get("git_revision")
+    print(f"📊 {old_rev} -> {new_rev}")
+    for key in sorted(old.keys() & new.keys()):
+        if key.startswith(("environment.", "params.")):
+            continue
+        before, after = old[key], new[key]
+        if before == 0:
+            continue
+        change = (after - before) / abs(before) * 100
+        if abs(change) >= threshold:
+            print(f"{key:60s} {before:14.4f} -> {after:14.4f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比两次基准测试结果")
+    parser.add_argument("baseline", help="基线结果JSON")
+    parser.add_argument("candidate", help="新结果JSON")
+    parser.add_argument("--threshold", type=float, default=5.0, help="只显示变化超过该百分比的指标")
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.candidate, "r", encoding="utf-8") as file:
+        candidate = json.load(file)
+    compare(baseline, candidate, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""合成语料生成 - 生成中英文混合的 txt / md / docx / pdf 测试文档
+
+使用方法：python -m benchmarks.corpus --output ./bench_corpus --files 10 --size-kb 64
+"""
+import argparse
+import os
+import random
+import zlib
+from typing import List, Dict
+
+FORMATS = ("txt", "md", "docx", "pdf")
+
+_ZH_WORDS = [
+    "文档", "系统", "智能", "问答", "向量", "存储", "检索", "模型", "数据", "处理",
+    "分析", "报告", "政策", "流程", "管理", "用户", "服务", "安全", "性能", "配置",
+    "结果", "方案", "项目", "需求", "设计", "测试", "部署", "监控", "优化", "版本"
+]
+_EN_WORDS = [
+    "document", "system", "vector", "search", "query", "model", "embedding", "chunk",
+    "index", "latency", "throughput", "policy", "report", "service", "pipeline",
+    "storage", "config", "release", "metric", "answer", "question", "source", "batch"
+]
+
+
+class CorpusGenerator:
+    """确定性的中英文混合文本生成器，相同种子生成相同内容"""
+
+    def __init__(self, seed: int = 42, zh_ratio: float = 0.6):
+        self.random = random.Random(seed)
+        self.zh_ratio = zh_ratio
+
+    def sentence(self) -> str:
+        if self.random.random() < self.zh_ratio:
+            words = self.random.choices(_ZH_WORDS, k=self.random.randint(6, 16))
+            # 中文句子中夹杂少量英文术语
+            if self.random.random() < 0.3:
+                words.insert(self.random.randrange(len(words)), f" {self.random.choice(_EN_WORDS)} ")
+            return "".join(words) + "。"
+        words = self.random.choices(_EN_WORDS, k=self.random.randint(6, 16))
+        return " ".join(words).capitalize() + ". "
+
+    def paragraph(self) -> str:
+        return "".join(self.sentence() for _ in range(self.random.randint(3, 8)))
+
+    def paragraphs(self, size_chars: int) -> List[str]:
+        """生成总长度约为 size_chars 个字符的段落列表"""
+        result, total = [], 0
+        while total < size_chars:
+            paragraph = self.paragraph()
+            result.append(paragraph)
+            total += len(paragraph) + 1
+        return result
+
+
+def write_txt(path: str, paragraphs: List[str]):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n\n".join(paragraphs))
+
+
+def write_markdown(path: str, paragraphs: List[str]):
+    lines = []
+    for i, paragraph in enumerate(paragraphs):
+        if i % 5 == 0:
+            lines.append(f"## 第{i // 5 + 1}节 Section {i // 5 + 1}\n")
+        if i % 7 == 3:
+            lines.append(f"- **要点**: {paragraph[:60]}\n")
+        lines.append(paragraph + "\n")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("# 合成测试文档 Synthetic Document\n\n" + "\n".join(lines))
+
+
+def write_docx(path: str, paragraphs: List[str]):
+    from docx import Document
+
+    document = Document()
+    document.add_heading("合成测试文档 Synthetic Document", level=1)
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def _pdf_to_unicode_cmap(code_points) -> bytes:
+    """ToUnicode CMap：两字节编码即Unicode码位，只列出文档中用到的字符"""
+    entries = [f"<{cp:04X}> <{cp:04X}>" for cp in sorted(code_points)]
+    blocks = []
+    for start in range(0, len(entries), 100):
+        block = entries[start:start + 100]
+        blocks.append(f"{len(block)} beginbfchar\n" + "\n".join(block) + "\nendbfchar")
+    return (
+        "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+        "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+        "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+        + "\n".join(blocks)
+        + "\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+    ).encode("ascii")
+
+
+def write_pdf(path: str, paragraphs: List[str], chars_per_line: int = 40, lines_per_page: int = 50):
+    """生成可被PyPDF2提取中英文文本的最小PDF（Type0字体 + Identity-H + ToUnicode）"""
+    lines = []
+    for paragraph in paragraphs:
+        for start in range(0, len(paragraph), chars_per_line):
+            lines.append(paragraph[start:start + chars_per_line])
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects: Dict[int, bytes] = {}
+    objects[3] = (
+        b"<< /Type /Font /Subtype /Type0 /BaseFont /SimSun /Encoding /Identity-H "
+        b"/DescendantFonts [4 0 R] /ToUnicode 5 0 R >>"
+    )
+    objects[4] = (
+        b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /SimSun "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+        b"/FontDescriptor 6 0 R /DW 1000 /CIDToGIDMap /Identity >>"
+    )
+    code_points = {ord(ch) for line in lines for ch in line if ord(ch) <= 0xFFFF}
+    cmap = zlib.compress(_pdf_to_unicode_cmap(code_points))
+    objects[5] = b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(cmap) + cmap + b"\nendstream"
+    objects[6] = (
+        b"<< /Type /FontDescriptor /FontName /SimSun /Flags 6 /FontBBox [0 -141 1000 859] "
+        b"/ItalicAngle 0 /Ascent 859 /Descent -141 /CapHeight 683 /StemV 80 >>"
+    )
+
+    page_ids = []
+    next_id = 7
+    for page_lines in pages:
+        commands = ["BT", "/F1 12 Tf", "14 TL", "50 800 Td"]
+        for line in page_lines:
+            encoded = "".join(f"{ord(ch):04X}" for ch in line if ord(ch) <= 0xFFFF)
+            commands.append(f"<{encoded}> Tj T*")
+        commands.append("ET")
+        content = zlib.compress("\n".join(commands).encode("ascii"))
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        objects[content_id] = b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(page_id)
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[2] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(output)
+        output += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+    xref_offset = len(output)
+    count = max(objects) + 1
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % count
+    for obj_id in range(1, count):
+        output += b"%010d 00000 n \n" % offsets[obj_id]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref_offset)
+
+    with open(path, "wb") as file:
+        file.write(output)
+
+
+_WRITERS = {"txt": write_txt, "md": write_markdown, "docx": write_docx, "pdf": write_pdf}
+
+
+def generate_corpus(output_dir: str, files_per_format: int = 10, size_kb: int = 64,
+                    formats=FORMATS, seed: int = 42) -> Dict[str, List[str]]:
+    """生成合成语料，返回 {格式: [文件路径]}"""
+    os.makedirs(output_dir, exist_ok=True)
+    generator = CorpusGenerator(seed=seed)
+    # 中文字符占3字节，按字符数近似控制文件大小
+    size_chars = size_kb * 1024 // 2
+    corpus = {}
+    for fmt in formats:
+        paths = []
+        for i in range(files_per_format):
+            path = os.path.join(output_dir, f"synthetic_{i:04d}.{fmt}")
+            _WRITERS[fmt](path, generator.paragraphs(size_chars))
+            paths.append(path)
+        corpus[fmt] = paths
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成中英文混合的合成测试语料")
+    parser.add_argument("--output", default="./bench_corpus", help="输出目录")
+    parser.add_argument("--files", type=int, default=10, help="每种格式的文件数")
+    parser.add_argument("--size-kb", type=int, default=64, help="单个文件的大致大小（KB）")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="逗号分隔的格式列表")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.output, args.files, args.size_kb, args.formats.split(","), args.seed)
+    for fmt, paths in corpus.items():
+        print(f"✅ {fmt}: {len(paths)} 个文件")
+
+
+if __name__ == "__main__":
+    main()
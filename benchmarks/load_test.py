@@ -0,0 +1,287 @@
+"""端到端并发压测 - 逐级提高模拟用户数，测量问答路径的吞吐、延迟分位数和各阶段排队时间
+
+问答通过 SessionManager + QAAgent 执行（每个模拟用户一个会话），模型替换为延迟服从对数正态分布的桩模型；
+可同时在后台按固定速率导入文档，观察导入对问答的影响。完全离线运行。
+
+使用方法：
+    # 首次运行生成并导入合成语料，之后复用保存的向量库
+    python -m benchmarks.load_test --db ./bench_db --build-corpus --levels 1,4,16,64 --duration 10
+    python -m benchmarks.load_test --db ./bench_db --levels 1,4,16,64,128 --ingest-rate 2 --output load.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+
+from agents.document_agent import DocumentAgent
+from agents.qa_agent import QAAgent
+from agents.session_manager import SessionManager
+from benchmarks.common import percentiles, environment_info, write_results
+from benchmarks.corpus import generate_corpus, CorpusGenerator
+from utils.bounded_memory import BoundedMemory
+from utils.embeddings import HashEmbeddingFunction
+from utils.stub_model import StubChatModel
+from utils.vector_store import VectorStore
+
+
+class StageRecorder:
+    """记录每个请求各阶段的开始和结束时间"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[tuple]] = defaultdict(list)
+
+    def record(self, stage: str, queue_s: float, service_s: float):
+        with self._lock:
+            self.samples[stage].append((queue_s, service_s))
+
+    def reset(self) -> Dict[str, List[tuple]]:
+        with self._lock:
+            samples, self.samples = self.samples, defaultdict(list)
+        return samples
+
+
+class RecordingVectorStore:
+    """向量存储代理：记录检索在线程池中的排队时间和执行时间
+
+    QAAgent 在事件循环线程中取得 ``self.vector_store.search`` 再提交到线程池，
+    ``search`` 属性求值时记下提交时间，真正开始执行时即可得到排队时间。
+    """
+
+    def __init__(self, vector_store: VectorStore, recorder: StageRecorder):
+        self._vector_store = vector_store
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._vector_store, name)
+
+    @property
+    def search(self):
+        submitted_at = time.perf_counter()
+
+        def timed_search(query: str, n_results: int = 5):
+            start = time.perf_counter()
+            try:
+                return self._vector_store.search(query, n_results)
+            finally:
+                self._recorder.record("search", start - submitted_at, time.perf_counter() - start)
+
+        return timed_search
+
+    def sync_source(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._vector_store.sync_source(*args, **kwargs)
+        finally:
+            self._recorder.record("store", 0.0, time.perf_counter() - start)
+
+
+class RecordingModel:
+    """模型代理：记录模型调用耗时"""
+
+    def __init__(self, model: StubChatModel, recorder: StageRecorder):
+        self._model = model
+        self._recorder = recorder
+        self.model_name = model.model_name
+
+    async def __call__(self, messages, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await self._model(messages, **kwargs)
+        finally:
+            self._recorder.record("model", 0.0, time.perf_counter() - start)
+
+
+class QuestionMix:
+    """按权重生成问题：短问题、长问题和不触发检索的问候"""
+
+    def __init__(self, weights: Dict[str, float], seed: int = 0):
+        self.weights = weights
+        self.random = random.Random(seed)
+        self.generator = CorpusGenerator(seed=seed)
+
+    def next(self) -> str:
+        kind = self.random.choices(list(self.weights), weights=list(self.weights.values()))[0]
+        if kind == "greeting":
+            return "你好，你有哪些功能？"
+        if kind == "long":
+            return self.generator.paragraph()[:300] + " 请详细说明。"
+        return self.generator.sentence()[:40] + "？"
+
+
+async def simulated_user(user_id: int, manager: SessionManager, mix: QuestionMix, deadline: float,
+                         think_time: float, latencies: List[float]):
+    """闭环模拟用户：提问 -> 等待回答 -> 思考 -> 再提问"""
+    rng = random.Random(user_id)
+    while time.perf_counter() < deadline:
+        question = mix.next()
+        start = time.perf_counter()
+        await manager.ask_async(f"user-{user_id}", question)
+        latencies.append(time.perf_counter() - start)
+        if think_time > 0:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def background_ingest(agent: DocumentAgent, paths: List[str], rate: float, deadline: float,
+                            recorder: StageRecorder, sources: List[str]) -> int:
+    """按固定速率（文件/秒）后台导入文档，导入的来源记录在 sources 中以便结束后清理"""
+    if rate <= 0 or not paths:
+        return 0
+    done = 0
+    interval = 1 / rate
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        source = f"load_test_{len(sources)}"
+        sources.append(source)
+        await agent.process_document_async(paths[done % len(paths)], source=source)
+        elapsed = time.perf_counter() - start
+        recorder.record("ingest_file", 0.0, elapsed)
+        done += 1
+        await asyncio.sleep(max(0.0, interval - elapsed))
+    return done
+
+
+def summarize_stages(samples: Dict[str, List[tuple]]) -> Dict[str, Any]:
+    summary = {}
+    for stage, values in samples.items():
+        summary[stage] = {
+            "count": len(values),
+            "queue_ms": percentiles([queue * 1000 for queue, _ in values], (50, 95, 99)),
+            "service_ms": percentiles([service * 1000 for _, service in values], (50, 95, 99))
+        }
+    return summary
+
+
+async def run_level(users: int, args, manager: SessionManager, document_agent: DocumentAgent,
+                    ingest_paths: List[str], recorder: StageRecorder, sources: List[str]) -> Dict[str, Any]:
+    """以给定并发运行一轮"""
+    mix = QuestionMix(
+        {"short": args.mix_short, "long": args.mix_long, "greeting": args.mix_greeting},
+        seed=users
+    )
+    recorder.reset()
+    latencies: List[float] = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    ingest_task = asyncio.create_task(
+        background_ingest(document_agent, ingest_paths, args.ingest_rate, deadline, recorder, sources)
+    )
+    await asyncio.gather(*[
+        simulated_user(i, manager, mix, deadline, args.think_time, latencies) for i in range(users)
+    ])
+    ingested = await ingest_task
+    elapsed = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "elapsed_s": elapsed,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": percentiles([latency * 1000 for latency in latencies], (50, 95, 99)),
+        "ingested_files": ingested,
+        "stages": summarize_stages(recorder.reset())
+    }
+
+
+def prepare_store(args, temp_dir: str) -> tuple:
+    """打开（必要时生成并导入）保存的语料向量库"""
+    db_dir = args.db or os.path.join(temp_dir, "chroma_db")
+    vector_store = VectorStore(
+        persist_directory=db_dir,
+        collection_name="load_test",
+        embedding_function=HashEmbeddingFunction(dim=args.dim)
+    )
+    corpus_dir = os.path.join(args.db or temp_dir, "corpus")
+    paths: List[str] = []
+    if args.build_corpus or vector_store.collection.count() == 0:
+        corpus = generate_corpus(corpus_dir, args.corpus_files, args.size_kb, ("txt", "md"), seed=args.seed)
+        paths = [path for group in corpus.values() for path in group]
+        agent = DocumentAgent(model=None, vector_store=vector_store)
+        agent.batch_process_documents(paths)
+    elif os.path.isdir(corpus_dir):
+        paths = [os.path.join(corpus_dir, name) for name in sorted(os.listdir(corpus_dir))]
+    return vector_store, paths
+
+
+async def run_all(args, vector_store: VectorStore, ingest_paths: List[str]) -> List[Dict[str, Any]]:
+    recorder = StageRecorder()
+    store = RecordingVectorStore(vector_store, recorder)
+    model = RecordingModel(
+        StubChatModel(latency_median=args.model_latency, latency_sigma=args.model_sigma, seed=args.seed),
+        recorder
+    )
+    qa_agent = QAAgent(model=model, vector_store=store)
+    document_agent = DocumentAgent(model=None, vector_store=store)
+    manager = SessionManager(qa_agent, max_sessions=max(args.levels) * 2, idle_timeout=0,
+                             memory_factory=lambda: BoundedMemory(max_turns=10))
+
+    results = []
+    sources: List[str] = []
+    for users in args.levels:
+        level = await run_level(users, args, manager, document_agent, ingest_paths, recorder, sources)
+        results.append(level)
+        print(
+            f"👥 {users:5d} 用户 | {level['throughput_rps']:8.1f} req/s | "
+            f"p50 {level['latency_ms']['p50']:8.1f} ms | p95 {level['latency_ms']['p95']:8.1f} ms | "
+            f"p99 {level['latency_ms']['p99']:8.1f} ms"
+        )
+
+    # 清理压测期间后台导入的文档，保证保存的语料可重复使用
+    for source in sources:
+        vector_store.delete_by_source(source)
+    return results
+
+
+def find_knee(levels: List[Dict[str, Any]], p95_limit_ms: float) -> Optional[int]:
+    """延迟崩溃点：p95超过上限，或吞吐不再随并发提升时的用户数"""
+    best = 0.0
+    for level in levels:
+        if level["latency_ms"]["p95"] > p95_limit_ms or level["throughput_rps"] < best * 1.05:
+            return level["users"]
+        best = max(best, level["throughput_rps"])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DocMate 问答路径并发压测")
+    parser.add_argument("--db", default=None, help="保存的语料向量库目录（默认使用临时目录）")
+    parser.add_argument("--build-corpus", action="store_true", help="生成并导入合成语料")
+    parser.add_argument("--corpus-files", type=int, default=20, help="每种格式生成的文件数")
+    parser.add_argument("--size-kb", type=int, default=32, help="合成文件的大致大小（KB）")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64", help="逗号分隔的并发用户数")
+    parser.add_argument("--duration", type=float, default=10, help="每级并发持续时间（秒）")
+    parser.add_argument("--think-time", type=float, default=0.0, help="用户两次提问间的平均思考时间（秒）")
+    parser.add_argument("--model-latency", type=float, default=0.8, help="桩模型延迟中位数（秒）")
+    parser.add_argument("--model-sigma", type=float, default=0.5, help="桩模型延迟对数正态分布的sigma")
+    parser.add_argument("--mix-short", type=float, default=0.7, help="短问题权重")
+    parser.add_argument("--mix-long", type=float, default=0.2, help="长问题权重")
+    parser.add_argument("--mix-greeting", type=float, default=0.1, help="问候（不检索）权重")
+    parser.add_argument("--ingest-rate", type=float, default=0.0, help="后台导入速率（文件/秒），0表示不导入")
+    parser.add_argument("--p95-limit-ms", type=float, default=5000, help="判定延迟崩溃的p95上限（毫秒）")
+    parser.add_argument("--dim", type=int, default=256, help="哈希嵌入维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--output", default=None, help="结果JSON输出路径")
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(",")]
+
+    with tempfile.TemporaryDirectory(prefix="docmate_load_") as temp_dir:
+        vector_store, ingest_paths = prepare_store(args, temp_dir)
+        print(f"📚 语料文档块: {vector_store.collection.count()}")
+        levels = asyncio.run(run_all(args, vector_store, ingest_paths))
+
+    write_results({
+        "benchmark": "load_test",
+        "environment": environment_info(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "levels": levels,
+        "knee_users": find_knee(levels, args.p95_limit_ms)
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
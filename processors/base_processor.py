@@ -0,0 +1,151 @@
+"""文档处理器基类"""
+import hashlib
+import io
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, BinaryIO
+
+from processors.chunk import ChunkBatch
+from utils.metrics import metrics
+
+# 内容定义分块的Gear哈希表：每个字符（按码位折叠到0-255）对应一个固定的32位随机数
+_GEAR = [int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), "big") for i in range(256)]
+# 内容定义分块时优先在这些字符之后切分
+_BREAK_CHARS = frozenset("。！？；.!?;\n")
+
+
+class BaseProcessor(ABC):
+    """文档处理器基类 - 子类实现 extract_text_from_stream，文件、字节和流三种输入以及分块和结果组装在这里统一完成"""
+    
+    # 写入元数据的文档类型
+    doc_type = "text"
+    
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, chunking: str = "fixed"):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # fixed: 按固定长度切分；content: 内容定义分块，修改一段文字只影响附近的块
+        if chunking not in ("fixed", "content"):
+            raise ValueError(f"不支持的分块方式: {chunking}")
+        self.chunking = chunking
+    
+    @abstractmethod
+    def extract_text_from_stream(self, stream: BinaryIO) -> str:
+        """从二进制流提取文本（上传内容、压缩包成员等不落盘的输入）"""
+    
+    def extract_text(self, file_path: str) -> str:
+        """从文件提取文本"""
+        with open(file_path, 'rb') as file:
+            return self.extract_text_from_stream(file)
+    
+    def extract_text_from_bytes(self, file_bytes: bytes) -> str:
+        """从字节内容提取文本"""
+        return self.extract_text_from_stream(io.BytesIO(file_bytes))
+    
+    def chunk_text(self, text: str) -> List[str]:
+        """将文本分块"""
+        if not text:
+            return []
+        if self.chunking == "content":
+            return self.chunk_text_content_defined(text)
+        
+        chunks = []
+        start = 0
+        text_length = len(text)
+        
+        while start < text_length:
+            end = start + self.chunk_size
+            if end > text_length:
+                end = text_length
+        
+            chunk = text[start:end]
+            chunks.append(chunk)
+        
+            if end == text_length:
+                break
+        
+            start = end - self.chunk_overlap
+        
+        return chunks
+    
+    def chunk_text_content_defined(self, text: str) -> List[str]:
+        """内容定义分块：切分点由Gear滚动哈希（约32个字符的窗口）决定，与块在文中的偏移无关
+
+        哈希命中后顺延到最近的句末标点再切分，块长度在 chunk_size/4 到 2*chunk_size 之间，平均约为 chunk_size。
+        插入或删除一段文字后，之后的切分点在下一个哈希命中处重新对齐，只有附近的块发生变化。
+        每块前面带上前一块末尾 chunk_overlap 个字符作为重叠。
+        """
+        import numpy as np
+
+        min_size = max(1, self.chunk_size // 4)
+        max_size = self.chunk_size * 2
+        # 每个位置命中的概率为 1/span，命中前的期望长度约为 span
+        span = max(1, self.chunk_size - min_size)
+        snap = max(1, self.chunk_size // 10)
+        text_length = len(text)
+
+        # 滚动哈希 h = (h << 1) + gear[c] 按 2^32 回绕，位置 p 的值只取决于 p 及之前的32个字符：
+        # h[p] = sum(gear[p - k] << k, k < 32)。用倍增在整个文本上向量化计算，5次数组运算代替逐字符循环
+        codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        hashes = np.array(_GEAR, dtype=np.uint32)[(codes ^ (codes >> 8)) & 0xFF]
+        width = 1
+        while width < 32:
+            shifted = hashes[:-width] << np.uint32(width)
+            hashes[width:] += shifted
+            width *= 2
+        # hits[i] 为哈希命中的位置 p（切分点在 p + 1）
+        hits = np.flatnonzero(hashes % np.uint32(span) == 0)
+
+        boundaries = []
+        start = 0
+        while start < text_length:
+            end = min(start + max_size, text_length)
+            cut = end
+            first = start + min_size - 1
+            # 离块开头不足32个字符的位置（min_size < 32 时才可能切分），窗口里不能包含上一块的字符，按块内前缀逐字符计算
+            if first < start + 31:
+                h = 0
+                for position in range(start, min(start + 31, end)):
+                    code = ord(text[position])
+                    h = ((h << 1) + _GEAR[(code ^ (code >> 8)) & 0xFF]) & 0xFFFFFFFF
+                    if position >= first and h % span == 0:
+                        cut = position + 1
+                        break
+            if cut == end:
+                index = int(np.searchsorted(hits, max(first, start + 31)))
+                if index < len(hits) and hits[index] < end:
+                    cut = int(hits[index]) + 1
+            # 顺延到附近的句末，让块尽量以完整句子结尾
+            if cut < end:
+                limit = min(cut + snap, end)
+                for candidate in range(cut, limit):
+                    if text[candidate - 1] in _BREAK_CHARS:
+                        cut = candidate
+                        break
+            boundaries.append((start, cut))
+            start = cut
+
+        overlap = min(self.chunk_overlap, min_size)
+        return [text[max(0, begin - overlap) if i else begin:end] for i, (begin, end) in enumerate(boundaries)]
+    
+    def build_chunks(self, file_path: str, text: str, extra_metadata: Dict[str, Any] = None) -> ChunkBatch:
+        """对提取出的文本分块，返回列式存储的文档块（元数据在写入向量库时才生成）"""
+        labels = {"processor": self.doc_type}
+        with metrics.span("processor.chunk", labels):
+            chunks = self.chunk_text(text)
+        metrics.inc("processor_chunks_total", len(chunks), labels)
+        
+        return ChunkBatch(file_path, self.doc_type, chunks, extra_metadata)
+    
+    def process_file(self, file_path: str) -> ChunkBatch:
+        """处理文件并返回分块结果"""
+        with open(file_path, 'rb') as file:
+            return self.process_stream(file, file_path)
+    
+    def process_stream(self, stream: BinaryIO, source: str) -> ChunkBatch:
+        """处理二进制流并返回分块结果，source 为元数据中记录的来源"""
+        with metrics.span("processor.extract", {"processor": self.doc_type}):
+            text = self.extract_text_from_stream(stream)
+        return self.build_chunks(source, text)
+    
+    def process_bytes(self, file_bytes: bytes, source: str) -> ChunkBatch:
+        """处理字节内容并返回分块结果"""
+        return self.process_stream(io.BytesIO(file_bytes), source)
@@ -0,0 +1,77 @@
+"""文档块类型 - 处理器、DocumentAgent 和 VectorStore 之间传递的紧凑表示
+
+一个文件的所有块放在一个 ``ChunkBatch`` 中按列存储：文本和ID各一个列表，来源、文档类型和附加元数据整个文件只存一份，
+块序号就是列表下标。Chroma 需要的元数据字典只在写入时按窗口生成，写完即释放；
+按下标访问或遍历得到的 ``Chunk`` 是使用 ``__slots__`` 的轻量视图。
+"""
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+
+class Chunk:
+    """单个文档块（ChunkBatch 中一行的视图）"""
+
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch: "ChunkBatch", index: int):
+        self.batch = batch
+        self.index = index
+
+    @property
+    def content(self) -> str:
+        return self.batch.texts[self.index]
+
+    @property
+    def chunk_id(self) -> Optional[str]:
+        return self.batch.ids[self.index] if self.batch.ids is not None else None
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.batch.metadata(self.index)
+
+    def __repr__(self):
+        return f"Chunk(source={self.batch.source!r}, index={self.index}, chars={len(self.content)})"
+
+
+class ChunkBatch:
+    """一个文件的全部文档块（列式存储）"""
+
+    __slots__ = ("source", "doc_type", "texts", "ids", "extra")
+
+    def __init__(self, source: str, doc_type: str, texts: List[str], extra: Optional[Dict[str, Any]] = None):
+        self.source = source
+        self.doc_type = doc_type
+        self.texts = texts
+        # 文档块ID由 DocumentAgent 按最终来源生成
+        self.ids: Optional[List[str]] = None
+        # 所有块共享的附加元数据（如OCR语言）
+        self.extra = extra
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __bool__(self):
+        return bool(self.texts)
+
+    def __getitem__(self, index: int) -> Chunk:
+        if index < 0:
+            index += len(self.texts)
+        if not 0 <= index < len(self.texts):
+            raise IndexError(index)
+        return Chunk(self, index)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        for index in range(len(self.texts)):
+            yield Chunk(self, index)
+
+    def metadata(self, index: int) -> Dict[str, Any]:
+        """生成第 index 个块写入向量库的元数据"""
+        metadata = {"source": self.source, "type": self.doc_type, "chunk_index": index}
+        if self.extra:
+            metadata.update(self.extra)
+        return metadata
+
+    def metadatas(self, positions: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """生成指定位置（默认全部）的元数据列表"""
+        if positions is None:
+            positions = range(len(self.texts))
+        return [self.metadata(index) for index in positions]
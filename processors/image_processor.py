@@ -1,26 +1,49 @@
 """图片OCR处理器"""
-from PIL import Image
-import pytesseract
-from typing import List, Dict, Any
+from typing import List, BinaryIO, TYPE_CHECKING
 import os
 
+from processors.base_processor import BaseProcessor
+from processors.chunk import ChunkBatch
+from utils.metrics import metrics
 
-class ImageProcessor:
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class ImageProcessor(BaseProcessor):
     """图片OCR处理类"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, tesseract_cmd: str = None):
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
+    doc_type = "image_ocr"
+    
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, tesseract_cmd: str = None,
+                 chunking: str = "fixed"):
+        super().__init__(chunk_size, chunk_overlap, chunking)
+        
+        # 设置tesseract路径（如果提供），首次OCR时生效
+        self.tesseract_cmd = tesseract_cmd
+    
+    def _get_tesseract(self):
+        """导入pytesseract并设置tesseract路径"""
+        import pytesseract
         
-        # 设置tesseract路径（如果提供）
-        if tesseract_cmd:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        if self.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+        return pytesseract
     
     def extract_text(self, file_path: str, lang: str = 'chi_sim+eng') -> str:
         """从图片文件提取文本"""
+        with open(file_path, 'rb') as file:
+            return self.extract_text_from_stream(file, lang)
+    
+    def extract_text_from_stream(self, stream: BinaryIO, lang: str = 'chi_sim+eng') -> str:
+        """从图片流提取文本"""
+        from PIL import Image
+        
         try:
+            pytesseract = self._get_tesseract()
+            
             # 打开图片
-            image = Image.open(file_path)
+            image = Image.open(stream)
             
             # 使用OCR提取文本
             text = pytesseract.image_to_string(image, lang=lang)
@@ -29,8 +52,10 @@ class ImageProcessor:
         except Exception as e:
             raise Exception(f"图片OCR处理错误: {str(e)}")
     
-    def preprocess_image(self, image_path: str) -> Image.Image:
+    def preprocess_image(self, image_path: str) -> "Image.Image":
         """预处理图片以提高OCR准确性"""
+        from PIL import Image
+        
         try:
             image = Image.open(image_path)
             
@@ -44,47 +69,16 @@ class ImageProcessor:
         except Exception as e:
             raise Exception(f"图片预处理错误: {str(e)}")
     
-    def chunk_text(self, text: str) -> List[str]:
-        """将文本分块"""
-        if not text:
-            return []
-        
-        chunks = []
-        start = 0
-        text_length = len(text)
-        
-        while start < text_length:
-            end = start + self.chunk_size
-            if end > text_length:
-                end = text_length
-            
-            chunk = text[start:end]
-            chunks.append(chunk)
-            
-            if end == text_length:
-                break
-            
-            start = end - self.chunk_overlap
-        
-        return chunks
-    
-    def process_file(self, file_path: str, lang: str = 'chi_sim+eng') -> List[Dict[str, Any]]:
+    def process_file(self, file_path: str, lang: str = 'chi_sim+eng') -> ChunkBatch:
         """处理图片文件并返回OCR分块结果"""
-        text = self.extract_text(file_path, lang)
-        chunks = self.chunk_text(text)
-        
-        return [
-            {
-                "content": chunk,
-                "metadata": {
-                    "source": file_path,
-                    "type": "image_ocr",
-                    "chunk_index": i,
-                    "ocr_language": lang
-                }
-            }
-            for i, chunk in enumerate(chunks)
-        ]
+        with open(file_path, 'rb') as file:
+            return self.process_stream(file, file_path, lang)
+    
+    def process_stream(self, stream: BinaryIO, source: str, lang: str = 'chi_sim+eng') -> ChunkBatch:
+        """处理图片流并返回OCR分块结果"""
+        with metrics.span("processor.extract", {"processor": self.doc_type}):
+            text = self.extract_text_from_stream(stream, lang)
+        return self.build_chunks(source, text, {"ocr_language": lang})
     
     def get_supported_formats(self) -> List[str]:
         """获取支持的图片格式"""
@@ -1,22 +1,31 @@
 """Markdown文档处理器"""
-import markdown
-from typing import List, Dict, Any
 import re
+from typing import List, Dict, BinaryIO
 
+from processors.base_processor import BaseProcessor
 
-class MarkdownProcessor:
+
+class MarkdownProcessor(BaseProcessor):
     """Markdown文档处理类"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
-        self.md = markdown.Markdown(extensions=['meta', 'toc'])
+    doc_type = "markdown"
+    
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, chunking: str = "fixed"):
+        super().__init__(chunk_size, chunk_overlap, chunking)
+        self._md = None
+    
+    @property
+    def md(self):
+        """Markdown转换器，首次使用时创建"""
+        if self._md is None:
+            import markdown
+            self._md = markdown.Markdown(extensions=['meta', 'toc'])
+        return self._md
     
-    def extract_text(self, file_path: str) -> str:
-        """从Markdown文件提取文本"""
+    def extract_text_from_stream(self, stream: BinaryIO) -> str:
+        """从Markdown流提取文本"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            content = stream.read().decode('utf-8')
             
             # 转换为HTML然后提取纯文本
             html = self.md.convert(content)
@@ -58,45 +67,4 @@ class MarkdownProcessor:
             
             return sections
         except Exception as e:
-            raise Exception(f"Markdown章节提取错误: {str(e)}")
-    
-    def chunk_text(self, text: str) -> List[str]:
-        """将文本分块"""
-        if not text:
-            return []
-        
-        chunks = []
-        start = 0
-        text_length = len(text)
-        
-        while start < text_length:
-            end = start + self.chunk_size
-            if end > text_length:
-                end = text_length
-            
-            chunk = text[start:end]
-            chunks.append(chunk)
-            
-            if end == text_length:
-                break
-            
-            start = end - self.chunk_overlap
-        
-        return chunks
-    
-    def process_file(self, file_path: str) -> List[Dict[str, Any]]:
-        """处理Markdown文件并返回分块结果"""
-        text = self.extract_text(file_path)
-        chunks = self.chunk_text(text)
-        
-        return [
-            {
-                "content": chunk,
-                "metadata": {
-                    "source": file_path,
-                    "type": "markdown",
-                    "chunk_index": i
-                }
-            }
-            for i, chunk in enumerate(chunks)
-        ]
\ No newline at end of file
+            raise Exception(f"Markdown章节提取错误: {str(e)}")
\ No newline at end of file
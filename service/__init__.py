@@ -0,0 +1 @@
+# Service package
\ No newline at end of file
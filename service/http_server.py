@@ -0,0 +1,637 @@
+"""本地HTTP服务 - 基于asyncio的常驻服务模式，提供文档导入和问答接口
+
+使用方法：
+    python simple_document_qa.py serve [--host 127.0.0.1] [--port 8765] [--stub-llm]
+    python simple_document_qa.py serve --read-only --workers 4   # 多进程只读问答，检索共享的内存映射索引
+
+接口：
+    GET    /status              系统状态（文档块数量、会话、导入队列）
+    GET    /metrics             阶段耗时与计数指标（Prometheus文本格式，?format=json 返回JSON）
+    POST   /ingest              导入文档：JSON {"path": "..."} / {"paths": [...]}，
+                                或上传文件内容：POST /ingest?filename=report.pdf（请求体为文件字节），
+                                来源记录为 upload://<namespace>/report.pdf（?namespace= 或 ?session_id=，默认 default），
+                                同一命名空间下再次上传同名文件会替换旧版本
+    GET    /jobs/<job_id>       查询导入任务状态
+    POST   /ask                 问答：JSON {"question": "...", "session_id": "...", "stream": false}
+                                不传 session_id 时创建新会话，响应中返回 session_id，继续对话时带上它
+                                stream 为真时返回分块NDJSON事件（accepted → answer… → done，出错时为 error），
+                                模型调用不是流式的，answer 事件在完整回答生成后才发出
+                                （多worker只读模式下会话记忆只保存在处理该请求的进程中，见下）
+    DELETE /documents?source=   删除指定来源的所有文档块
+    DELETE /sessions/<id>       删除会话
+    POST   /publish             把当前向量库发布为共享只读索引的新世代（JSON {"full": true} 强制完整快照）
+    POST   /reindex             在后台按当前配置重建索引，完成后原子切换（进度见 /status 的 index 字段）
+
+只读模式下（--read-only）只提供 status、metrics、ask 和 sessions 接口，导入、删除、发布和重建由写入进程负责；
+多个 worker 进程通过 SO_REUSEPORT 监听同一端口，由内核分配连接。
+会话记忆（session_id 的对话历史）保存在各 worker 进程内、不共享：同一会话的后续请求可能落到另一个 worker，
+丢失之前的对话历史，DELETE /sessions/<id> 也可能返回 404。需要多轮会话时使用单个 worker，
+或在前端代理按 session_id 把请求固定转发到同一个 worker（各 worker 分别监听不同端口）。
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import posixpath
+import signal
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Callable
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from agents.document_agent import DocumentAgent
+from agents.session_manager import SessionManager
+from utils.metrics import metrics
+
+
+_STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout"
+}
+
+
+class HTTPError(Exception):
+    """请求处理错误，携带HTTP状态码"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    """解析后的HTTP请求"""
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = unquote(parts.path).rstrip("/") or "/"
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+    def json(self) -> Dict[str, Any]:
+        """解析JSON请求体"""
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HTTPError(400, f"请求体不是合法的JSON: {str(e)}")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "请求体必须是JSON对象")
+        return data
+
+
+def _normalize_upload_path(value: str) -> str:
+    path = posixpath.normpath("/" + value.replace("\\", "/")).lstrip("/")
+    return "" if path == "." else path
+
+
+def _upload_source(filename: str, namespace: Optional[str] = None) -> str:
+    """上传文件的来源：upload://<命名空间>/<文件路径>
+
+    命名空间由调用方提供（如用户或会话ID），未提供时为 default；同一命名空间下再次上传同名文件会替换旧版本，
+    不同命名空间的同名文件（如 report.pdf）互不覆盖。
+    """
+    path = _normalize_upload_path(filename)
+    if not path:
+        raise HTTPError(400, "无效的 filename 参数")
+    return f"upload://{_normalize_upload_path(namespace or '') or 'default'}/{path}"
+
+
+class IngestJob:
+    """后台导入任务"""
+
+    def __init__(self, kind: str, target: str, data: Optional[bytes] = None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.target = target
+        self.data = data
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "target": self.target,
+            "status": self.status,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class DocMateServer:
+    """DocMate HTTP服务
+
+    导入请求只入队并立即返回任务ID，由固定数量的后台worker顺序处理；
+    每个请求都有超时限制；关闭时先停止接收新连接，再等待进行中的请求和队列中的导入任务完成。
+    """
+
+    def __init__(
+        self,
+        document_agent: Optional[DocumentAgent],
+        session_manager: SessionManager,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        ingest_workers: int = 2,
+        request_timeout: float = 120,
+        max_body_bytes: int = 50 * 1024 * 1024,
+        shutdown_grace: float = 30,
+        max_jobs: int = 1000,
+        publisher=None,
+        publish_after_ingest: bool = False,
+        reuse_port: bool = False,
+        reindex: Optional[Callable[[], Dict[str, Any]]] = None
+    ):
+        # document_agent 为空时是只读服务：只提供问答，不接受导入和删除
+        self.document_agent = document_agent
+        self.session_manager = session_manager
+        self.qa_agent = session_manager.qa_agent
+        self.host = host
+        self.port = port
+        self.ingest_workers = max(1, ingest_workers)
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self.shutdown_grace = shutdown_grace
+        self.max_jobs = max_jobs
+        # 共享只读索引的发布者，publish_after_ingest 为真时导入队列清空或删除来源后自动发布新世代
+        self.publisher = publisher
+        self.publish_after_ingest = publish_after_ingest
+        self.reuse_port = reuse_port
+        # 重建索引（SimpleDocumentQA.reindex），在线程池中执行，同一时刻只有一次
+        self.reindex = reindex
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._connections = set()
+        # 已发送分块响应头的连接，出错时不能再写状态行
+        self._chunked = set()
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._accepting = False
+        self._stopped: Optional[asyncio.Event] = None
+        self._publish_lock: Optional[asyncio.Lock] = None
+        self._reindex_future: Optional[asyncio.Future] = None
+
+    @property
+    def read_only(self) -> bool:
+        return self.document_agent is None
+
+    @classmethod
+    def from_config(cls, document_agent: Optional[DocumentAgent], session_manager: SessionManager,
+                    config: Optional[Dict[str, Any]] = None, reindex=None, **overrides) -> "DocMateServer":
+        """根据配置文件中的 server 段创建服务，写入服务同时根据 serving 段创建索引发布者"""
+        server_config = dict((config or {}).get("server", {}))
+        server_config.update({key: value for key, value in overrides.items() if value is not None})
+        serving_config = (config or {}).get("serving", {})
+        publisher = None
+        if document_agent is not None and serving_config.get("index_dir"):
+            from utils.shared_index import IndexPublisher
+
+            publisher = IndexPublisher.from_config(config)
+        return cls(
+            document_agent=document_agent,
+            session_manager=session_manager,
+            host=server_config.get("host", "127.0.0.1"),
+            port=server_config.get("port", 8765),
+            ingest_workers=server_config.get("ingest_workers", 2),
+            request_timeout=server_config.get("request_timeout", 120),
+            max_body_bytes=int(server_config.get("max_body_mb", 50) * 1024 * 1024),
+            shutdown_grace=server_config.get("shutdown_grace", 30),
+            publisher=publisher,
+            publish_after_ingest=serving_config.get("publish_after_ingest", False),
+            reuse_port=server_config.get("reuse_port", False),
+            reindex=reindex
+        )
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """启动监听和导入worker"""
+        self._queue = asyncio.Queue()
+        self._stopped = asyncio.Event()
+        self._publish_lock = asyncio.Lock()
+        if not self.read_only:
+            self._workers = [
+                asyncio.create_task(self._ingest_worker(i)) for i in range(self.ingest_workers)
+            ]
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, reuse_port=self.reuse_port or None
+        )
+        self._accepting = True
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """运行直到收到停止信号"""
+        if self._server is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, lambda: asyncio.ensure_future(self.shutdown()))
+            except (NotImplementedError, RuntimeError):
+                # Windows 不支持 add_signal_handler，依赖 KeyboardInterrupt
+                pass
+        mode = "只读" if self.read_only else "读写"
+        print(f"🌐 DocMate {mode}服务已启动: http://{self.host}:{self.port}（进程 {os.getpid()}）")
+        try:
+            await self._stopped.wait()
+        finally:
+            if self._accepting:
+                await self.shutdown()
+
+    async def shutdown(self):
+        """优雅关闭：停止接收连接，等待进行中的请求和导入任务完成"""
+        if not self._accepting:
+            return
+        self._accepting = False
+        print("🛑 正在关闭服务...")
+
+        self._server.close()
+        await self._server.wait_closed()
+
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=self.shutdown_grace)
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.shutdown_grace)
+        except asyncio.TimeoutError:
+            print(f"⚠️ 仍有 {self._queue.qsize()} 个导入任务未完成")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._stopped.set()
+        print("👋 服务已关闭")
+
+    # ------------------------------------------------------------------
+    # 导入任务
+    # ------------------------------------------------------------------
+
+    def _submit_job(self, job: IngestJob) -> IngestJob:
+        if not self._accepting:
+            raise HTTPError(503, "服务正在关闭")
+        self._jobs[job.job_id] = job
+        # 只保留最近的任务记录
+        while len(self._jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in ("queued", "running"):
+                break
+            del self._jobs[oldest_id]
+        self._queue.put_nowait(job)
+        return job
+
+    async def _ingest_worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await self._run_job(job)
+                job.status = "done" if job.result.get("success") else "failed"
+            except Exception as e:
+                job.result = {"success": False, "error": str(e)}
+                job.status = "failed"
+            finally:
+                job.data = None
+                job.finished_at = time.time()
+                self._queue.task_done()
+            if self.publish_after_ingest and job.status == "done" and self._queue.empty():
+                await self._publish_quietly()
+
+    async def publish(self, full: bool = False) -> Optional[Dict[str, Any]]:
+        """在线程池中发布新的索引世代，同一时刻只有一次发布"""
+        if self.publisher is None:
+            raise HTTPError(400, "未配置共享索引目录（serving.index_dir）")
+        loop = asyncio.get_running_loop()
+        async with self._publish_lock:
+            return await loop.run_in_executor(None, self.publisher.publish, self.document_agent.vector_store, full)
+
+    def start_reindex(self):
+        """在线程池中开始重建索引并立即返回，重建期间检索和导入照常进行"""
+        if self.reindex is None:
+            raise HTTPError(400, "未启用重建索引")
+        if self._reindex_future is not None and not self._reindex_future.done():
+            raise HTTPError(409, "已有索引重建正在进行")
+        self._reindex_future = asyncio.get_running_loop().run_in_executor(None, self.reindex)
+
+    async def _publish_quietly(self):
+        """自动发布失败只记录日志，不影响导入和删除结果"""
+        try:
+            await self.publish()
+        except Exception as e:
+            print(f"⚠️ 自动发布索引失败: {str(e)}")
+
+    async def _run_job(self, job: IngestJob) -> Dict[str, Any]:
+        if job.kind == "path":
+            return await self.document_agent.process_document_async(job.target)
+
+        # 上传的文件内容直接在内存中处理（压缩包按成员逐个处理），元数据中的来源为 upload:// 开头的上传路径
+        return await self.document_agent.process_bytes_async(job.data, job.target)
+
+    # ------------------------------------------------------------------
+    # HTTP处理
+    # ------------------------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), timeout=self.request_timeout)
+                await asyncio.wait_for(self._dispatch(request, writer), timeout=self.request_timeout)
+            except HTTPError as e:
+                await self._send_error(writer, e.status, e.message)
+            except asyncio.TimeoutError:
+                await self._send_error(writer, 504, "请求超时")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            except Exception as e:
+                await self._send_error(writer, 500, str(e))
+        finally:
+            self._connections.discard(task)
+            self._chunked.discard(writer)
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "请求头过大")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "无效的请求行")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HTTPError(400, "无效的 Content-Length")
+        if length < 0:
+            raise HTTPError(400, "无效的 Content-Length")
+        if length > self.max_body_bytes:
+            raise HTTPError(413, f"请求体超过上限 {self.max_body_bytes} 字节")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, headers, body)
+
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter):
+        method, path = request.method, request.path
+
+        if path == "/status" and method == "GET":
+            await self._send_json(writer, 200, self.get_status())
+        elif path == "/metrics" and method == "GET":
+            if request.query.get("format") == "json":
+                await self._send_json(writer, 200, dict(enabled=metrics.enabled, **metrics.to_dict()))
+            else:
+                await self._send_body(writer, 200, "text/plain; version=0.0.4; charset=utf-8",
+                                      metrics.to_prometheus().encode("utf-8"))
+        elif path == "/ask" and method == "POST":
+            await self._handle_ask(request, writer)
+        elif path.startswith("/sessions/") and method == "DELETE":
+            removed = self.session_manager.remove_session(path[len("/sessions/"):])
+            await self._send_json(writer, 200 if removed else 404, {"removed": removed})
+        elif self.read_only and (path in ("/ingest", "/documents", "/publish", "/reindex") or path.startswith("/jobs/")):
+            raise HTTPError(405, "只读服务不支持导入、删除、发布和重建索引，请在写入进程中操作")
+        elif path == "/ingest" and method == "POST":
+            await self._handle_ingest(request, writer)
+        elif path.startswith("/jobs/") and method == "GET":
+            job = self._jobs.get(path[len("/jobs/"):])
+            if job is None:
+                raise HTTPError(404, "任务不存在")
+            await self._send_json(writer, 200, job.to_dict())
+        elif path == "/documents" and method == "DELETE":
+            source = request.query.get("source") or request.json().get("source")
+            if not source:
+                raise HTTPError(400, "缺少 source 参数")
+            deleted = await self.document_agent.delete_source_async(source)
+            if self.publish_after_ingest and deleted:
+                await self._publish_quietly()
+            await self._send_json(writer, 200, {"source": source, "deleted": deleted})
+        elif path == "/publish" and method == "POST":
+            pointer = await self.publish(full=bool(request.json().get("full")))
+            await self._send_json(writer, 200, {"generation": pointer})
+        elif path == "/reindex" and method == "POST":
+            self.start_reindex()
+            await self._send_json(writer, 202, {"index": self.document_agent.vector_store.get_stats()})
+        elif path in ("/status", "/metrics", "/ingest", "/ask", "/documents", "/publish", "/reindex") or path.startswith(("/jobs/", "/sessions/")):
+            raise HTTPError(405, f"不支持的请求方法: {method}")
+        else:
+            raise HTTPError(404, f"未知路径: {path}")
+
+    async def _handle_ingest(self, request: Request, writer: asyncio.StreamWriter):
+        filename = request.query.get("filename")
+        if filename:
+            if not request.body:
+                raise HTTPError(400, "上传内容为空")
+            namespace = request.query.get("namespace") or request.query.get("session_id")
+            jobs = [self._submit_job(IngestJob("upload", _upload_source(filename, namespace), request.body))]
+        else:
+            data = request.json()
+            paths = data.get("paths") or ([data["path"]] if data.get("path") else [])
+            if not paths:
+                raise HTTPError(400, "请提供 path、paths 或 filename 参数")
+            jobs = [self._submit_job(IngestJob("path", path)) for path in paths]
+
+        await self._send_json(writer, 202, {"jobs": [job.to_dict() for job in jobs]})
+
+    async def _handle_ask(self, request: Request, writer: asyncio.StreamWriter):
+        data = request.json()
+        question = (data.get("question") or "").strip()
+        if not question:
+            raise HTTPError(400, "缺少 question 参数")
+        # 未提供 session_id 时生成新会话（匿名请求互不共享记忆），客户端用响应中的 session_id 继续对话
+        session_id = data.get("session_id") or uuid.uuid4().hex
+
+        if not data.get("stream"):
+            response = await self.session_manager.ask_async(session_id, question)
+            await self._send_json(writer, 200, {"session_id": session_id, "answer": response.content})
+            return
+
+        # 分块传输的NDJSON事件：先立即返回 accepted，模型调用不是流式的，完整回答生成后再按行分成多个 answer 事件
+        await self._start_chunked(writer, 200, "application/x-ndjson; charset=utf-8")
+        await self._write_event(writer, {"event": "accepted", "session_id": session_id})
+        response = await self.session_manager.ask_async(session_id, question)
+        answer = response.content if isinstance(response.content, str) else str(response.content)
+        for line in answer.splitlines(keepends=True):
+            await self._write_event(writer, {"event": "answer", "delta": line})
+        await self._write_event(writer, {"event": "done"})
+        await self._end_chunked(writer)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取服务状态"""
+        if self.read_only:
+            status = self.qa_agent.vector_store.get_collection_info()
+        else:
+            status = self.document_agent.get_vector_store_info()
+            if hasattr(self.document_agent.vector_store, "rebuild"):
+                status["index"] = self.document_agent.vector_store.get_stats()
+        status.update({
+            "read_only": self.read_only,
+            "pid": os.getpid(),
+            "sessions": self.session_manager.get_stats(),
+            "ingest_queue": self._queue.qsize() if self._queue else 0,
+            "jobs": {
+                state: sum(1 for job in self._jobs.values() if job.status == state)
+                for state in ("queued", "running", "done", "failed")
+            }
+        })
+        return status
+
+    # ------------------------------------------------------------------
+    # 响应输出
+    # ------------------------------------------------------------------
+
+    async def _send_error(self, writer: asyncio.StreamWriter, status: int, message: str):
+        """返回错误；分块响应已经开始时（状态行已发送）改为写入 error 事件并结束分块"""
+        if writer not in self._chunked:
+            await self._send_json(writer, status, {"error": message})
+            return
+        await self._write_event(writer, {"event": "error", "status": status, "error": message})
+        await self._end_chunked(writer)
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        await self._send_body(writer, status, "application/json; charset=utf-8", body)
+
+    async def _send_body(self, writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes):
+        head = (
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def _start_chunked(self, writer: asyncio.StreamWriter, status: int, content_type: str):
+        head = (
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Transfer-Encoding: chunked\r\n"
+            f"Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        self._chunked.add(writer)
+        await writer.drain()
+
+    async def _end_chunked(self, writer: asyncio.StreamWriter):
+        self._chunked.discard(writer)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_event(self, writer: asyncio.StreamWriter, event: Dict[str, Any]):
+        data = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+
+def _serve(args):
+    """在当前进程中创建系统并运行服务（多进程只读模式下每个worker进程各执行一次）"""
+    from simple_document_qa import SimpleDocumentQA
+    from utils.stub_model import StubChatModel
+
+    model = StubChatModel() if args.stub_llm else None
+    qa_system = SimpleDocumentQA(config_path=args.config, model=model, read_only=args.read_only)
+    if qa_system.session_manager is None:
+        print("❌ 系统初始化失败，服务未启动")
+        return
+
+    server = DocMateServer.from_config(
+        qa_system.document_agent,
+        qa_system.session_manager,
+        qa_system.config,
+        reindex=None if args.read_only else qa_system.reindex,
+        host=args.host,
+        port=args.port,
+        reuse_port=args.workers > 1 or None
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_server(argv: Optional[List[str]] = None):
+    """命令行入口：启动本地HTTP服务"""
+    parser = argparse.ArgumentParser(description="DocMate 本地HTTP服务")
+    parser.add_argument("--config", default=os.path.join("config", "config.yaml"), help="配置文件路径")
+    parser.add_argument("--host", default=None, help="监听地址")
+    parser.add_argument("--port", type=int, default=None, help="监听端口")
+    parser.add_argument("--stub-llm", action="store_true", help="使用本地桩模型代替DashScope（测试用）")
+    parser.add_argument("--read-only", action="store_true", help="只读问答服务，检索写入进程发布的共享索引")
+    parser.add_argument("--workers", type=int, default=None, help="只读模式的worker进程数（默认使用 serving.workers）")
+    args = parser.parse_args(argv)
+
+    if args.workers is None:
+        import yaml
+
+        with open(args.config, "r", encoding="utf-8") as file:
+            config = yaml.safe_load(file) or {}
+        args.workers = config.get("serving", {}).get("workers", 1) if args.read_only else 1
+    if args.workers > 1 and not args.read_only:
+        print("❌ 多个worker进程只支持只读模式（--read-only），Chroma写入必须由单个进程完成")
+        return
+    if args.workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        print("❌ 当前平台不支持 SO_REUSEPORT，无法让多个worker进程监听同一端口")
+        return
+    if args.workers <= 1:
+        _serve(args)
+        return
+
+    print(f"⚠️ {args.workers} 个worker进程各自保存会话记忆：同一 session_id 的请求可能落到不同进程，"
+          f"多轮对话历史会丢失、删除会话可能返回404；需要会话时请使用 --workers 1 或按会话固定转发")
+    # 每个worker是独立进程（各自的GIL），共享同一份内存映射索引和监听端口
+    workers = [multiprocessing.Process(target=_serve, args=(args,), name=f"DocMateWorker-{i}") for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    def stop_workers(*_):
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop_workers)
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Ctrl+C 同时发给了所有worker，等待它们各自优雅关闭
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == "__main__":
+    run_server()
@@ -7,29 +7,110 @@
 
 import asyncio
 import os
+import threading
 import yaml
 from typing import Dict, Any, List
 
-from agentscope.model import DashScopeChatModel
-from agentscope.message import Msg
-
-from agents.document_agent import DocumentAgent
-from agents.qa_agent import QAAgent
 from utils.vector_store import VectorStore
+from utils.async_vector_store import AsyncVectorStore
+from utils.index_generations import IndexGenerations, copy_sources
+from utils.embeddings import create_embedding_function
+from utils.embedding_service import EmbeddingService
+from utils.metrics import metrics
+
+# agentscope、智能体和各文档处理器依赖较重，在首次使用时才导入，以加快启动速度
 
 
 class SimpleDocumentQA:
     """简单的文档问答系统"""
     
-    def __init__(self, config_path: str = "config\\config.yaml"):
-        """初始化系统"""
+    def __init__(self, config_path: str = os.path.join("config", "config.yaml"), model=None, read_only: bool = False):
+        """初始化系统，model 为空时根据配置创建DashScope模型（可传入桩模型用于本地测试）
+
+        read_only 为真时只提供问答：检索使用写入进程发布的共享只读索引（serving.index_dir），不打开Chroma。
+        """
         self.config = self.load_config(config_path)
-        self.vector_store = VectorStore()
+        self.read_only = read_only
+        metrics.configure(self.config.get("metrics"))
+        vector_config = self.config.get("vector_store", {})
+        embedding_function = create_embedding_function(vector_config.get("embedding_function"))
+        # 启用嵌入服务时，并发的查询和导入在同一个服务线程中合并批量计算嵌入
+        self.embedding_service = EmbeddingService.from_config(self.config, embedding_function)
+        if read_only:
+            from utils.shared_index import SharedIndexReader
+            
+            self.vector_store = SharedIndexReader.from_config(self.config, embedding_function, self.embedding_service)
+        else:
+            def create_store(collection_name: str) -> VectorStore:
+                return VectorStore(
+                    persist_directory=vector_config.get("persist_directory", "./chroma_db"),
+                    collection_name=collection_name,
+                    embedding_function=embedding_function,
+                    doc_index=vector_config.get("doc_index", False),
+                    top_documents=vector_config.get("top_documents", 20),
+                    embedding_service=self.embedding_service,
+                    query_cache_size=vector_config.get("query_cache_size", 1024)
+                )
+            
+            # 向量库按索引世代管理：智能体、异步门面和发布者共享同一个世代对象，
+            # 重建索引或清空存储时在新集合中准备好数据后原子切换，进行中的检索在旧集合上完成
+            self.vector_store = IndexGenerations.from_config(create_store, self.config)
+            threading.Thread(target=self.vector_store.collect_garbage, name="IndexGenerationGC", daemon=True).start()
+        # 智能体经异步门面访问向量库（专用读线程池、单写入线程合并小批量写入），未启用时为 None
+        self.async_store = AsyncVectorStore.from_config(self.vector_store, self.config)
         self.document_agent = None
         self.qa_agent = None
+        self.session_manager = None
+        self.ingest_queue = None
+        self.watchers = {}
+        # 重建索引时新世代的去重器（集合名, 去重器），切换时交给 DocumentAgent
+        self._next_deduplicator = None
+        self.warmup_report = None
+        self._warmup_thread = None
+        
+        # 常驻事件循环：问答在同一个循环中执行，记忆的后台摘要任务不会随单次调用结束而被取消
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="DocMateLoop", daemon=True)
+        self._loop_thread.start()
         
         # 初始化智能体
-        self.init_agents()
+        if self.init_agents(model):
+            self.start_warmup()
+    
+    def start_warmup(self):
+        """按配置预热：blocking 为真时同步执行，否则在后台线程中执行（预热期间的查询照常进行）"""
+        warmup_config = self.config.get("warmup", {})
+        if not warmup_config.get("enabled", True):
+            return
+        if warmup_config.get("blocking", False):
+            self.warmup()
+        else:
+            self._warmup_thread = threading.Thread(target=self.warmup, name="DocMateWarmup", daemon=True)
+            self._warmup_thread.start()
+    
+    def warmup(self) -> Dict[str, Any]:
+        """预热嵌入模型和索引，并把常见问题的嵌入预先放入查询缓存"""
+        warmup_config = self.config.get("warmup", {})
+        questions = list(warmup_config.get("questions") or [])
+        questions_file = warmup_config.get("questions_file")
+        if questions_file:
+            try:
+                with open(questions_file, "r", encoding="utf-8") as file:
+                    questions.extend(line.strip() for line in file if line.strip())
+            except OSError as e:
+                print(f"⚠️ 读取常见问题文件失败: {str(e)}")
+        
+        try:
+            self.warmup_report = self.vector_store.warmup(questions)
+        except Exception as e:
+            print(f"⚠️ 预热失败: {str(e)}")
+            return {}
+        report = self.warmup_report
+        print(
+            f"🔥 预热完成 - 嵌入模型 {report['model_seconds']:.2f}s，索引 {report['index_seconds']:.2f}s，"
+            f"常见问题 {report['questions']} 个 {report['questions_seconds']:.2f}s"
+        )
+        return report
     
     def load_config(self, config_path: str) -> Dict[str, Any]:
         """加载配置文件"""
@@ -40,8 +121,8 @@ class SimpleDocumentQA:
             print(f"❌ 加载配置文件失败: {str(e)}")
             return {}
     
-    def init_agents(self):
-        """初始化智能体"""
+    def create_model(self):
+        """检查API密钥并创建DashScope模型，失败时返回None"""
         try:
 
             # 1. 检查API密钥（现在是从环境变量解析后的值）
@@ -54,53 +135,133 @@ class SimpleDocumentQA:
                 print("   Windows: set DASHSCOPE_API_KEY=sk-xxx")
                 print("   Linux/Mac: export DASHSCOPE_API_KEY=sk-xxx")
                 print("   💡 获取API密钥: https://dashscope.console.aliyun.com/")
-                return False
+                return None
 
             # 3. 检查是否为环境变量占位符（没有被替换）
             if api_key.startswith("${") or api_key.startswith("$"):
                 print("❌ 错误: 环境变量未被正确替换")
                 print(f"   当前值: {api_key}")
                 print("   请确保设置了环境变量 DASHSCOPE_API_KEY")
-                return False
+                return None
 
             # 4. 检查密钥格式
             if not api_key.startswith("sk-"):
                 print("❌ 错误: API密钥格式不正确")
                 print("   DashScope密钥应以 'sk-' 开头")
                 print(f"   当前密钥: {api_key[:20]}...")
-                return False
+                return None
             
             # 设置环境变量，为了兼容性
             #os.environ["DASHSCOPE_API_KEY"] = api_key
             
             # 创建模型
-            model = DashScopeChatModel(
+            from agentscope.model import DashScopeChatModel
+            
+            return DashScopeChatModel(
                 model_name=self.config["model"]["model_name"],
                 api_key=api_key,
                 stream=False,
                 enable_thinking=False,
             )
             
+        except Exception as e:
+            print(f"❌ 模型创建失败: {str(e)}")
+            return None
+    
+    def init_agents(self, model=None):
+        """初始化智能体"""
+        try:
+            if model is None:
+                model = self.create_model()
+                if model is None:
+                    return False
+            
+            from agents.qa_agent import QAAgent
+            from agents.session_manager import SessionManager
+            from utils.bounded_memory import BoundedMemory
+            from utils.ingest_jobs import IngestionJobQueue
+            from utils.profiler import OperationProfiler
+            
             # 创建智能体
-            self.document_agent = DocumentAgent(
-                name="DocumentAgent",
-                model=model,
-                vector_store=self.vector_store
-            )
+            memory_config = self.config.get("memory", {})
+            ingestion_config = self.config.get("ingestion", {})
+            profiler = OperationProfiler.from_config(self.config.get("profiling"))
+            if self.read_only:
+                self.qa_agent = QAAgent(
+                    name="QAAgent",
+                    model=model,
+                    vector_store=self.vector_store,
+                    memory=BoundedMemory.from_config(memory_config),
+                    profiler=profiler,
+                    async_store=self.async_store
+                )
+                self.session_manager = SessionManager.from_config(self.qa_agent, self.config)
+                print(f"✅ 只读问答初始化成功 - 模型: {getattr(model, 'model_name', '未知')}")
+                return True
+            
+            self.document_agent = self._create_document_agent(model, self.vector_store, self.async_store, profiler)
+            if self.document_agent.deduplicator is not None:
+                self.vector_store.add_swap_listener(self._swap_deduplicator)
             
             self.qa_agent = QAAgent(
                 name="QAAgent",
                 model=model,
-                vector_store=self.vector_store
+                vector_store=self.vector_store,
+                memory=BoundedMemory.from_config(memory_config),
+                profiler=profiler,
+                async_store=self.async_store
+            )
+            
+            # 多会话共享同一个QAAgent（模型和向量存储），每个会话独立记忆
+            self.session_manager = SessionManager.from_config(self.qa_agent, self.config)
+            
+            # 后台导入任务在常驻事件循环中执行，导入期间可以继续问答
+            self.ingest_queue = IngestionJobQueue(
+                self.document_agent,
+                self._loop,
+                concurrency=ingestion_config.get("concurrency", 2),
+                max_jobs=ingestion_config.get("max_jobs", 100)
             )
             
-            print(f"✅ 系统初始化成功 - 模型: {self.config['model']['model_name']}")
+            print(f"✅ 系统初始化成功 - 模型: {getattr(model, 'model_name', '未知')}")
             return True
             
         except Exception as e:
             print(f"❌ 系统初始化失败: {str(e)}")
             return False
     
+    def _create_document_agent(self, model, vector_store, async_store=None, profiler=None):
+        """按配置创建文档处理智能体（重建索引时也用它向新世代导入）"""
+        from agents.document_agent import DocumentAgent
+        from utils.bounded_memory import BoundedMemory
+        from utils.dedupe import ChunkDeduplicator
+        
+        ingestion_config = self.config.get("ingestion", {})
+        dedupe_config = self.config.get("dedupe", {})
+        archive_config = ingestion_config.get("archive", {})
+        deduplicator = None
+        if dedupe_config.get("enabled", False):
+            deduplicator = ChunkDeduplicator.for_vector_store(vector_store, dedupe_config)
+        return DocumentAgent(
+            name="DocumentAgent",
+            model=model,
+            vector_store=vector_store,
+            memory=BoundedMemory.from_config(self.config.get("memory", {})),
+            profiler=profiler,
+            journal_dir=ingestion_config.get("journal_dir"),
+            processor_options={
+                "chunk_size": self.config.get("chunk_size", 1000),
+                "chunk_overlap": self.config.get("chunk_overlap", 200),
+                "chunking": self.config.get("chunking", "fixed")
+            },
+            deduplicator=deduplicator,
+            async_store=async_store,
+            archive_options={
+                "max_member_bytes": int(archive_config.get("max_member_mb", 256) * 1024 * 1024),
+                "buffer_bytes": int(archive_config.get("buffer_mb", 16) * 1024 * 1024)
+            }
+        )
+    
     def process_file(self, file_path: str) -> bool:
         """处理单个文件"""
         if not self.document_agent:
@@ -149,15 +310,101 @@ class SimpleDocumentQA:
             print(f"❌ 批量处理异常: {str(e)}")
             return 0
     
-    def ask_question(self, question: str) -> str:
-        """提问并获取答案"""
+    def submit_files(self, file_paths: List[str]):
+        """提交后台导入任务，立即返回任务对象（可通过 progress() 查看进度）"""
+        if not self.ingest_queue:
+            print("❌ 系统未初始化")
+            return None
+        
+        job = self.ingest_queue.submit(file_paths)
+        print(f"📥 已提交导入任务 {job.job_id}（{len(file_paths)} 个文件），可在菜单中查看进度")
+        return job
+    
+    def submit_directory(self, root: str, include: List[str] = None, exclude: List[str] = None):
+        """递归导入目录：边扫描边导入，include/exclude 为通配符列表（匹配相对路径或文件名）"""
+        if not self.ingest_queue:
+            print("❌ 系统未初始化")
+            return None
+        
+        scanner = self._create_scanner(root, include, exclude)
+        files = ((path, size) for path, _, size in scanner.scan())
+        job = self.ingest_queue.submit(files, journal_key=f"dir:{scanner.root}", name=scanner.root)
+        print(f"📥 已提交目录导入任务 {job.job_id}: {scanner.root}")
+        return job
+    
+    def watch_directory(self, root: str, include: List[str] = None, exclude: List[str] = None,
+                        interval: float = None):
+        """持续监视目录：按间隔重新扫描，只导入新增和修改的文件，删除已删除文件的文档块"""
+        if not self.ingest_queue:
+            print("❌ 系统未初始化")
+            return None
+        
+        from utils.file_scanner import DirectoryWatcher
+        
+        scanner = self._create_scanner(root, include, exclude)
+        if scanner.root in self.watchers:
+            print(f"⚠️ 目录已在监视中: {scanner.root}")
+            return self.watchers[scanner.root]
+        
+        def on_changes(changes):
+            self.ingest_queue.submit(
+                changes.added + changes.modified,
+                journal_key=f"dir:{scanner.root}",
+                deleted=changes.deleted,
+                name=f"{scanner.root} (+{len(changes.added)} ~{len(changes.modified)} -{len(changes.deleted)})"
+            )
+        
+        if interval is None:
+            interval = self.config.get("ingestion", {}).get("watch_interval", 60)
+        watcher = DirectoryWatcher(scanner, interval=interval, on_changes=on_changes)
+        self.watchers[scanner.root] = watcher
+        watcher.start()
+        print(f"👀 开始监视目录 {scanner.root}，每 {interval} 秒扫描一次")
+        return watcher
+    
+    def stop_watching(self, root: str = None):
+        """停止监视指定目录，root 为空时停止所有监视"""
+        roots = [os.path.abspath(root)] if root else list(self.watchers)
+        for key in roots:
+            watcher = self.watchers.pop(key, None)
+            if watcher is not None:
+                watcher.stop()
+    
+    def _create_scanner(self, root: str, include: List[str] = None, exclude: List[str] = None):
+        """根据配置创建目录扫描器，未指定 exclude 时使用配置中的默认值"""
+        if exclude is None:
+            exclude = self.config.get("ingestion", {}).get("exclude", [])
+        return self.document_agent.scan_directory(root, include=include, exclude=exclude)
+    
+    def get_ingest_jobs(self) -> List[Dict[str, Any]]:
+        """获取所有导入任务的进度"""
+        if not self.ingest_queue:
+            return []
+        
+        return [job.progress() for job in self.ingest_queue.list_jobs()]
+    
+    def cancel_ingest_job(self, job_id: str) -> bool:
+        """取消导入任务，已写入的文档块保留"""
+        if not self.ingest_queue:
+            return False
+        
+        return self.ingest_queue.cancel(job_id)
+    
+    def ask_question(self, question: str, session_id: str = None) -> str:
+        """提问并获取答案，指定 session_id 时使用该会话的独立记忆"""
         if not self.qa_agent:
             return "❌ 系统未初始化"
 
         try:
-            user_msg = Msg(name="user", content=question, role="user")
-            # 直接使用 asyncio.run() 调用异步的 __call__ 方法
-            response = asyncio.run(self.qa_agent(user_msg))
+            from agentscope.message import Msg
+            
+            if session_id is not None:
+                coro = self.session_manager.ask_async(session_id, question)
+            else:
+                coro = self.qa_agent(Msg(name="user", content=question, role="user"))
+            # 在常驻事件循环中调用异步的 __call__ 方法
+            future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+            response = future.result()
             return response.content
 
         except Exception as e:
@@ -165,6 +412,8 @@ class SimpleDocumentQA:
     
     def get_status(self) -> Dict[str, Any]:
         """获取系统状态"""
+        if self.read_only and self.qa_agent:
+            return self.vector_store.get_collection_info()
         if not self.document_agent:
             return {"error": "系统未初始化"}
         
@@ -177,14 +426,113 @@ class SimpleDocumentQA:
         
         return self.document_agent.get_supported_formats()
     
+    def publish_index(self, full: bool = False):
+        """把当前向量库发布为共享只读索引的新世代，供只读服务进程检索"""
+        if self.read_only:
+            print("❌ 只读模式不能发布索引")
+            return None
+        
+        from utils.shared_index import IndexPublisher
+        
+        try:
+            return IndexPublisher.from_config(self.config).publish(self.vector_store, full=full)
+        except Exception as e:
+            print(f"❌ 发布索引失败: {str(e)}")
+            return None
+    
     def clear_storage(self):
-        """清空存储"""
+        """清空存储：切换到一个空的新索引世代，所有智能体随之切换，旧集合在进行中的检索结束后删除"""
+        if self.read_only:
+            print("❌ 只读模式不能清空存储")
+            return
         try:
-            self.vector_store.delete_collection()
-            self.vector_store = VectorStore()  # 重新创建
+            self.vector_store.reset()
             print("✅ 存储已清空")
         except Exception as e:
             print(f"❌ 清空存储失败: {str(e)}")
+    
+    def reindex(self) -> Dict[str, Any]:
+        """按当前配置在新集合中重建索引，完成后原子切换（重建期间问答和导入照常进行），返回统计信息
+
+        磁盘上仍存在的文件（压缩包成员按所在的压缩包）重新解析和嵌入；已不存在的来源（如上传的文件）
+        连同嵌入从当前世代复制。重建期间被写入的来源在切换前按当前世代的状态追平。
+        """
+        if not self.document_agent:
+            print("❌ 系统未初始化")
+            return {}
+        
+        builder = {}
+        
+        def populate(store: VectorStore, sources: List[str] = None):
+            agent = builder.get("agent")
+            if agent is None:
+                agent = builder["agent"] = self._create_document_agent(self.document_agent.model, store)
+                self._next_deduplicator = (store.collection_name, agent.deduplicator)
+            self._populate_generation(agent, sources)
+        
+        try:
+            return self.vector_store.rebuild(populate)
+        except Exception as e:
+            agent = builder.get("agent")
+            if agent is not None and agent.deduplicator is not None:
+                self._discard_deduplicator(agent.deduplicator)
+            print(f"❌ 重建索引失败: {str(e)}")
+            return {}
+        finally:
+            self._next_deduplicator = None
+    
+    def _populate_generation(self, agent, sources: List[str] = None, batch_size: int = 32):
+        """向新世代导入来源：sources 为空时导入当前世代的所有来源，否则只追平这些来源（当前世代中已没有的来源从新世代删除）"""
+        current = self.vector_store.current
+        if sources is None:
+            sources = current.get_sources()
+            present = set(sources)
+        else:
+            present = set(current.get_sources({"source": {"$in": sources}}))
+        
+        files: Dict[str, List[str]] = {}
+        copies = []
+        for source in sources:
+            if source not in present:
+                agent.delete_source(source)
+                continue
+            # 压缩包成员按所在的压缩包重新导入
+            path = source.split("!/", 1)[0]
+            if os.path.isfile(path):
+                files.setdefault(path, []).append(source)
+            else:
+                copies.append(source)
+        
+        paths = sorted(files)
+        for start in range(0, len(paths), batch_size):
+            window = paths[start:start + batch_size]
+            results = asyncio.run(agent.batch_process_documents_async(window, resume=False))
+            for path, result in zip(window, results):
+                if not result.get("success"):
+                    # 用当前配置处理失败（如格式已不再支持）时保留原有的文档块
+                    copies.extend(files[path])
+        copy_sources(current, agent.vector_store, copies)
+    
+    def _swap_deduplicator(self, old_store: VectorStore, new_store: VectorStore):
+        """切换索引世代时替换与集合绑定的去重器：重建时使用导入新世代的去重器，清空存储时新建"""
+        from utils.dedupe import ChunkDeduplicator
+        
+        pending = self._next_deduplicator
+        if pending is not None and pending[0] == new_store.collection_name:
+            deduplicator = pending[1]
+        else:
+            deduplicator = ChunkDeduplicator.for_vector_store(new_store, self.config.get("dedupe", {}))
+        old = self.document_agent.deduplicator
+        self.document_agent.deduplicator = deduplicator
+        self._discard_deduplicator(old)
+    
+    @staticmethod
+    def _discard_deduplicator(deduplicator):
+        deduplicator.close()
+        try:
+            os.remove(deduplicator.db_path)
+        except OSError:
+            pass
 
 
 def main():
@@ -209,14 +557,20 @@ def main():
         print("3. 问答对话")
         print("4. 查看系统状态")
         print("5. 清空存储")
-        print("6. 退出")
+        print("6. 导入任务进度")
+        print("7. 导入目录")
+        print("8. 重建索引")
+        print("9. 退出")
         
-        choice = input("\n请输入选项 (1-6): ").strip()
+        choice = input("\n请输入选项 (1-9): ").strip()
         
         if choice == "1":
             file_path = input("请输入文件路径: ").strip()
             if file_path:
-                qa_system.process_file(file_path)
+                if os.path.exists(file_path):
+                    qa_system.submit_files([file_path])
+                else:
+                    print(f"❌ 文件不存在: {file_path}")
         
         elif choice == "2":
             file_paths_input = input("请输入文件路径 (用逗号分隔): ").strip()
@@ -225,7 +579,7 @@ def main():
                 # 过滤存在的文件
                 existing_files = [path for path in file_paths if os.path.exists(path)]
                 if existing_files:
-                    qa_system.process_files(existing_files)
+                    qa_system.submit_files(existing_files)
                 else:
                     print("❌ 没有找到有效的文件")
         
@@ -254,6 +608,31 @@ def main():
                 qa_system.clear_storage()
         
         elif choice == "6":
+            show_ingest_jobs(qa_system)
+        
+        elif choice == "7":
+            root = input("请输入目录路径: ").strip()
+            if not os.path.isdir(root):
+                print(f"❌ 目录不存在: {root}")
+                continue
+            include = [pattern.strip() for pattern in input("包含的通配符 (逗号分隔，回车表示全部): ").split(",") if pattern.strip()]
+            exclude = [pattern.strip() for pattern in input("排除的通配符 (逗号分隔，回车使用默认): ").split(",") if pattern.strip()]
+            if input("是否持续监视目录变化? (y/N): ").strip().lower() == 'y':
+                qa_system.watch_directory(root, include or None, exclude or None)
+            else:
+                qa_system.submit_directory(root, include or None, exclude or None)
+        
+        elif choice == "8":
+            confirm = input("按当前配置重建索引? (y/N): ").strip().lower()
+            if confirm == 'y':
+                qa_system.reindex()
+        
+        elif choice == "9":
+            qa_system.stop_watching()
+            active = qa_system.ingest_queue.active_jobs()
+            if active:
+                print(f"⏳ 正在取消 {len(active)} 个未完成的导入任务...")
+            qa_system.ingest_queue.close(wait=30)
             print("👋 再见!")
             break
         
@@ -261,6 +640,43 @@ def main():
             print("❌ 无效选项，请重新选择")
 
 
+def format_progress(progress: Dict[str, Any]) -> str:
+    """格式化单个导入任务的进度"""
+    status_icons = {"queued": "🕒", "running": "🔄", "completed": "✅", "cancelled": "⛔", "failed": "❌"}
+    eta = progress["eta_s"]
+    eta_text = f"，预计剩余 {eta:.0f}s" if eta is not None else ""
+    name_text = f" {progress['name']}" if progress.get("name") else ""
+    scanning_text = "+（扫描中）" if progress.get("scanning") else ""
+    deleted_text = f"，删除 {progress['files_deleted']}" if progress.get("files_deleted") else ""
+    return (
+        f"{status_icons.get(progress['status'], '•')} 任务 {progress['job_id']}{name_text} [{progress['status']}] "
+        f"文件 {progress['files_done']}/{progress['files_total']}{scanning_text}（失败 {progress['files_failed']}{deleted_text}），"
+        f"文档块 {progress['chunks_written']}，"
+        f"{progress['files_per_s']:.2f} 文件/s，{progress['chunks_per_s']:.1f} 块/s{eta_text}"
+    )
+
+
+def show_ingest_jobs(qa_system: SimpleDocumentQA):
+    """显示导入任务进度，可取消未完成的任务"""
+    jobs = qa_system.get_ingest_jobs()
+    if not jobs:
+        print("📭 暂无导入任务")
+        return
+    
+    for progress in jobs:
+        print(format_progress(progress))
+        for error in progress["errors"]:
+            print(f"   ❌ {error['file_path']}: {error['error']}")
+    
+    if any(progress["status"] in ("queued", "running") for progress in jobs):
+        job_id = input("\n输入任务ID取消任务（直接回车返回）: ").strip()
+        if job_id:
+            if qa_system.cancel_ingest_job(job_id):
+                print(f"⛔ 已请求取消任务 {job_id}，正在处理的文件完成后停止")
+            else:
+                print("❌ 任务不存在或已结束")
+
+
 def demo_usage():
     """演示用法"""
     print("📚 文档问答系统演示")
@@ -295,5 +711,13 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1 and sys.argv[1] == "demo":
         demo_usage()
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from service.http_server import run_server
+        run_server(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "publish":
+        # 发布共享只读索引的新世代：python simple_document_qa.py publish [--full]（发布不调用模型，使用桩模型即可）
+        from utils.stub_model import StubChatModel
+        
+        SimpleDocumentQA(model=StubChatModel()).publish_index(full="--full" in sys.argv[2:])
     else:
         main()
\ No newline at end of file
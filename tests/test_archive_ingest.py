@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+
+from agents.document_agent import DocumentAgent
+from utils.dedupe import ChunkDeduplicator
+from utils.embeddings import HashEmbeddingFunction
+from utils.file_scanner import DirectoryWatcher
+from utils.ingest_jobs import IngestionJobQueue
+from utils.vector_store import VectorStore
+
+
+def _write_zip(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, text in members.items():
+            archive.writestr(name, text)
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def _agent(tmp_path, dedupe: bool) -> DocumentAgent:
+    vector_store = VectorStore(persist_directory=str(tmp_path / "db"), collection_name="archives",
+                               embedding_function=HashEmbeddingFunction(dim=32))
+    deduplicator = ChunkDeduplicator.for_vector_store(vector_store, {"enabled": True}) if dedupe else None
+    return DocumentAgent(model=None, vector_store=vector_store, deduplicator=deduplicator)
+
+
+def _wait(job, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, "导入任务超时"
+        time.sleep(0.02)
+
+
+@pytest.mark.parametrize("dedupe", [False, True])
+def test_deleting_watched_archive_removes_its_members(tmp_path, loop, dedupe):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    _write_zip(docs / "bundle.zip", {"a.txt": "第一份成员文档的内容", "sub/b.md": "# 标题\n\n第二份成员文档"})
+    # 与压缩包成员内容相同的普通文件：去重时成员的块归这个文件所有
+    (docs / "plain.txt").write_text("第一份成员文档的内容", encoding="utf-8")
+
+    agent = _agent(tmp_path, dedupe)
+    manager = IngestionJobQueue(agent, loop, concurrency=1)
+    watcher = DirectoryWatcher(agent.scan_directory(str(docs)))
+    archive = str(docs / "bundle.zip")
+    journal_key = f"dir:{docs}"
+
+    changes = watcher.poll()
+    job = manager.submit(changes.added, journal_key=journal_key)
+    _wait(job)
+    assert job.files_failed == 0
+    assert agent.archive_sources(archive) == {f"{archive}!/a.txt", f"{archive}!/sub/b.md"}
+
+    os.remove(archive)
+    changes = watcher.poll()
+    assert changes.deleted == [archive]
+    job = manager.submit(changes.added + changes.modified, journal_key=journal_key, deleted=changes.deleted)
+    _wait(job)
+
+    assert agent.archive_sources(archive) == set()
+    assert agent.vector_store.get_sources() == [str(docs / "plain.txt")]
+    manager.close()
+
+
+def test_interrupted_archive_is_rolled_back(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    archive = str(docs / "bundle.zip")
+    _write_zip(archive, {"a.txt": "成员一", "b.txt": "成员二"})
+    agent = _agent(tmp_path, dedupe=False)
+
+    journal = agent.open_journal([archive])
+    assert asyncio.run(agent.process_document_async(archive, journal=journal))["success"]
+    # 模拟写入一半时中断：压缩包有 begin 记录但没有 commit
+    journal.begin(archive)
+    journal.close()
+
+    journal = agent.open_journal([archive])
+    assert journal.uncommitted() == [archive]
+    assert asyncio.run(agent.rollback_uncommitted(journal)) == 1
+    journal.close()
+    assert agent.vector_store.get_sources() == []
+
+
+def test_archive_commit_records_chunk_range(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    archive = str(docs / "bundle.zip")
+    _write_zip(archive, {"a.txt": "成员一", "b.txt": "成员二", "c.txt": "成员三"})
+    agent = _agent(tmp_path, dedupe=False)
+
+    journal = agent.open_journal([archive])
+    result = asyncio.run(agent.process_document_async(archive, journal=journal))
+    entry = journal.entries[archive]
+    journal.close()
+
+    ids = [agent.vector_store.collection.get(where={"source": f"{archive}!/{name}"})["ids"][0]
+           for name in ("a.txt", "b.txt", "c.txt")]
+    assert entry["op"] == "commit"
+    assert entry["chunks"] == result["chunks_count"] == 3
+    assert (entry["first_id"], entry["last_id"]) == (ids[0], ids[-1])
+
+
+@pytest.mark.parametrize("dedupe", [False, True])
+def test_reingested_archive_syncs_its_members(tmp_path, dedupe):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    archive = str(docs / "bundle.zip")
+    _write_zip(archive, {"a.txt": "成员一", "b.txt": "成员二", "c.txt": "成员三"})
+    agent = _agent(tmp_path, dedupe)
+    assert asyncio.run(agent.process_document_async(archive))["success"]
+
+    # 删除 b.txt，修改 c.txt，新增 d.txt
+    _write_zip(archive, {"a.txt": "成员一", "c.txt": "成员三（修订）", "d.txt": "成员四"})
+    result = asyncio.run(agent.process_document_async(archive))
+
+    assert result["success"]
+    assert result["members"] == 3 and result["members_deleted"] == 1
+    assert result["chunks_added"] == 2
+    assert agent.archive_sources(archive) == {f"{archive}!/a.txt", f"{archive}!/c.txt", f"{archive}!/d.txt"}
+    contents = agent.vector_store.collection.get(where={"archive": archive}, include=["documents"])["documents"]
+    assert sorted(contents) == ["成员一", "成员三（修订）", "成员四"]
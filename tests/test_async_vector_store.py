@@ -0,0 +1,148 @@
+import asyncio
+import threading
+
+import pytest
+
+from processors.chunk import ChunkBatch
+from utils.async_vector_store import AsyncVectorStore
+from utils.embeddings import HashEmbeddingFunction
+from utils.vector_store import VectorStore
+
+
+def _batch(source: str, texts):
+    chunks = ChunkBatch(source, "txt", list(texts))
+    chunks.ids = [f"{source}-{text}" for text in texts]
+    return chunks
+
+
+@pytest.fixture
+def store(tmp_path):
+    vector_store = VectorStore(persist_directory=str(tmp_path), collection_name="async_test",
+                               embedding_function=HashEmbeddingFunction(dim=32))
+    async_store = AsyncVectorStore(vector_store, write_timeout=0.2)
+    yield async_store
+    async_store.close()
+
+
+def _block_writer():
+    """占住写入线程，直到返回的事件被设置"""
+    started, release = threading.Event(), threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    return blocker, started, release
+
+
+def test_started_write_is_awaited_past_timeout(store):
+    blocker, started, release = _block_writer()
+
+    async def main():
+        task = asyncio.ensure_future(store.write(blocker, timeout=0.05))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        await asyncio.sleep(0.1)
+        release.set()
+        return await task
+
+    # 已经开始的写入超时后继续等待，不报告失败
+    assert asyncio.run(main()) is None
+
+
+def test_sync_timeout_drops_whole_queued_sync(store):
+    vector_store = store.vector_store
+    asyncio.run(store.sync_source(_batch("a.txt", ["one", "two", "three"])))
+    blocker, started, release = _block_writer()
+
+    async def main():
+        blocking = asyncio.ensure_future(store.write(blocker, timeout=5))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await store.sync_source(_batch("a.txt", ["one", "four"]), timeout=0.05)
+        finally:
+            release.set()
+        await blocking
+        # 写入队列排空后再检查
+        await store.write(lambda: None)
+
+    asyncio.run(main())
+    # 排队时超时的同步整个被丢弃：既没有写入新块，也没有删除旧块
+    ids = sorted(vector_store.collection.get()["ids"])
+    assert ids == ["a.txt-one", "a.txt-three", "a.txt-two"]
+
+    stats = asyncio.run(store.sync_source(_batch("a.txt", ["one", "four"])))
+    assert stats == {"added": 1, "kept": 1, "deleted": 2}
+    assert sorted(vector_store.collection.get()["ids"]) == ["a.txt-four", "a.txt-one"]
+
+
+def test_unchanged_sync_does_not_block_loop_while_reindex_is_paused(tmp_path):
+    from utils.index_generations import IndexGenerations
+
+    def factory(name):
+        return VectorStore(persist_directory=str(tmp_path), collection_name=name,
+                           embedding_function=HashEmbeddingFunction(dim=32))
+
+    generations = IndexGenerations(factory, collection_name="paused", persist_directory=str(tmp_path),
+                                   catch_up_rounds=0)
+    async_store = AsyncVectorStore(generations)
+    asyncio.run(async_store.sync_source(_batch("a.txt", ["one", "two"])))
+    paused, release = threading.Event(), threading.Event()
+
+    def populate(store, sources):
+        if sources is None:
+            # 重建期间的写入，最后一轮追平时（暂停写入期间）处理
+            generations.add_chunks(_batch("b.txt", ["three"]))
+            return
+        paused.set()
+        release.wait(10)
+
+    rebuild = threading.Thread(target=generations.rebuild, args=(populate,))
+    rebuild.start()
+    try:
+        assert paused.wait(10)
+        result = {}
+        # 内容未变的同步只有统计，不应在事件循环中等待暂停的写入
+        sync = threading.Thread(target=lambda: result.update(
+            asyncio.run(async_store.sync_source(_batch("a.txt", ["one", "two"])))))
+        sync.start()
+        sync.join(2)
+        assert not sync.is_alive()
+        assert result == {"added": 0, "kept": 2, "deleted": 0}
+    finally:
+        release.set()
+        rebuild.join(10)
+        async_store.close()
+
+
+def test_queued_small_writes_are_coalesced(tmp_path):
+    vector_store = VectorStore(persist_directory=str(tmp_path), collection_name="coalesce",
+                               embedding_function=HashEmbeddingFunction(dim=32))
+    async_store = AsyncVectorStore(vector_store, coalesce_max_rows=8, coalesce_wait_ms=50)
+    blocker, started, release = _block_writer()
+    # 第三个请求与第一个请求的ID重复，不能和它进入同一次写入
+    ids = [[f"r{i}-a", f"r{i}-b"] for i in range(10)]
+    ids[2] = ids[0]
+
+    async def main():
+        blocking = asyncio.ensure_future(async_store.write(blocker))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        writes = asyncio.gather(*[
+            async_store.add_documents([f"文本{i}a", f"文本{i}b"], [{"source": f"{i}.txt"}] * 2, ids=ids[i], upsert=True)
+            for i in range(10)
+        ])
+        await asyncio.sleep(0.05)
+        release.set()
+        await blocking
+        await writes
+
+    try:
+        asyncio.run(main())
+        stats = async_store.get_stats()
+    finally:
+        async_store.close()
+    # 每次最多 8 行：[r0, r1]、[r2..r5]、[r6..r9]
+    assert stats["coalesced_flushes"] == 3
+    assert stats["coalesced_requests"] == 10
+    assert vector_store.collection.count() == 18
+    assert vector_store.collection.get(ids=["r0-a"])["documents"] == ["文本2a"]
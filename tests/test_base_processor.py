@@ -0,0 +1,15 @@
+import pytest
+
+from processors.base_processor import BaseProcessor
+from processors.text_processor import TextProcessor
+
+
+def test_processor_without_stream_extraction_cannot_be_created():
+    class _Incomplete(BaseProcessor):
+        doc_type = "incomplete"
+
+    with pytest.raises(TypeError):
+        BaseProcessor()
+    with pytest.raises(TypeError):
+        _Incomplete()
+    assert TextProcessor().process_bytes("你好".encode("utf-8"), "a.txt").texts == ["你好"]
@@ -0,0 +1,55 @@
+import asyncio
+import random
+
+import pytest
+from agentscope.message import Msg
+
+from utils.bounded_memory import BoundedMemory
+
+
+def test_oversize_message_is_truncated_to_cap():
+    memory = BoundedMemory(max_bytes=2000, max_tokens=500, summarizer=None)
+    original = Msg(name="user", content="超长消息" * 5000, role="user")
+
+    asyncio.run(memory.add(original))
+
+    usage = memory.get_usage()
+    assert usage["bytes"] <= 2000 and usage["tokens"] <= 500
+    stored = asyncio.run(memory.get_memory())[-1]
+    assert stored.id == original.id
+    assert stored.content.endswith("（已截断）")
+    # 调用方的消息不被修改
+    assert len(original.content) == 20000
+
+
+async def _summarize(previous: str, messages):
+    await asyncio.sleep(0)
+    return (previous + " | " + " ".join(str(msg.content)[:20] for msg in messages))[-1500:]
+
+
+@pytest.mark.parametrize("summarizer", [None, _summarize])
+def test_long_conversation_footprint_stays_under_cap(summarizer):
+    rng = random.Random(7)
+    memory = BoundedMemory(max_turns=10, max_bytes=16 * 1024, max_tokens=3000, max_summary_chars=1500,
+                           summarizer=summarizer)
+    peak_bytes = peak_tokens = 0
+
+    async def main():
+        nonlocal peak_bytes, peak_tokens
+        for turn in range(1000):
+            # 偶尔混入单条就超过上限的消息
+            size = 40000 if turn % 97 == 0 else rng.randint(10, 800)
+            await memory.add([Msg(name="user", content="问" * size, role="user"),
+                              Msg(name="QAAgent", content="answer " * (size // 7 + 1), role="assistant")])
+            usage = memory.get_usage()
+            peak_bytes = max(peak_bytes, usage["bytes"])
+            peak_tokens = max(peak_tokens, usage["tokens"])
+            if turn % 50 == 0:
+                await asyncio.sleep(0)
+        await memory.flush()
+
+    asyncio.run(main())
+    assert peak_bytes <= 16 * 1024
+    assert peak_tokens <= 3000
+    # 原文最多 max_turns 轮，待折叠队列最多同样多条
+    assert asyncio.run(memory.size()) <= 2 * 20
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from processors.base_processor import _BREAK_CHARS, _GEAR
+from processors.text_processor import TextProcessor
+
+
+def _reference_chunks(text: str, chunk_size: int, chunk_overlap: int):
+    """逐字符计算Gear哈希的原始实现，向量化版本的切分结果必须与它一致"""
+    min_size = max(1, chunk_size // 4)
+    max_size = chunk_size * 2
+    span = max(1, chunk_size - min_size)
+    snap = max(1, chunk_size // 10)
+    boundaries = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_size, len(text))
+        cut = end
+        position = max(start, start + min_size - 32)
+        h = 0
+        while position < end:
+            code = ord(text[position])
+            h = ((h << 1) + _GEAR[(code ^ (code >> 8)) & 0xFF]) & 0xFFFFFFFF
+            position += 1
+            if position - start >= min_size and h % span == 0:
+                cut = position
+                break
+        if cut < end:
+            for candidate in range(cut, min(cut + snap, end)):
+                if text[candidate - 1] in _BREAK_CHARS:
+                    cut = candidate
+                    break
+        boundaries.append((start, cut))
+        start = cut
+    overlap = min(chunk_overlap, min_size)
+    return [text[max(0, begin - overlap) if i else begin:end] for i, (begin, end) in enumerate(boundaries)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 10, 100, 127, 128, 1000])
+def test_vectorised_gear_hash_matches_reference(chunk_size):
+    rng = random.Random(chunk_size)
+    alphabet = "abc 。，的文档.!?\n" + "".join(chr(code) for code in range(0x4e00, 0x4e20)) + "\U0001F600"
+    processor = TextProcessor(chunk_size=chunk_size, chunk_overlap=chunk_size // 5, chunking="content")
+    for length in (1, 31, 32, 33, 500, 20000):
+        text = "".join(rng.choice(alphabet) for _ in range(length))
+        assert processor.chunk_text(text) == _reference_chunks(text, chunk_size, chunk_size // 5)
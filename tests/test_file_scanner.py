@@ -0,0 +1,40 @@
+"""目录扫描与变化监视"""
+import os
+
+from utils.file_scanner import FileScanner, DirectoryWatcher
+
+
+def _write(path: str, text: str = "内容"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+
+
+def test_unreadable_directory_is_not_reported_as_deleted(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    _write(os.path.join(root, "a.txt"))
+    _write(os.path.join(root, "sub", "b.txt"))
+    watcher = DirectoryWatcher(FileScanner(root, [".txt"]))
+    assert len(watcher.poll().added) == 2
+
+    # 子目录暂时无法读取（NFS抖动、权限变化）
+    real_scandir = os.scandir
+    blocked = os.path.join(root, "sub")
+
+    def scandir(path):
+        if os.fspath(path) == blocked:
+            raise PermissionError(13, "Permission denied", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    changes = watcher.poll()
+    assert not changes
+    assert watcher.scanner.errors and watcher.scanner.errors[0][0] == blocked
+    assert os.path.join(blocked, "b.txt") in watcher.snapshot
+
+    # 恢复后没有变化，不会重新导入
+    monkeypatch.setattr(os, "scandir", real_scandir)
+    assert not watcher.poll()
+
+    os.remove(os.path.join(blocked, "b.txt"))
+    assert watcher.poll().deleted == [os.path.join(blocked, "b.txt")]
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+from agentscope.message import Msg
+
+from service.http_server import DocMateServer
+
+
+class _FailingSessions:
+    qa_agent = None
+
+    async def ask_async(self, session_id, question):
+        raise RuntimeError("模型调用失败")
+
+
+async def _exchange(server, raw: bytes) -> bytes:
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+def _run(raw: bytes) -> bytes:
+    async def main():
+        server = DocMateServer(None, _FailingSessions(), port=0, request_timeout=5)
+        await server.start()
+        try:
+            return await _exchange(server, raw)
+        finally:
+            await server.shutdown()
+
+    return asyncio.run(main())
+
+
+def _post(path: str, body: bytes, content_length: str) -> bytes:
+    return (f"POST {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {content_length}\r\n\r\n").encode() + body
+
+
+def test_stream_error_after_headers_ends_chunked_body():
+    body = json.dumps({"question": "你好", "stream": True}).encode()
+    response = _run(_post("/ask", body, str(len(body))))
+
+    head, _, payload = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert b"Transfer-Encoding: chunked" in head
+    # 出错时不能在分块响应体中再写一行状态行
+    assert b"HTTP/1.1" not in payload
+    assert payload.endswith(b"0\r\n\r\n")
+    events = [json.loads(line) for line in payload.split(b"\r\n") if line.startswith(b"{")]
+    assert [event["event"] for event in events] == ["accepted", "error"]
+    assert events[-1]["status"] == 500
+
+
+def test_malformed_content_length_is_bad_request():
+    assert _run(_post("/ask", b"{}", "abc")).startswith(b"HTTP/1.1 400")
+    assert _run(_post("/ask", b"{}", "-5")).startswith(b"HTTP/1.1 400")
+
+
+def test_reupload_replaces_previous_version_within_namespace(tmp_path):
+    from agents.document_agent import DocumentAgent
+    from utils.embeddings import HashEmbeddingFunction
+    from utils.vector_store import VectorStore
+
+    vector_store = VectorStore(persist_directory=str(tmp_path), collection_name="uploads",
+                               embedding_function=HashEmbeddingFunction(dim=32))
+    agent = DocumentAgent(model=None, vector_store=vector_store)
+
+    async def main():
+        server = DocMateServer(agent, _FailingSessions(), port=0, request_timeout=5, ingest_workers=1)
+        await server.start()
+        try:
+            for query, body in (("filename=report.txt", "第一季度报告"), ("filename=report.txt", "第二季度报告"),
+                                ("filename=report.txt&namespace=alice", "第三季度报告")):
+                response = await _exchange(server, _post(f"/ingest?{query}", body.encode(), str(len(body.encode()))))
+                assert response.startswith(b"HTTP/1.1 202")
+        finally:
+            # 关闭时等待队列中的导入完成
+            await server.shutdown()
+
+    asyncio.run(main())
+    assert vector_store.get_sources() == ["upload://alice/report.txt", "upload://default/report.txt"]
+    contents = vector_store.collection.get(where={"source": "upload://default/report.txt"}, include=["documents"])["documents"]
+    assert contents == ["第二季度报告"]
+
+
+def test_concurrent_reindex_is_conflict():
+    import threading
+    from types import SimpleNamespace
+
+    release = threading.Event()
+    agent = SimpleNamespace(vector_store=SimpleNamespace(get_stats=lambda: {"generation": 0}))
+
+    async def main():
+        server = DocMateServer(agent, _FailingSessions(), port=0, request_timeout=5,
+                               reindex=lambda: release.wait(10))
+        await server.start()
+        try:
+            first = await _exchange(server, _post("/reindex", b"", "0"))
+            second = await _exchange(server, _post("/reindex", b"", "0"))
+        finally:
+            release.set()
+            await server.shutdown()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.startswith(b"HTTP/1.1 202 Accepted\r\n")
+    assert second.startswith(b"HTTP/1.1 409 Conflict\r\n")
+    assert "已有索引重建正在进行" in json.loads(second.partition(b"\r\n\r\n")[2])["error"]
+
+
+def test_anonymous_asks_get_separate_sessions():
+    class _Sessions:
+        qa_agent = None
+
+        def __init__(self):
+            self.asked = []
+
+        async def ask_async(self, session_id, question):
+            self.asked.append(session_id)
+            return Msg(name="QAAgent", content="回答", role="assistant")
+
+    sessions = _Sessions()
+
+    async def main():
+        server = DocMateServer(None, sessions, port=0, request_timeout=5)
+        await server.start()
+        try:
+            replies = []
+            for payload in ({"question": "问题一"}, {"question": "问题二"}, {"question": "问题三", "session_id": "s1"}):
+                body = json.dumps(payload).encode()
+                response = await _exchange(server, _post("/ask", body, str(len(body))))
+                replies.append(json.loads(response.partition(b"\r\n\r\n")[2]))
+            return replies
+        finally:
+            await server.shutdown()
+
+    replies = asyncio.run(main())
+    first, second, named = (reply["session_id"] for reply in replies)
+    assert first != second and "default" not in (first, second)
+    assert named == "s1"
+    assert sessions.asked == [first, second, "s1"]
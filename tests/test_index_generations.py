@@ -0,0 +1,48 @@
+import threading
+
+from utils.embeddings import HashEmbeddingFunction
+from utils.index_generations import IndexGenerations, copy_sources
+from utils.vector_store import VectorStore
+
+
+def _generations(tmp_path) -> IndexGenerations:
+    def factory(name):
+        return VectorStore(persist_directory=str(tmp_path), collection_name=name,
+                           embedding_function=HashEmbeddingFunction(dim=32))
+
+    return IndexGenerations(factory, collection_name="docs", persist_directory=str(tmp_path))
+
+
+def _collections(generations: IndexGenerations) -> set:
+    return {getattr(item, "name", item) for item in generations.current.client.list_collections()}
+
+
+def test_swap_keeps_leased_generation_until_released(tmp_path):
+    generations = _generations(tmp_path)
+    generations.add_documents(["第一份文档"], [{"source": "a.txt"}], ["a1"])
+    building = threading.Event()
+
+    def populate(store, sources):
+        if sources is None:
+            building.set()
+        copy_sources(generations.current, store, sources if sources is not None else generations.current.get_sources())
+
+    with generations.lease() as old:
+        rebuild = threading.Thread(target=generations.rebuild, args=(populate,))
+        rebuild.start()
+        assert building.wait(10)
+        # 重建期间的写入在切换前追平到新世代
+        generations.add_documents(["第二份文档"], [{"source": "b.txt"}], ["b1"])
+        rebuild.join(10)
+        assert generations.generation == 1
+        assert sorted(generations.get_sources()) == ["a.txt", "b.txt"]
+
+        # 租约还在：旧世代不回收，进行中的读取照常完成
+        generations.wait_retired(0.2)
+        assert generations.get_stats()["retiring"] == 1
+        assert "docs" in _collections(generations)
+        assert sorted(old.collection.get()["ids"]) == ["a1", "b1"]
+
+    generations.wait_retired(10)
+    assert generations.get_stats()["retiring"] == 0
+    assert _collections(generations) == {"docs_g000001"}
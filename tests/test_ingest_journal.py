@@ -0,0 +1,59 @@
+import asyncio
+
+from agents.document_agent import DocumentAgent
+from utils.embeddings import HashEmbeddingFunction
+from utils.vector_store import VectorStore
+
+
+def _agent(tmp_path) -> DocumentAgent:
+    vector_store = VectorStore(persist_directory=str(tmp_path / "db"), collection_name="journal",
+                               embedding_function=HashEmbeddingFunction(dim=32))
+    return DocumentAgent(model=None, vector_store=vector_store)
+
+
+def _files(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    paths = []
+    for name, text in (("a.txt", "第一份文档"), ("b.txt", "第二份文档"), ("c.txt", "第三份文档")):
+        (docs / name).write_text(text, encoding="utf-8")
+        paths.append(str(docs / name))
+    return paths
+
+
+def test_resume_skips_committed_files(tmp_path):
+    agent = _agent(tmp_path)
+    paths = _files(tmp_path)
+
+    first = asyncio.run(agent.batch_process_documents_async(paths))
+    assert all(result["success"] and not result.get("skipped") for result in first)
+
+    with open(paths[1], "w", encoding="utf-8") as file:
+        file.write("第二份文档（修订）")
+    second = asyncio.run(agent.batch_process_documents_async(paths))
+    assert [bool(result.get("skipped")) for result in second] == [True, False, True]
+    contents = agent.vector_store.collection.get(where={"source": paths[1]}, include=["documents"])["documents"]
+    assert contents == ["第二份文档（修订）"]
+
+
+def test_interrupted_file_is_rolled_back_and_reingested(tmp_path):
+    agent = _agent(tmp_path)
+    paths = _files(tmp_path)
+    asyncio.run(agent.batch_process_documents_async(paths))
+
+    # 模拟写入 c.txt 时中断：日志中只有 begin，向量库里留下写了一半的块，日志末尾还有半行记录
+    journal = agent.open_journal(paths)
+    journal.begin(paths[2])
+    journal.close()
+    agent.vector_store.add_documents(["写了一半的块"], [{"source": paths[2]}], ["partial"])
+    with open(journal.path, "a", encoding="utf-8") as file:
+        file.write('{"op": "commit", "sour')
+
+    results = asyncio.run(agent.batch_process_documents_async(paths))
+    assert [bool(result.get("skipped")) for result in results] == [True, True, False]
+    contents = agent.vector_store.collection.get(where={"source": paths[2]}, include=["documents"])["documents"]
+    assert contents == ["第三份文档"]
+
+    journal = agent.open_journal(paths)
+    assert journal.stats() == {"committed": 3, "uncommitted": 0}
+    journal.close()
@@ -0,0 +1,51 @@
+import asyncio
+
+from agentscope.message import Msg
+
+from agents.qa_agent import QAAgent
+from utils.bounded_memory import BoundedMemory
+from utils.embeddings import HashEmbeddingFunction
+from utils.stub_model import StubChatModel
+from utils.vector_store import VectorStore
+
+
+class _RecordingModel(StubChatModel):
+    def __init__(self):
+        super().__init__(reply="季度营收增长了百分之十。")
+        self.calls = []
+
+    async def __call__(self, messages, **kwargs):
+        self.calls.append(messages)
+        return await super().__call__(messages, **kwargs)
+
+
+def _text(message) -> str:
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content)
+
+
+def test_answer_prompt_includes_summary_and_recent_turns(tmp_path):
+    vector_store = VectorStore(persist_directory=str(tmp_path), collection_name="qa_test",
+                               embedding_function=HashEmbeddingFunction(dim=32))
+    vector_store.add_documents(["第三季度营收报告：营收增长百分之十"], [{"source": "report.txt"}], ["c1"])
+    model = _RecordingModel()
+    agent = QAAgent(model=model, vector_store=vector_store, memory=BoundedMemory(summarizer=None))
+
+    async def main():
+        memory = BoundedMemory(max_turns=1, summarizer=None)
+        await memory.add([Msg(name="user", content="最早的问题：公司做什么业务？", role="user"),
+                          Msg(name="QAAgent", content="公司做企业软件。", role="assistant")])
+        await agent(Msg(name="user", content="第三季度营收如何？", role="user"), memory=memory)
+        await agent(Msg(name="user", content="和上个季度相比呢？", role="user"), memory=memory)
+
+    asyncio.run(main())
+    messages = model.calls[-1]
+    assert messages[0]["role"] == "system"
+    # 超出 max_turns 的最早一轮已折叠进摘要，摘要随系统提示词提供给模型
+    assert "最早的问题" in _text(messages[0])
+    roles = [message["role"] for message in messages[1:]]
+    assert roles == ["user", "assistant", "user"]
+    assert "第三季度营收如何" in _text(messages[1])
+    assert "和上个季度相比呢" in _text(messages[-1])
@@ -0,0 +1,109 @@
+"""压缩包读取 - 逐个读出 .zip / .tar / .tar.gz 中的成员，直接以流的形式交给处理器，不解压到磁盘
+
+- 同一时刻只缓冲一个成员：不超过 buffer_bytes 的成员放在内存中，更大的成员才溢出到临时文件
+  （PDF、Word 需要可随机访问的流，压缩包中的成员流只能顺序读取）；
+- 成员解压后的实际大小超过 max_member_bytes 时跳过（防止压缩炸弹，不信任压缩包中声明的大小）；
+- 目录、不被 include 接受的成员和超限的成员都记录在 ``skipped`` 中。
+"""
+import tarfile
+import tempfile
+import zipfile
+from typing import List, Tuple, Iterator, Optional, Callable, BinaryIO, Union
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# 每次从成员流读取的字节数
+_READ_SIZE = 1024 * 1024
+
+
+def is_archive(name: str) -> bool:
+    """按文件名判断是否为支持的压缩包"""
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def member_source(archive_source: str, member_name: str) -> str:
+    """压缩包成员在元数据中记录的来源：<压缩包>!/<成员路径>"""
+    return f"{archive_source}!/{member_name}"
+
+
+class ArchiveReader:
+    """压缩包读取器
+
+    archive 可以是文件路径，也可以是可随机访问的二进制流（如上传内容的 BytesIO）；
+    name 为压缩包的名称（判断格式，流输入时必须提供）。迭代得到 (成员路径, 成员流)，
+    成员流在取下一个成员时失效。
+    """
+
+    def __init__(self, archive: Union[str, BinaryIO], name: Optional[str] = None,
+                 include: Optional[Callable[[str], bool]] = None, max_member_bytes: int = 256 * 1024 * 1024,
+                 buffer_bytes: int = 16 * 1024 * 1024):
+        self.archive = archive
+        self.name = name or (archive if isinstance(archive, str) else None)
+        if not self.name or not is_archive(self.name):
+            raise ValueError(f"不支持的压缩包格式: {self.name}")
+        self.include = include
+        self.max_member_bytes = max_member_bytes
+        self.buffer_bytes = buffer_bytes
+        # (成员路径, 跳过原因)
+        self.skipped: List[Tuple[str, str]] = []
+
+    def __iter__(self) -> Iterator[Tuple[str, BinaryIO]]:
+        if self.name.lower().endswith(".zip"):
+            return self._iter_zip()
+        return self._iter_tar()
+
+    def _accept(self, member_name: str, size: int) -> bool:
+        if self.include is not None and not self.include(member_name):
+            self.skipped.append((member_name, "unsupported"))
+            return False
+        if size > self.max_member_bytes:
+            self.skipped.append((member_name, "too_large"))
+            return False
+        return True
+
+    def _iter_zip(self) -> Iterator[Tuple[str, BinaryIO]]:
+        with zipfile.ZipFile(self.archive) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not self._accept(info.filename, info.file_size):
+                    continue
+                with archive.open(info) as member:
+                    buffered = self._buffer(info.filename, member)
+                if buffered is not None:
+                    with buffered:
+                        yield info.filename, buffered
+
+    def _iter_tar(self) -> Iterator[Tuple[str, BinaryIO]]:
+        if isinstance(self.archive, str):
+            archive = tarfile.open(self.archive, "r:*")
+        else:
+            archive = tarfile.open(fileobj=self.archive, mode="r:*")
+        with archive:
+            for info in archive:
+                if not info.isfile() or not self._accept(info.name, info.size):
+                    continue
+                member = archive.extractfile(info)
+                if member is None:
+                    continue
+                with member:
+                    buffered = self._buffer(info.name, member)
+                if buffered is not None:
+                    with buffered:
+                        yield info.name, buffered
+
+    def _buffer(self, member_name: str, member: BinaryIO) -> Optional[BinaryIO]:
+        """把成员读入有界缓冲区（超过 buffer_bytes 的部分溢出到临时文件），超过大小上限时返回 None"""
+        buffered = tempfile.SpooledTemporaryFile(max_size=self.buffer_bytes)
+        size = 0
+        while True:
+            data = member.read(_READ_SIZE)
+            if not data:
+                break
+            size += len(data)
+            if size > self.max_member_bytes:
+                buffered.close()
+                self.skipped.append((member_name, "too_large"))
+                return None
+            buffered.write(data)
+        buffered.seek(0)
+        return buffered
+
@@ -0,0 +1,339 @@
+"""异步向量存储门面 - 读写使用各自的有界执行器，操作带超时和取消，写入由单个写入线程按顺序执行
+
+- 读（检索、同步前读取已有块）在固定大小的读线程池中执行，不与PDF解析、OCR等默认线程池任务竞争；
+- 写（写入、更新、删除）全部提交到一个写入队列，由单个写入线程按提交顺序执行，Chroma 始终只有一个写入者；
+- 队列中连续的小 add_documents / add_chunks 请求在写入线程中合并为一次大批量写入
+  （Chroma 每次写入调用有数十毫秒的固定开销，许多小文件导入时合并效果明显）；
+- 每个操作都有超时，超时或被取消的操作如果还没开始执行就直接丢弃；写入的超时只限制排队时间，
+  已经开始的写入无法中断，调用方继续等待它完成（否则调用方会把已生效的写入当作失败）。
+
+记录的指标：
+    async_vector_store_coalesced_requests   每次合并写入包含的请求数（直方图）
+    async_vector_store_queue_seconds        写入请求在队列中的等待时间（按 kind 标签区分）
+    async_vector_store.flush_seconds        每次合并写入的耗时
+    async_vector_store_timeouts_total       超时的操作数（按 operation 标签区分读写，写入只统计被丢弃的请求）
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Callable, TYPE_CHECKING
+
+from utils.metrics import metrics
+from utils.vector_store import VectorStore
+
+if TYPE_CHECKING:
+    from processors.chunk import ChunkBatch
+
+metrics.set_buckets("async_vector_store_coalesced_requests", (1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+
+class _WriteRequest:
+    """写入队列中的一个请求：add（可合并的写入）或 call（其他写操作）"""
+
+    __slots__ = ("kind", "fn", "args", "chunks", "positions", "extra_metadata", "texts", "metadatas", "ids",
+                 "embeddings", "upsert", "rows", "future", "enqueued_at")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.fn: Optional[Callable] = None
+        self.args: tuple = ()
+        self.chunks = None
+        self.positions: Optional[Sequence[int]] = None
+        self.extra_metadata: Optional[Dict[str, Any]] = None
+        self.texts: Optional[List[str]] = None
+        self.metadatas: Optional[List[Dict[str, Any]]] = None
+        self.ids: Optional[List[str]] = None
+        self.embeddings = None
+        self.upsert = True
+        self.rows = 0
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+    def row_ids(self) -> List[str]:
+        if self.chunks is not None:
+            return [self.chunks.ids[i] for i in self.positions]
+        return self.ids
+
+    def materialize(self):
+        """返回 (文本, 元数据, ID, 嵌入)，ChunkBatch 请求在写入线程中才生成元数据"""
+        if self.chunks is None:
+            return self.texts, self.metadatas, self.ids, self.embeddings
+        metadatas = self.chunks.metadatas(self.positions)
+        if self.extra_metadata:
+            for metadata in metadatas:
+                metadata.update(self.extra_metadata)
+        return [self.chunks.texts[i] for i in self.positions], metadatas, self.row_ids(), None
+
+
+class AsyncVectorStore:
+    """VectorStore 的异步门面
+
+    同步的 VectorStore 仍然可以直接使用（如命令行和基准测试），智能体在事件循环中通过本类访问向量存储。
+    """
+
+    def __init__(self, vector_store: "VectorStore", read_workers: int = 4, read_timeout: Optional[float] = 30,
+                 write_timeout: Optional[float] = 300, coalesce_max_rows: int = 2048, coalesce_wait_ms: float = 10):
+        self.vector_store = vector_store
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.coalesce_max_rows = max(1, coalesce_max_rows)
+        self.coalesce_wait = coalesce_wait_ms / 1000
+
+        self._read_executor = ThreadPoolExecutor(max_workers=max(1, read_workers), thread_name_prefix="VectorStoreRead")
+        self._queue: "queue.Queue[Optional[_WriteRequest]]" = queue.Queue()
+        # 写入线程在第一次写入时才启动（只读服务不需要）
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+        self._flushes = 0
+        self._coalesced = 0
+
+    @classmethod
+    def from_config(cls, vector_store: "VectorStore", config: Optional[Dict[str, Any]] = None) -> Optional["AsyncVectorStore"]:
+        """根据配置文件中的 async_vector_store 段创建，未启用时返回 None（智能体使用默认线程池）"""
+        store_config = (config or {}).get("async_vector_store", {})
+        if not store_config.get("enabled", True):
+            return None
+        return cls(
+            vector_store,
+            read_workers=store_config.get("read_workers", 4),
+            read_timeout=store_config.get("read_timeout", 30),
+            write_timeout=store_config.get("write_timeout", 300),
+            coalesce_max_rows=store_config.get("coalesce_max_rows", 2048),
+            coalesce_wait_ms=store_config.get("coalesce_wait_ms", 10)
+        )
+
+    # ------------------------------------------------------------------
+    # 读
+    # ------------------------------------------------------------------
+
+    async def read(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """在读线程池中执行 fn(*args)，超时抛出 asyncio.TimeoutError（尚未开始的读取会被取消）"""
+        loop = asyncio.get_running_loop()
+        return await self._wait(
+            loop.run_in_executor(self._read_executor, fn, *args),
+            timeout if timeout is not None else self.read_timeout,
+            "read"
+        )
+
+    async def search(self, query: str, n_results: int = 5, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """检索相关文档块"""
+        return await self.read(self.vector_store.search, query, n_results, timeout=timeout)
+
+    async def get_collection_info(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self.read(self.vector_store.get_collection_info, timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # 写
+    # ------------------------------------------------------------------
+
+    async def write(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """在写入线程中按提交顺序执行 fn(*args)"""
+        request = _WriteRequest("call")
+        request.fn, request.args = fn, args
+        return await self._submit(request, timeout)
+
+    async def add_documents(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+                            ids: Optional[List[str]] = None, embeddings=None, upsert: bool = False,
+                            timeout: Optional[float] = None) -> List[str]:
+        """写入文档块（可与队列中相邻的写入合并），返回文档块ID"""
+        import uuid
+
+        request = _WriteRequest("add")
+        request.texts = list(texts)
+        request.ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        request.metadatas = list(metadatas) if metadatas is not None else [{"source": "unknown"} for _ in texts]
+        request.embeddings = list(embeddings) if embeddings is not None else None
+        request.upsert = upsert
+        request.rows = len(request.texts)
+        await self._submit(request, timeout)
+        return request.ids
+
+    async def add_chunks(self, chunks: "ChunkBatch", positions: Optional[Sequence[int]] = None,
+                         extra_metadata: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None):
+        """写入文档块批次中指定位置（默认全部）的块（upsert，可与相邻的写入合并）"""
+        request = _WriteRequest("add")
+        request.chunks = chunks
+        request.positions = positions if positions is not None else range(len(chunks))
+        request.extra_metadata = extra_metadata
+        request.rows = len(request.positions)
+        await self._submit(request, timeout)
+
+    async def sync_source(self, chunks: "ChunkBatch", timeout: Optional[float] = None) -> Dict[str, int]:
+        """按文档块ID增量同步一个来源：读取阶段在读线程池，只有新块时新块写入可与相邻写入合并；
+        有需要更新或删除的块时，新块写入和收尾在同一个写请求中执行，超时丢弃时不会只写入新块而留下旧块"""
+        generation = getattr(self.vector_store, "generation", None)
+        plan = await self.read(self.vector_store.plan_sync, chunks, timeout=timeout)
+        if plan["moved"] or plan["stale"] or self.vector_store.doc_index:
+            return await self.write(self._apply_sync, chunks, plan, generation, timeout=timeout)
+
+        if plan["new"]:
+            await self.add_chunks(chunks, plan["new"], timeout=timeout)
+        if getattr(self.vector_store, "generation", None) != generation:
+            # 同步期间切换了索引世代，计划基于旧世代的内容，在新世代上作为一个写操作完整同步一次
+            return await self.write(self.vector_store.sync_source, chunks, timeout=timeout)
+        # 没有需要更新或删除的块，收尾阶段只做统计，不占用写入队列（否则会打断相邻写入的合并）。
+        # 直接在事件循环中计算，不能经过 vector_store 调用写方法：索引世代代理的写方法在重建暂停写入时会阻塞事件循环
+        return VectorStore.sync_stats(chunks, plan)
+
+    def _apply_sync(self, chunks: "ChunkBatch", plan: Dict[str, list], generation) -> Dict[str, int]:
+        """在写入线程中写入新块并完成同步"""
+        if getattr(self.vector_store, "generation", None) != generation:
+            return self.vector_store.sync_source(chunks)
+        if plan["new"]:
+            self.vector_store.add_chunks(chunks, plan["new"])
+        return self.vector_store.finish_sync(chunks, plan)
+
+    async def delete_by_source(self, source: str, timeout: Optional[float] = None) -> int:
+        return await self.write(self.vector_store.delete_by_source, source, timeout=timeout)
+
+    async def _submit(self, request: _WriteRequest, timeout: Optional[float]):
+        if self._closed:
+            raise RuntimeError("向量存储写入队列已关闭")
+        self._ensure_writer()
+        self._queue.put(request)
+        future = asyncio.wrap_future(request.future)
+        timeout = timeout if timeout is not None else self.write_timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            # 已经开始的写入等待它完成；还在排队的请求直接丢弃（写入线程跳过已取消的请求）
+            if not request.future.cancel():
+                return await future
+            metrics.inc("async_vector_store_timeouts_total", labels={"operation": "write"})
+            raise asyncio.TimeoutError(f"向量存储写入超时（{timeout}秒）")
+        except asyncio.CancelledError:
+            request.future.cancel()
+            raise
+
+    @staticmethod
+    async def _wait(awaitable, timeout: Optional[float], operation: str):
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("async_vector_store_timeouts_total", labels={"operation": operation})
+            action = "读取" if operation == "read" else "写入"
+            raise asyncio.TimeoutError(f"向量存储{action}超时（{timeout}秒）")
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name="VectorStoreWriter", daemon=True)
+                    self._writer.start()
+
+    def _run_writer(self):
+        carry: Optional[_WriteRequest] = None
+        while True:
+            request = carry if carry is not None else self._queue.get()
+            carry = None
+            if request is None:
+                return
+            if request.kind != "add" or request.rows >= self.coalesce_max_rows:
+                self._execute([request])
+                continue
+
+            # 合并队列中紧随其后的可合并写入，直到达到行数上限或等待超时
+            batch, rows = [request], request.rows
+            batch_ids = set(request.row_ids())
+            deadline = time.perf_counter() + self.coalesce_wait
+            while rows < self.coalesce_max_rows:
+                try:
+                    following = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if following is None or not self._compatible(following, request, rows, batch_ids):
+                    carry = following
+                    break
+                batch.append(following)
+                rows += following.rows
+                batch_ids.update(following.row_ids())
+            self._execute(batch)
+
+    def _compatible(self, request: _WriteRequest, first: _WriteRequest, rows: int, batch_ids: set) -> bool:
+        """同一次Chroma写入中ID不能重复，upsert 和是否自带嵌入必须一致"""
+        return (
+            request.kind == "add"
+            and request.upsert == first.upsert
+            and (request.embeddings is None) == (first.embeddings is None)
+            and rows + request.rows <= self.coalesce_max_rows
+            and batch_ids.isdisjoint(request.row_ids())
+        )
+
+    def _execute(self, batch: List[_WriteRequest]):
+        now = time.perf_counter()
+        # 已取消（超时）的请求不再执行
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        for request in batch:
+            metrics.observe("async_vector_store_queue_seconds", now - request.enqueued_at, {"kind": request.kind})
+
+        if batch[0].kind == "call":
+            request = batch[0]
+            try:
+                request.future.set_result(request.fn(*request.args))
+            except Exception as e:
+                request.future.set_exception(e)
+            return
+
+        metrics.observe("async_vector_store_coalesced_requests", len(batch))
+        try:
+            self._flush(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # 合并写入失败时逐个重试，只让出错的请求失败
+            for request in batch:
+                try:
+                    self._flush([request])
+                    request.future.set_result(None)
+                except Exception as single_error:
+                    request.future.set_exception(single_error)
+            return
+        for request in batch:
+            request.future.set_result(None)
+
+    def _flush(self, batch: List[_WriteRequest]):
+        first = batch[0]
+        if len(batch) == 1:
+            # 单个请求按 VectorStore 自身的写入窗口执行，大批次不会一次生成全部元数据
+            if first.chunks is not None:
+                self.vector_store.add_chunks(first.chunks, first.positions, first.extra_metadata)
+            else:
+                self.vector_store.add_documents(first.texts, first.metadatas, ids=first.ids,
+                                                embeddings=first.embeddings, upsert=first.upsert)
+            return
+
+        texts, metadatas, ids, embeddings = [], [], [], []
+        for request in batch:
+            request_texts, request_metadatas, request_ids, request_embeddings = request.materialize()
+            texts.extend(request_texts)
+            metadatas.extend(request_metadatas)
+            ids.extend(request_ids)
+            if request_embeddings is not None:
+                embeddings.extend(request_embeddings)
+        with metrics.span("async_vector_store.flush"):
+            self.vector_store.add_documents(texts, metadatas, ids=ids, embeddings=embeddings or None,
+                                            upsert=first.upsert)
+        self._flushes += 1
+        self._coalesced += len(batch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入队列统计"""
+        return {
+            "pending_writes": self._queue.qsize(),
+            "coalesced_flushes": self._flushes,
+            "coalesced_requests": self._coalesced
+        }
+
+    def close(self, timeout: Optional[float] = None):
+        """关闭：等待已提交的写入完成，再关闭读线程池"""
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout)
+        self._read_executor.shutdown(wait=True)
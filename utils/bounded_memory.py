@@ -0,0 +1,295 @@
+"""有界对话记忆 - 保留最近N轮原文，较早的对话滚动折叠为摘要"""
+import asyncio
+import json
+import math
+import re
+from collections import deque
+from typing import List, Dict, Any, Optional, Union, Callable, Awaitable
+
+from agentscope.message import Msg
+
+
+# 摘要函数签名: (已有摘要, 待折叠的消息列表) -> 新摘要
+Summarizer = Callable[[str, List[Msg]], Awaitable[str]]
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数量：中日韩字符按1个token计，其余字符按4个字符1个token计"""
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    return cjk_count + math.ceil((len(text) - cjk_count) / 4)
+
+
+def _content_text(msg: Msg) -> str:
+    """获取消息内容的文本形式"""
+    content = msg.content
+    if isinstance(content, str):
+        return content
+    try:
+        return json.dumps(content, ensure_ascii=False, default=str)
+    except Exception:
+        return str(content)
+
+
+class BoundedMemory:
+    """有界对话记忆类
+
+    接口与 agentscope 的 InMemoryMemory 保持一致（add / delete / size / clear / get_memory），
+    但只保留最近 max_turns 轮对话原文，超出轮数或超出字节/token上限的旧消息会被移入待折叠队列，
+    由后台任务调用 summarizer 合并进滚动摘要。未提供 summarizer 或摘要失败时，
+    使用本地截断的方式折叠，保证记忆占用始终有上限。
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 20,
+        max_bytes: int = 256 * 1024,
+        max_tokens: int = 8000,
+        max_summary_chars: int = 2000,
+        fold_batch_size: int = 8,
+        summarizer: Optional[Summarizer] = None
+    ):
+        # 一轮对话包含用户消息和助手回复两条消息
+        self.max_messages = max(1, max_turns * 2)
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.max_summary_chars = max_summary_chars
+        self.fold_batch_size = max(1, fold_batch_size)
+        self.summarizer = summarizer
+
+        # (消息, 字节数, token数)
+        self._recent: deque = deque()
+        self._pending: List[tuple] = []
+        self._summary = ""
+        self._bytes = 0
+        self._tokens = 0
+        self._fold_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], summarizer: Optional[Summarizer] = None) -> "BoundedMemory":
+        """根据配置文件中的 memory 段创建实例"""
+        config = config or {}
+        return cls(
+            max_turns=config.get("max_turns", 20),
+            max_bytes=config.get("max_bytes", 256 * 1024),
+            max_tokens=config.get("max_tokens", 8000),
+            max_summary_chars=config.get("max_summary_chars", 2000),
+            fold_batch_size=config.get("fold_batch_size", 8),
+            summarizer=summarizer
+        )
+
+    @property
+    def summary(self) -> str:
+        """当前滚动摘要"""
+        return self._summary
+
+    @staticmethod
+    def _cost(name: str, content: str) -> tuple:
+        text = f"{name}: {content}"
+        return len(text.encode('utf-8')), estimate_tokens(text)
+
+    def _measure(self, msg: Msg) -> tuple:
+        return (msg,) + self._cost(msg.name, _content_text(msg))
+
+    def _fit(self, msg: Msg) -> tuple:
+        """测量消息；单条消息超过字节/token上限时保存截断后的副本（不修改调用方的消息），保证硬上限始终成立"""
+        entry = self._measure(msg)
+        if entry[1] <= self.max_bytes and entry[2] <= self.max_tokens:
+            return entry
+        text, marker = _content_text(msg), "…（已截断）"
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            size, tokens = self._cost(msg.name, text[:middle] + marker)
+            if size <= self.max_bytes and tokens <= self.max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        truncated = Msg(name=msg.name, content=text[:low] + marker, role=msg.role)
+        truncated.id = msg.id
+        return self._measure(truncated)
+
+    def _summary_cost(self) -> tuple:
+        return len(self._summary.encode('utf-8')), estimate_tokens(self._summary)
+
+    def _over_limit(self, include_pending: bool = False) -> bool:
+        summary_bytes, summary_tokens = self._summary_cost()
+        total_bytes = self._bytes + summary_bytes
+        total_tokens = self._tokens + summary_tokens
+        if include_pending:
+            total_bytes += sum(entry[1] for entry in self._pending)
+            total_tokens += sum(entry[2] for entry in self._pending)
+        return total_bytes > self.max_bytes or total_tokens > self.max_tokens
+
+    async def add(self, memories: Union[Msg, List[Msg], None], allow_duplicates: bool = False) -> None:
+        """添加消息到记忆，超出上限的旧消息会被折叠"""
+        if memories is None:
+            return
+        if isinstance(memories, Msg):
+            memories = [memories]
+
+        if not allow_duplicates:
+            existing_ids = {entry[0].id for entry in self._recent}
+            existing_ids.update(entry[0].id for entry in self._pending)
+            memories = [msg for msg in memories if msg.id not in existing_ids]
+
+        for msg in memories:
+            entry = self._fit(msg)
+            self._recent.append(entry)
+            self._bytes += entry[1]
+            self._tokens += entry[2]
+
+        self._enforce_limits()
+        self._schedule_fold()
+
+    def _enforce_limits(self):
+        """按轮数和字节/token硬上限移出旧消息"""
+        # 至少保留最新的一条消息（单条消息在 add 时已截断到上限以内）
+        while len(self._recent) > 1 and (len(self._recent) > self.max_messages or self._over_limit()):
+            entry = self._recent.popleft()
+            self._bytes -= entry[1]
+            self._tokens -= entry[2]
+            self._pending.append(entry)
+
+        # 待折叠队列也计入上限：后台摘要跟不上或超限时直接本地折叠
+        if self._pending and (
+            self.summarizer is None
+            or len(self._pending) > self.max_messages
+            or self._over_limit(include_pending=True)
+        ):
+            self._fold_locally(len(self._pending))
+
+        # 摘要本身也不能突破硬上限
+        while self._summary and self._over_limit():
+            self._summary = self._summary[len(self._summary) // 2 + 1:]
+
+    def _fold_locally(self, count: int):
+        """不调用模型，将待折叠消息截断后追加到摘要中"""
+        lines = []
+        for msg, _, _ in self._pending[:count]:
+            text = re.sub(r'\s+', ' ', _content_text(msg)).strip()
+            lines.append(f"{msg.name}: {text[:100]}")
+        del self._pending[:count]
+
+        summary = "\n".join(filter(None, [self._summary] + lines))
+        # 保留最新的摘要内容
+        self._summary = summary[-self.max_summary_chars:]
+
+    def _schedule_fold(self):
+        """在当前事件循环中启动后台摘要任务"""
+        if not self._pending or self.summarizer is None:
+            return
+        if self._fold_task is not None and not self._fold_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._fold_task = loop.create_task(self._fold_pending())
+
+    async def _fold_pending(self):
+        """后台任务：分批调用summarizer把待折叠消息合并进摘要"""
+        while self._pending:
+            batch = self._pending[:self.fold_batch_size]
+            try:
+                summary = await self.summarizer(self._summary, [entry[0] for entry in batch])
+            except asyncio.CancelledError:
+                # 事件循环关闭时任务被取消，待折叠消息保留到下一次
+                raise
+            except Exception:
+                summary = None
+
+            # 等待期间队列可能已被本地折叠
+            if self._pending[:len(batch)] != batch:
+                continue
+
+            if summary:
+                del self._pending[:len(batch)]
+                self._summary = summary.strip()[:self.max_summary_chars]
+            else:
+                self._fold_locally(len(batch))
+
+            self._enforce_limits()
+
+    async def flush(self) -> None:
+        """等待所有待折叠消息合并进摘要"""
+        if self.summarizer is None:
+            self._fold_locally(len(self._pending))
+            return
+        if self._fold_task is not None and not self._fold_task.done():
+            await self._fold_task
+        if self._pending:
+            await self._fold_pending()
+
+    async def get_memory(self) -> List[Msg]:
+        """获取记忆：滚动摘要（如有）+ 最近的原始消息"""
+        messages = []
+        if self._summary:
+            messages.append(Msg(name="summary", content=f"早期对话摘要：\n{self._summary}", role="system"))
+        messages.extend(entry[0] for entry in self._pending)
+        messages.extend(entry[0] for entry in self._recent)
+        return messages
+
+    async def delete(self, index: Union[int, List[int]]) -> None:
+        """按下标删除最近的原始消息"""
+        indices = [index] if isinstance(index, int) else index
+        for i in sorted(set(indices), reverse=True):
+            if 0 <= i < len(self._recent):
+                msg, size, tokens = self._recent[i]
+                del self._recent[i]
+                self._bytes -= size
+                self._tokens -= tokens
+
+    async def size(self) -> int:
+        """获取原始消息数量"""
+        return len(self._pending) + len(self._recent)
+
+    async def clear(self) -> None:
+        """清空记忆"""
+        if self._fold_task is not None and not self._fold_task.done():
+            self._fold_task.cancel()
+        self._fold_task = None
+        self._recent.clear()
+        self._pending.clear()
+        self._summary = ""
+        self._bytes = 0
+        self._tokens = 0
+
+    def get_usage(self) -> Dict[str, Any]:
+        """获取当前记忆占用情况"""
+        summary_bytes, summary_tokens = self._summary_cost()
+        pending_bytes = sum(entry[1] for entry in self._pending)
+        pending_tokens = sum(entry[2] for entry in self._pending)
+        return {
+            "messages": len(self._recent),
+            "pending": len(self._pending),
+            "bytes": self._bytes + pending_bytes + summary_bytes,
+            "tokens": self._tokens + pending_tokens + summary_tokens,
+            "summary_chars": len(self._summary),
+            "max_bytes": self.max_bytes,
+            "max_tokens": self.max_tokens
+        }
+
+    def state_dict(self) -> Dict[str, Any]:
+        """导出记忆状态"""
+        return {
+            "summary": self._summary,
+            "content": [entry[0].to_dict() for entry in list(self._pending) + list(self._recent)]
+        }
+
+    def load_state_dict(self, state_dict: Dict[str, Any], strict: bool = True) -> None:
+        """加载记忆状态"""
+        self._recent.clear()
+        self._pending.clear()
+        self._bytes = 0
+        self._tokens = 0
+        self._summary = state_dict.get("summary", "")
+        for data in state_dict.get("content", []):
+            entry = self._fit(Msg.from_dict(data))
+            self._recent.append(entry)
+            self._bytes += entry[1]
+            self._tokens += entry[2]
+        self._enforce_limits()
@@ -0,0 +1,160 @@
+"""批量导入检查点日志 - 记录已提交的文件和文档块ID范围，中断后重新运行可从断点继续
+
+日志是追加写入的JSONL文件，每个文件写入前记录一条 begin，写入向量库后记录一条 commit：
+    {"op": "header", "collection_id": "...", "version": 1}
+    {"op": "begin", "source": "a.pdf"}
+    {"op": "commit", "source": "a.pdf", "mtime": 1700000000.0, "size": 1234, "chunks": 12, "first_id": "...", "last_id": "..."}
+
+重新运行时：
+- 已 commit 且文件大小、修改时间未变的文件直接跳过；
+- 只有 begin 没有 commit 的文件（写入中途中断）先回滚已写入的文档块，再重新处理。
+
+每条记录写入后只 flush 到操作系统，按 ``fsync_interval`` 间隔才 fsync，正常导入路径几乎没有额外开销；
+进程崩溃不会丢失已 flush 的记录，断电最多丢失最近一个间隔的记录（对应文件会被重新导入，结果仍然幂等）。
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, List
+
+JOURNAL_VERSION = 1
+
+
+class IngestJournal:
+    """导入检查点日志"""
+
+    def __init__(self, path: str, collection_id: Optional[str] = None, fsync_interval: float = 1.0):
+        self.path = path
+        self.collection_id = collection_id
+        self.fsync_interval = fsync_interval
+
+        # source -> 最后一条记录
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._file = None
+        self._lines = 0
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    def open(self) -> "IngestJournal":
+        """读取已有日志并打开追加写入；集合ID不一致（集合被清空重建）时丢弃旧日志"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        header = self._load()
+        if header is not None and header.get("collection_id") != self.collection_id:
+            self.entries.clear()
+            header = None
+
+        if header is None or self._lines > 2 * len(self.entries) + 16:
+            # 新日志，或日志中重复记录过多时压缩重写
+            self._rewrite()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last_sync = time.monotonic()
+        return self
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def is_committed(self, source: str, file_path: str) -> bool:
+        """文件已提交且大小和修改时间未变"""
+        entry = self.entries.get(source)
+        if entry is None or entry["op"] != "commit":
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+
+    def uncommitted(self) -> List[str]:
+        """写入中途中断、需要回滚的来源"""
+        return [source for source, entry in self.entries.items() if entry["op"] == "begin"]
+
+    def begin(self, source: str):
+        self._append({"op": "begin", "source": source})
+
+    def commit(self, source: str, file_path: str, chunk_ids: List[str]):
+        self.commit_range(source, file_path, len(chunk_ids),
+                          chunk_ids[0] if chunk_ids else None, chunk_ids[-1] if chunk_ids else None)
+
+    def commit_range(self, source: str, file_path: str, chunks: int, first_id: Optional[str], last_id: Optional[str]):
+        """按块数和首尾块ID提交（压缩包等分批写入的来源不需要保留全部块ID）"""
+        stat = os.stat(file_path)
+        self._append({
+            "op": "commit",
+            "source": source,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "chunks": chunks,
+            "first_id": first_id,
+            "last_id": last_id
+        })
+
+    def rolled_back(self, source: str):
+        """回滚完成后移除记录"""
+        self._append({"op": "rollback", "source": source})
+
+    def stats(self) -> Dict[str, int]:
+        committed = sum(1 for entry in self.entries.values() if entry["op"] == "commit")
+        return {"committed": committed, "uncommitted": len(self.uncommitted())}
+
+    def _append(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._apply(record)
+            self._file.write(line)
+            self._file.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def _apply(self, record: Dict[str, Any]):
+        self._lines += 1
+        if record["op"] == "rollback":
+            self.entries.pop(record["source"], None)
+        elif record["op"] in ("begin", "commit"):
+            self.entries[record["source"]] = record
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """读取日志，返回header；文件末尾被截断的半行记录会被忽略"""
+        if not os.path.exists(self.path):
+            return None
+        header = None
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("op") == "header":
+                    header = record
+                else:
+                    self._apply(record)
+        if header is None or header.get("version") != JOURNAL_VERSION:
+            self.entries.clear()
+            return None
+        return header
+
+    def _rewrite(self):
+        """写入header和当前有效记录，先写临时文件再原子替换"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"op": "header", "collection_id": self.collection_id, "version": JOURNAL_VERSION}) + "\n")
+            for entry in self.entries.values():
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        self._lines = len(self.entries)
@@ -0,0 +1,279 @@
+"""导入时的近重复文档块检测 - MinHash签名 + LSH分桶，近重复的块合并为一个存储块并记录所有来源
+
+- 每个块按字符 n-gram（默认5）取集合，用 ``num_perm`` 个哈希函数计算 MinHash 签名；
+- 签名切成 ``bands`` 段，每段的哈希写入 SQLite 的分桶表，查找候选只需按 (段号, 哈希) 查索引；
+- 候选块的签名估计 Jaccard 相似度达到 ``threshold`` 时视为近重复，新块不再写入向量库，
+  只把来源加入已存储块的来源列表（元数据 ``sources`` 为JSON数组字符串，``source`` 为当前所属来源）。
+
+来源与块的引用关系保存在 SQLite 中：某个来源删除或更新后，只被它引用的块才会从向量库删除；
+仍被其他来源引用的块转移给其他来源，保证每个来源的内容都可检索。
+同一个集合的写入在锁内串行执行（提取和签名计算在锁外），以保证分桶索引和向量库一致。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from processors.chunk import ChunkBatch
+
+# Mersenne 素数 2^31-1，保证 a*x+b 在 uint64 内不溢出，且可以用移位折叠代替取模
+_PRIME = (1 << 31) - 1
+
+
+class MinHasher:
+    """MinHash 签名计算"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        import numpy as np
+
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)[:, None]
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)[:, None]
+
+    def shingle_hashes(self, text: str):
+        """归一化空白和大小写后，对字符 n-gram 计算多项式滚动哈希（向量化，去重后返回）"""
+        import numpy as np
+
+        text = " ".join(text.lower().split())
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        count = max(len(codes) - self.shingle_size + 1, 1)
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(min(self.shingle_size, len(codes))):
+            # uint64 溢出按模 2^64 回绕，相当于对 2^64 取模的多项式哈希
+            hashes = hashes * np.uint64(1000003) + codes[offset:offset + count]
+        hashes ^= hashes >> np.uint64(31)
+        return np.unique(hashes & np.uint64(_PRIME))
+
+    def signature(self, text: str):
+        import numpy as np
+
+        values = self.shingle_hashes(text)
+        hashed = self._a * values[None, :]
+        hashed += self._b
+        # 用 Mersenne 素数的移位折叠代替取模（结果落在 [0, 2p]，对 MinHash 只需保证一致）
+        folded = hashed & np.uint64(_PRIME)
+        hashed >>= np.uint64(31)
+        folded += hashed
+        return folded.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(first, second) -> float:
+        """由签名估计 Jaccard 相似度"""
+        return float((first == second).mean())
+
+
+class ChunkDeduplicator:
+    """近重复块检测与引用管理（每个向量集合一个实例）"""
+
+    def __init__(
+        self,
+        db_path: str,
+        collection_id: Optional[str] = None,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.db_path = db_path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_schema(collection_id)
+
+    @classmethod
+    def for_vector_store(cls, vector_store, config: Optional[Dict[str, Any]] = None) -> "ChunkDeduplicator":
+        """为向量存储创建去重器，索引文件放在向量库目录下，并与集合ID绑定"""
+        config = config or {}
+        return cls(
+            db_path=os.path.join(vector_store.persist_directory, f"dedupe-{vector_store.collection_name}.sqlite3"),
+            collection_id=vector_store.get_collection_id(),
+            threshold=config.get("threshold", 0.85),
+            num_perm=config.get("num_perm", 64),
+            bands=config.get("bands", 16),
+            shingle_size=config.get("shingle_size", 5)
+        )
+
+    def _init_schema(self, collection_id: Optional[str]):
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, owner TEXT NOT NULL, signature BLOB NOT NULL);
+                CREATE TABLE IF NOT EXISTS refs (source TEXT NOT NULL, chunk_id TEXT NOT NULL, PRIMARY KEY (source, chunk_id));
+                CREATE INDEX IF NOT EXISTS refs_chunk ON refs (chunk_id);
+                CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, hash INTEGER NOT NULL, chunk_id TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, hash);
+                CREATE INDEX IF NOT EXISTS bands_chunk ON bands (chunk_id);
+            """)
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'collection_id'").fetchone()
+            if row is not None and row[0] != collection_id:
+                # 集合已被删除重建，旧的索引失效
+                self._db.executescript("DELETE FROM chunks; DELETE FROM refs; DELETE FROM bands;")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('collection_id', ?)", (collection_id,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _band_hashes(self, signature) -> List[int]:
+        rows = self.rows
+        return [
+            int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+                           "big", signed=True)
+            for band in range(self.bands)
+        ]
+
+    def _find_duplicate(self, signature, band_hashes: List[int]) -> Optional[str]:
+        """在分桶索引中查找最相似且达到阈值的块"""
+        import numpy as np
+
+        candidates = set()
+        for band, band_hash in enumerate(band_hashes):
+            for (chunk_id,) in self._db.execute(
+                "SELECT chunk_id FROM bands WHERE band = ? AND hash = ?", (band, band_hash)
+            ):
+                candidates.add(chunk_id)
+
+        best_id, best_score = None, self.threshold
+        for chunk_id in candidates:
+            row = self._db.execute("SELECT signature FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is None:
+                continue
+            score = self.hasher.similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+            if score >= best_score:
+                best_id, best_score = chunk_id, score
+        return best_id
+
+    def _sources_of(self, chunk_id: str) -> List[str]:
+        return [source for (source,) in self._db.execute(
+            "SELECT source FROM refs WHERE chunk_id = ? ORDER BY source", (chunk_id,)
+        )]
+
+    def _release(self, source: str, chunk_ids, vector_store, new_owners: set) -> int:
+        """解除来源对块的引用：无人引用的块删除，所属来源被移除的块转移给其他来源（记入 new_owners），返回删除的块数"""
+        to_delete, updates = [], {}
+        for chunk_id in chunk_ids:
+            self._db.execute("DELETE FROM refs WHERE source = ? AND chunk_id = ?", (source, chunk_id))
+            remaining = self._sources_of(chunk_id)
+            if not remaining:
+                self._db.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id,))
+                self._db.execute("DELETE FROM bands WHERE chunk_id = ?", (chunk_id,))
+                to_delete.append(chunk_id)
+                continue
+            owner = self._db.execute("SELECT owner FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()[0]
+            if owner == source:
+                owner = remaining[0]
+                self._db.execute("UPDATE chunks SET owner = ? WHERE chunk_id = ?", (owner, chunk_id))
+                new_owners.add(owner)
+            updates[chunk_id] = self._source_metadata(owner, remaining)
+
+        if updates:
+            vector_store.update_metadatas(list(updates), list(updates.values()))
+        if to_delete:
+            vector_store.delete_ids(to_delete)
+        return len(to_delete)
+
+    @staticmethod
+    def _source_metadata(owner: str, sources: List[str]) -> Dict[str, Any]:
+        return {"source": owner, "sources": json.dumps(sources, ensure_ascii=False), "duplicates": len(sources) - 1}
+
+    def sync_source(self, vector_store, chunks: "ChunkBatch") -> Dict[str, int]:
+        """按块同步一个来源，近重复的块只记录引用，返回 {added, kept, deleted, duplicates}"""
+        source, texts, ids = chunks.source, chunks.texts, chunks.ids
+        with metrics.span("dedupe.signature"):
+            signatures = [self.hasher.signature(text) for text in texts]
+            band_hashes = [self._band_hashes(signature) for signature in signatures]
+
+        with self._lock, self._db:
+            previous = {chunk_id for (chunk_id,) in self._db.execute(
+                "SELECT chunk_id FROM refs WHERE source = ?", (source,)
+            )}
+            with metrics.span("dedupe.lookup"):
+                canonical, new_positions, duplicates = [], [], 0
+                for i, chunk_id in enumerate(ids):
+                    if chunk_id in previous:
+                        canonical.append(chunk_id)
+                        continue
+                    match = self._find_duplicate(signatures[i], band_hashes[i])
+                    if match is not None:
+                        canonical.append(match)
+                        duplicates += 1
+                        continue
+                    # 新块：立即写入索引，同一文件中之后的近重复块也能匹配到它
+                    self._db.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)",
+                                     (chunk_id, source, signatures[i].tobytes()))
+                    self._db.executemany("INSERT INTO bands VALUES (?, ?, ?)",
+                                         [(band, band_hash, chunk_id) for band, band_hash in enumerate(band_hashes[i])])
+                    canonical.append(chunk_id)
+                    new_positions.append(i)
+
+            current = set(canonical)
+            new_ids = {ids[i] for i in new_positions}
+            self._db.executemany("INSERT OR IGNORE INTO refs VALUES (?, ?)", [(source, chunk_id) for chunk_id in current])
+
+            # 先写入新块，再更新被引用块的来源列表，最后释放不再引用的块
+            if new_positions:
+                vector_store.add_chunks(chunks, new_positions, self._source_metadata(source, [source]))
+            referenced = [chunk_id for chunk_id in current - previous if chunk_id not in new_ids]
+            if referenced:
+                updates = []
+                for chunk_id in referenced:
+                    owner = self._db.execute("SELECT owner FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()[0]
+                    updates.append(self._source_metadata(owner, self._sources_of(chunk_id)))
+                vector_store.update_metadatas(referenced, updates)
+            new_owners = set()
+            deleted = self._release(source, previous - current, vector_store, new_owners)
+
+        # 所属块有变化的来源需要更新文档级索引
+        if new_positions or deleted:
+            new_owners.add(source)
+        vector_store.refresh_doc_vectors(new_owners)
+        metrics.inc("dedupe_duplicates_total", duplicates)
+        metrics.inc("dedupe_chunks_total", len(texts))
+        return {
+            "added": len(new_positions),
+            "kept": len(ids) - len(new_positions) - duplicates,
+            "deleted": deleted,
+            "duplicates": duplicates
+        }
+
+    def remove_source(self, vector_store, source: str) -> int:
+        """删除来源：只删除不再被其他来源引用的块，返回删除的块数"""
+        with self._lock, self._db:
+            chunk_ids = [chunk_id for (chunk_id,) in self._db.execute(
+                "SELECT chunk_id FROM refs WHERE source = ?", (source,)
+            )]
+            new_owners = {source}
+            deleted = self._release(source, chunk_ids, vector_store, new_owners)
+        if not chunk_ids:
+            # 启用去重之前写入的块没有引用记录，按来源直接删除
+            deleted = vector_store.delete_by_source(source)
+        vector_store.refresh_doc_vectors(new_owners)
+        return deleted
+
+    def sources_with_prefix(self, prefix: str) -> List[str]:
+        """引用记录中以 prefix 开头的来源（如压缩包的成员，其块可能全部是其他来源的重复块，向量库元数据中查不到）"""
+        with self._lock:
+            return [source for (source,) in self._db.execute(
+                "SELECT DISTINCT source FROM refs WHERE substr(source, 1, ?) = ?", (len(prefix), prefix)
+            )]
+
+    def get_stats(self) -> Dict[str, int]:
+        """存储块数和引用数，引用数与存储块数之差即去重节省的块数"""
+        with self._lock:
+            chunks = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            refs = self._db.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {"stored_chunks": chunks, "references": refs}
@@ -0,0 +1,189 @@
+"""嵌入服务 - 专用线程按优先级合并多个请求的文本，动态批量计算嵌入
+
+检索查询和导入写入不再各自在调用线程中计算嵌入，而是提交到同一个请求队列：
+- 交互式查询（INTERACTIVE）优先于批量导入（BULK），同优先级按提交顺序；
+- 大的导入窗口按 max_batch_size 切片处理，切片之间可以插入查询，查询最多等待一个批次；
+- 批次在达到 max_batch_size 或最早请求的等待期限到达时提交计算，交互式请求的等待期限更短。
+
+记录的指标：
+    embedding_service_batch_size        每批文本数（直方图）
+    embedding_service_queue_seconds     请求从提交到开始计算的等待时间（按 priority 标签区分）
+    embedding_service.embed_seconds     每批计算耗时
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional
+
+from utils.metrics import metrics
+
+INTERACTIVE = 0
+BULK = 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+metrics.set_buckets("embedding_service_batch_size", (1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+
+
+class _Request:
+    """一次嵌入请求，可能被拆到多个批次中计算"""
+
+    __slots__ = ("texts", "priority", "future", "results", "cursor", "done", "enqueued_at", "deadline")
+
+    def __init__(self, texts: List[str], priority: int, wait: float):
+        self.texts = texts
+        self.priority = priority
+        self.future: Future = Future()
+        self.results: list = [None] * len(texts)
+        # 下一个尚未放入批次的文本位置，以及已完成计算的文本数
+        self.cursor = 0
+        self.done = 0
+        self.enqueued_at = time.perf_counter()
+        self.deadline = self.enqueued_at + wait
+
+
+class EmbeddingService:
+    """嵌入服务
+
+    所有嵌入计算都在一个专用线程中执行，调用方阻塞等待结果（也可以用 submit 拿到 Future）。
+    embedding_function 为空时在服务线程中首次使用Chroma默认的嵌入模型。
+    """
+
+    def __init__(self, embedding_function=None, max_batch_size: int = 64, interactive_wait_ms: float = 2,
+                 bulk_wait_ms: float = 20):
+        self.embedding_function = embedding_function
+        self.max_batch_size = max(1, max_batch_size)
+        self._waits = {INTERACTIVE: interactive_wait_ms / 1000, BULK: bulk_wait_ms / 1000}
+
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._batches = 0
+        self._texts = 0
+        self._thread = threading.Thread(target=self._run, name="EmbeddingService", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None, embedding_function=None) -> Optional["EmbeddingService"]:
+        """根据配置文件中的 embedding_service 段创建服务，未启用时返回 None（调用线程内联计算）"""
+        service_config = (config or {}).get("embedding_service", {})
+        if not service_config.get("enabled", False):
+            return None
+        return cls(
+            embedding_function=embedding_function,
+            max_batch_size=service_config.get("max_batch_size", 64),
+            interactive_wait_ms=service_config.get("interactive_wait_ms", 2),
+            bulk_wait_ms=service_config.get("bulk_wait_ms", 20)
+        )
+
+    def submit(self, texts: List[str], priority: int = BULK) -> Future:
+        """提交嵌入请求，返回结果为嵌入列表（与 texts 顺序一致）的 Future"""
+        request = _Request(list(texts), priority, self._waits.get(priority, self._waits[BULK]))
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("嵌入服务已关闭")
+            heapq.heappush(self._queue, (priority, next(self._sequence), request))
+            self._condition.notify()
+        return request.future
+
+    def embed(self, texts: List[str], priority: int = BULK, timeout: Optional[float] = None) -> list:
+        """计算嵌入并等待结果"""
+        return self.submit(texts, priority).result(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """停止服务线程，已提交的请求先计算完成"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取服务统计"""
+        with self._condition:
+            pending = sum(len(request.texts) - request.cursor for _, _, request in self._queue)
+        return {
+            "batches": self._batches,
+            "texts": self._texts,
+            "mean_batch_size": self._texts / self._batches if self._batches else 0.0,
+            "pending_texts": pending
+        }
+
+    def _next_batch(self) -> Optional[List[tuple]]:
+        """取出下一批 (请求, 起始位置, 结束位置)，队列为空且服务已关闭时返回 None"""
+        with self._condition:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+            # 等待更多请求，直到凑满一批或队首请求到达等待期限
+            while True:
+                pending = sum(len(request.texts) - request.cursor for _, _, request in self._queue)
+                remaining = self._queue[0][2].deadline - time.perf_counter()
+                if pending >= self.max_batch_size or remaining <= 0 or self._closed:
+                    break
+                self._condition.wait(remaining)
+
+            batch, size = [], 0
+            while self._queue and size < self.max_batch_size:
+                request = self._queue[0][2]
+                # 开始计算后请求不能再取消；已取消的请求直接丢弃
+                if request.cursor == 0 and not request.future.set_running_or_notify_cancel():
+                    heapq.heappop(self._queue)
+                    continue
+                if request.future.done():
+                    # 前面的批次计算失败，剩余部分不再计算
+                    heapq.heappop(self._queue)
+                    continue
+                take = min(self.max_batch_size - size, len(request.texts) - request.cursor)
+                batch.append((request, request.cursor, request.cursor + take))
+                request.cursor += take
+                size += take
+                if request.cursor == len(request.texts):
+                    heapq.heappop(self._queue)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                continue
+
+            now = time.perf_counter()
+            texts = []
+            for request, start, end in batch:
+                if start == 0:
+                    metrics.observe("embedding_service_queue_seconds", now - request.enqueued_at,
+                                    {"priority": _PRIORITY_NAMES.get(request.priority, str(request.priority))})
+                texts.extend(request.texts[start:end])
+            metrics.observe("embedding_service_batch_size", len(texts))
+
+            try:
+                if self.embedding_function is None:
+                    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+                    self.embedding_function = DefaultEmbeddingFunction()
+                with metrics.span("embedding_service.embed"):
+                    embeddings = self.embedding_function(texts)
+            except Exception as e:
+                for request, _, _ in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            self._batches += 1
+            self._texts += len(texts)
+            offset = 0
+            for request, start, end in batch:
+                request.results[start:end] = embeddings[offset:offset + end - start]
+                offset += end - start
+                request.done += end - start
+                if request.done == len(request.texts) and not request.future.done():
+                    request.future.set_result(request.results)
@@ -0,0 +1,108 @@
+"""嵌入函数工具 - 提供可离线使用的确定性嵌入函数和查询嵌入缓存"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class HashEmbeddingFunction:
+    """基于字符n-gram哈希的确定性嵌入函数
+
+    不依赖任何模型文件，相同文本在任何机器上得到相同向量，中英文混合文本均可使用。
+    语义效果远不如真实模型，仅用于离线测试、基准测试和压测。
+    """
+
+    def __init__(self, dim: int = 256, ngram: int = 2):
+        self.dim = dim
+        self.ngram = ngram
+
+    @staticmethod
+    def name() -> str:
+        return "docmate_hash"
+
+    def get_config(self) -> dict:
+        return {"dim": self.dim, "ngram": self.ngram}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(**config)
+
+    def is_legacy(self) -> bool:
+        return False
+
+    def default_space(self) -> str:
+        return "cosine"
+
+    def supported_spaces(self) -> List[str]:
+        return ["cosine", "l2", "ip"]
+
+    def embed_one(self, text: str):
+        """计算单条文本的嵌入向量（L2归一化）"""
+        import numpy as np
+        
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = text.lower()
+        n = self.ngram
+        grams = [text[i:i + n] for i in range(max(1, len(text) - n + 1))]
+        if grams and grams[0]:
+            digests = [hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest() for gram in grams]
+            values = np.frombuffer(b"".join(digests), dtype=np.uint64)
+            indices = (values % self.dim).astype(np.intp)
+            # 最高位决定符号，减少哈希冲突带来的偏差
+            signs = np.where(values >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+            np.add.at(vector, indices, signs)
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def __call__(self, input: List[str]) -> list:
+        return [self.embed_one(text) for text in input]
+
+    def embed_query(self, input: List[str]) -> list:
+        return self(input)
+
+
+class QueryEmbeddingCache:
+    """查询嵌入的LRU缓存
+
+    同一个嵌入模型下相同查询文本的嵌入不会变化，集合内容变化也不影响，因此缓存不需要失效，
+    只按容量淘汰最久未使用的查询。常见问题可在启动预热时预先计算放入缓存。
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str) -> str:
+        return query.strip()
+
+    def get(self, query: str):
+        """返回缓存的嵌入，未命中时返回 None"""
+        key = self.key(query)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+            return embedding
+
+    def put(self, query: str, embedding):
+        with self._lock:
+            self._entries[self.key(query)] = embedding
+            self._entries.move_to_end(self.key(query))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def create_embedding_function(name: Optional[str] = None, **kwargs):
+    """根据配置名称创建嵌入函数，"default" 或空值表示使用Chroma默认的嵌入模型"""
+    if not name or name == "default":
+        return None
+    if name == "hash":
+        return HashEmbeddingFunction(**kwargs)
+    raise ValueError(f"未知的嵌入函数: {name}")
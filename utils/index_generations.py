@@ -0,0 +1,385 @@
+"""向量库索引世代 - 在后台构建新集合，原子切换所有使用者，旧集合在进行中的调用结束后回收
+
+写入进程中的智能体、异步门面和发布者共享同一个 ``IndexGenerations`` 对象，它对外提供与 ``VectorStore``
+相同的接口，每次方法调用转发到当前世代：
+
+- 调用开始时取得当前世代的租约，调用期间发生切换也继续使用旧世代，旧世代在所有租约释放后才删除；
+- ``rebuild(populate)`` 创建新世代的集合并调用 populate 填充，期间的写入照常进入当前世代，受影响的来源记录下来，
+  填充完成后交给 populate 追平；最后一轮追平时暂停新的写入（检索不受影响），然后原子切换；
+- 当前世代写入 ``<persist_directory>/generation-<collection_name>.json``（写完临时文件后原子替换），重启后继续使用，
+  上次构建或回收中途退出时留下的集合在启动时删除。
+
+世代 0 使用配置中的集合名（兼容已有数据），之后的世代使用 ``<collection_name>_g<世代号>``。
+"""
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from utils.metrics import metrics
+from utils.vector_store import VectorStore
+
+# 经代理调用时计入写入的方法：切换世代前等待进行中的写入完成，重建期间记录受影响的来源
+WRITE_METHODS = frozenset({
+    "add_documents", "add_chunks", "sync_source", "finish_sync", "delete_by_source", "update_metadatas",
+    "delete_ids", "refresh_doc_vectors", "rebuild_doc_index", "import_snapshot", "delete_collection"
+})
+
+
+class _Generation:
+    """一个索引世代：世代号、向量库和进行中的调用数（租约）"""
+
+    __slots__ = ("number", "store", "leases")
+
+    def __init__(self, number: int, store: VectorStore):
+        self.number = number
+        self.store = store
+        self.leases = 0
+
+
+def _argument(args: tuple, kwargs: Dict[str, Any], index: int, name: str):
+    return args[index] if len(args) > index else kwargs.get(name)
+
+
+def _metadata_sources(metadata: Optional[Dict[str, Any]]) -> Set[str]:
+    """元数据涉及的来源：所属来源，以及去重时引用该块的其他来源（sources 字段）"""
+    if not metadata:
+        return set()
+    sources = {metadata["source"]} if "source" in metadata else set()
+    if "sources" in metadata:
+        try:
+            sources.update(json.loads(metadata["sources"]))
+        except (TypeError, ValueError):
+            pass
+    return sources
+
+
+def written_sources(store: VectorStore, method: str, args: tuple, kwargs: Dict[str, Any]) -> Optional[Set[str]]:
+    """写入方法影响的来源，影响整个集合时（导入快照、删除集合）返回 None"""
+    if method in ("add_chunks", "sync_source", "finish_sync"):
+        return {_argument(args, kwargs, 0, "chunks").source}
+    if method == "delete_by_source":
+        return {_argument(args, kwargs, 0, "source")}
+    if method == "refresh_doc_vectors":
+        return set(_argument(args, kwargs, 0, "sources"))
+    if method in ("add_documents", "update_metadatas"):
+        sources = set()
+        for metadata in _argument(args, kwargs, 1, "metadatas") or []:
+            sources.update(_metadata_sources(metadata))
+        return sources
+    if method == "delete_ids":
+        ids = list(_argument(args, kwargs, 0, "ids"))
+        sources = set()
+        for start in range(0, len(ids), store.write_batch_size):
+            existing = store.collection.get(ids=ids[start:start + store.write_batch_size], include=["metadatas"])
+            for metadata in existing["metadatas"]:
+                sources.update(_metadata_sources(metadata))
+        return sources
+    if method == "rebuild_doc_index":
+        # 文档级索引由块数据派生，新世代导入时自行维护
+        return set()
+    return None
+
+
+class IndexGenerations:
+    """索引世代管理（单写入进程），对外提供与 VectorStore 相同的接口
+
+    factory(collection_name) 创建指定集合名的向量库（其余参数与配置一致）。
+    """
+
+    def __init__(self, factory: Callable[[str], VectorStore], collection_name: str = "documents",
+                 persist_directory: str = "./chroma_db", catch_up_rounds: int = 3):
+        self._factory = factory
+        self._base_name = collection_name
+        self._pointer_path = os.path.join(persist_directory, f"generation-{collection_name}.json")
+        # 暂停写入之前最多追平几轮，每轮处理上一轮期间新写入的来源
+        self._catch_up_rounds = catch_up_rounds
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._writes = 0
+        self._paused = False
+        # 重建期间被写入的来源，为空表示没有进行中的重建；_dirty_all 表示写入影响了整个集合
+        self._dirty: Optional[Set[str]] = None
+        self._dirty_all = False
+        self._swap_listeners: List[Callable[[VectorStore, VectorStore], None]] = []
+        self._retiring: List[threading.Thread] = []
+        self.rebuild_status: Dict[str, Any] = {"state": "idle"}
+
+        number = self._read_pointer()
+        self._current = _Generation(number, factory(self.collection_name_of(number)))
+        self._last_number = number
+
+    @classmethod
+    def from_config(cls, factory: Callable[[str], VectorStore],
+                    config: Optional[Dict[str, Any]] = None) -> "IndexGenerations":
+        """根据配置文件中的 vector_store 段创建"""
+        vector_config = (config or {}).get("vector_store", {})
+        return cls(
+            factory,
+            collection_name=vector_config.get("collection_name", "documents"),
+            persist_directory=vector_config.get("persist_directory", "./chroma_db"),
+            catch_up_rounds=vector_config.get("reindex_catch_up_rounds", 3)
+        )
+
+    def collection_name_of(self, number: int) -> str:
+        """世代对应的集合名"""
+        return self._base_name if number == 0 else f"{self._base_name}_g{number:06d}"
+
+    @property
+    def generation(self) -> int:
+        """当前世代号"""
+        return self._current.number
+
+    @property
+    def current(self) -> VectorStore:
+        """当前世代的向量库（不取租约，只用于不会跨越世代切换的短操作）"""
+        return self._current.store
+
+    def __getattr__(self, name: str):
+        # 只有本对象上不存在的属性才会到这里：数据属性取当前世代的值，方法在调用时才选择世代
+        if name.startswith("__") or "_current" not in self.__dict__:
+            raise AttributeError(name)
+        value = getattr(self._current.store, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            if name not in WRITE_METHODS:
+                with self.lease() as store:
+                    return getattr(store, name)(*args, **kwargs)
+            with self.writing(), self.lease() as store:
+                self._record_write(store, name, args, kwargs)
+                return getattr(store, name)(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    # ------------------------------------------------------------------
+    # 租约和写入
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def lease(self):
+        """取得当前世代的租约，返回其向量库：租约期间即使切换了世代，该向量库也不会被删除"""
+        with self._condition:
+            generation = self._current
+            generation.leases += 1
+        try:
+            yield generation.store
+        finally:
+            with self._condition:
+                generation.leases -= 1
+                if generation.leases == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """由多次调用组成的写入操作（如去重同步），整体完成前不会切换世代；同一线程中可以嵌套"""
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            with self._condition:
+                while self._paused:
+                    self._condition.wait()
+                self._writes += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                with self._condition:
+                    self._writes -= 1
+                    if self._writes == 0:
+                        self._condition.notify_all()
+
+    def _record_write(self, store: VectorStore, method: str, args: tuple, kwargs: Dict[str, Any]):
+        if self._dirty is None:
+            return
+        sources = written_sources(store, method, args, kwargs)
+        with self._condition:
+            if self._dirty is None:
+                return
+            if sources is None:
+                self._dirty_all = True
+            else:
+                self._dirty.update(sources)
+
+    def _take_dirty(self) -> List[str]:
+        with self._condition:
+            if self._dirty_all:
+                raise RuntimeError("重建期间整个集合被替换（导入快照或删除集合），放弃本次重建")
+            sources, self._dirty = sorted(self._dirty), set()
+        return sources
+
+    # ------------------------------------------------------------------
+    # 重建和切换
+    # ------------------------------------------------------------------
+
+    def add_swap_listener(self, callback: Callable[[VectorStore, VectorStore], None]):
+        """注册切换回调 callback(旧向量库, 新向量库)，在暂停写入期间调用（如替换与集合绑定的去重状态）"""
+        self._swap_listeners.append(callback)
+
+    def rebuild(self, populate: Callable[[VectorStore, Optional[List[str]]], None]) -> Dict[str, Any]:
+        """构建新世代并切换，返回统计信息（同步执行，调用方在后台线程中运行）
+
+        populate(store, None) 填充整个新集合；populate(store, sources) 追平重建期间被写入的来源
+        （按当前世代中的状态重新处理或删除）。populate 只能直接写入传入的 store，不能经本对象写入。
+        """
+        with self._condition:
+            if self._dirty is not None:
+                raise RuntimeError("已有索引重建正在进行")
+            self._dirty, self._dirty_all = set(), False
+            self._last_number += 1
+            number = self._last_number
+        store = self._create_store(number)
+        stats = {"generation": number, "previous": self.generation, "catch_up_sources": 0}
+        self.rebuild_status = {"state": "building", "generation": number}
+        try:
+            with metrics.span("index_generations.build"):
+                populate(store, None)
+            for _ in range(self._catch_up_rounds):
+                sources = self._take_dirty()
+                if not sources:
+                    break
+                stats["catch_up_sources"] += len(sources)
+                populate(store, sources)
+            store.warmup()
+
+            # 最后一轮：暂停新的写入，等待进行中的写入完成后追平并切换（检索照常进行）
+            with self._condition:
+                self._paused = True
+                while self._writes:
+                    self._condition.wait()
+            try:
+                with metrics.span("index_generations.swap"):
+                    sources = self._take_dirty()
+                    stats["catch_up_sources"] += len(sources)
+                    if sources:
+                        populate(store, sources)
+                    self._swap(_Generation(number, store))
+            finally:
+                with self._condition:
+                    self._paused = False
+                    self._condition.notify_all()
+        except Exception as e:
+            self._drop(store)
+            self.rebuild_status = {"state": "failed", "generation": number, "error": str(e)}
+            raise
+        finally:
+            with self._condition:
+                self._dirty, self._dirty_all = None, False
+
+        stats["count"] = store.collection.count()
+        self.rebuild_status = dict(stats, state="completed")
+        metrics.inc("index_generations_swaps_total")
+        print(f"🔁 已切换到索引世代 {number}（{stats['count']} 个文档块，追平 {stats['catch_up_sources']} 个来源）")
+        return stats
+
+    def reset(self) -> Dict[str, Any]:
+        """切换到一个空的新世代（清空存储），旧世代在进行中的调用结束后删除"""
+        return self.rebuild(lambda store, sources: None)
+
+    def _create_store(self, number: int) -> VectorStore:
+        store = self._factory(self.collection_name_of(number))
+        # 查询嵌入与集合无关，新世代沿用当前的查询缓存，切换后不用重新计算常见问题的嵌入
+        store.query_cache = self._current.store.query_cache
+        return store
+
+    def _swap(self, generation: _Generation):
+        """写入世代指针并替换当前世代（调用时写入已暂停），旧世代交给后台线程回收"""
+        temp_path = self._pointer_path + ".tmp"
+        os.makedirs(os.path.dirname(self._pointer_path) or ".", exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"generation": generation.number, "collection_name": generation.store.collection_name}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self._pointer_path)
+
+        with self._condition:
+            old = self._current
+            self._current = generation
+        for callback in self._swap_listeners:
+            try:
+                callback(old.store, generation.store)
+            except Exception as e:
+                print(f"⚠️ 索引世代切换回调失败: {str(e)}")
+
+        thread = threading.Thread(target=self._retire, args=(old,), name="IndexGenerationGC", daemon=True)
+        self._retiring = [item for item in self._retiring if item.is_alive()] + [thread]
+        thread.start()
+
+    def _retire(self, generation: _Generation):
+        """等待旧世代的租约全部释放后删除其集合"""
+        with self._condition:
+            while generation.leases:
+                self._condition.wait()
+        self._drop(generation.store)
+        metrics.inc("index_generations_retired_total")
+
+    @staticmethod
+    def _drop(store: VectorStore):
+        try:
+            store.delete_collection()
+        except Exception as e:
+            print(f"⚠️ 删除索引世代集合 {store.collection_name} 失败: {str(e)}")
+
+    def wait_retired(self, timeout: Optional[float] = None):
+        """等待已切换下来的旧世代回收完成"""
+        for thread in list(self._retiring):
+            thread.join(timeout)
+
+    # ------------------------------------------------------------------
+    # 世代指针
+    # ------------------------------------------------------------------
+
+    def _read_pointer(self) -> int:
+        try:
+            with open(self._pointer_path, "r", encoding="utf-8") as file:
+                return int(json.load(file)["generation"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+
+    def collect_garbage(self) -> List[str]:
+        """删除当前世代以外的世代集合（上次构建或回收中途退出时留下的），返回删除的集合名"""
+        if self._dirty is not None:
+            # 重建进行中，新世代的集合还未切换
+            return []
+        pattern = re.compile(rf"{re.escape(self._base_name)}(_g\d{{6}})?")
+        current = self.collection_name_of(self.generation)
+        names = [getattr(item, "name", item) for item in self._current.store.client.list_collections()]
+        stale = [name for name in names if pattern.fullmatch(name) and name != current]
+        for name in stale:
+            self._drop(self._factory(name))
+        return stale
+
+    def get_stats(self) -> Dict[str, Any]:
+        """当前世代、正在回收的旧世代数和最近一次重建的状态"""
+        return {
+            "generation": self.generation,
+            "collection_name": self.collection_name_of(self.generation),
+            "retiring": sum(1 for thread in self._retiring if thread.is_alive()),
+            "rebuild": dict(self.rebuild_status)
+        }
+
+
+def copy_sources(source_store: VectorStore, target_store: VectorStore, sources: List[str]) -> Tuple[int, int]:
+    """把来源的文档块连同嵌入从一个向量库复制到另一个（不重新嵌入），来源在源库中已没有文档块时从目标库删除，
+    返回 (复制的块数, 删除的块数)"""
+    copied = deleted = 0
+    for source in sources:
+        # 分页复制，大来源一次读取会超出SQLite变量数限制
+        current = set()
+        for page in source_store._pages(where={"source": source}, include=["documents", "metadatas", "embeddings"]):
+            target_store.add_documents(page["documents"], page["metadatas"], page["ids"],
+                                       embeddings=page["embeddings"], upsert=True)
+            current.update(page["ids"])
+        copied += len(current)
+        stale = [chunk_id for page in target_store._pages(where={"source": source}) for chunk_id in page["ids"]
+                 if chunk_id not in current]
+        if stale:
+            target_store.delete_ids(stale)
+            deleted += len(stale)
+        target_store.refresh_doc_vectors([source])
+    return copied, deleted
@@ -0,0 +1,260 @@
+"""后台导入任务队列 - 在常驻事件循环中按顺序执行导入任务，报告进度并支持取消
+
+每个文件处理完成后即写入向量库，导入进行中的问答可以检索到已经完成的部分。
+取消任务时，正在处理的文件会继续完成，剩余文件不再处理。
+任务的文件可以是列表，也可以是边扫描边产出的迭代器（目录导入），扫描和导入同时进行。
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable, Union
+
+# 从迭代器中每次取出的路径数（在线程池中执行，避免目录扫描阻塞事件循环）
+_FEED_BATCH = 256
+
+
+class IngestionJob:
+    """单个导入任务及其进度"""
+
+    def __init__(self, file_paths: Union[List[str], Iterable[str]], journal_key: Optional[str] = None,
+                 deleted: Optional[List[str]] = None, name: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.name = name
+        # 列表任务的文件数已知；迭代器任务在扫描过程中逐步追加
+        self.scanning = not isinstance(file_paths, (list, tuple))
+        self._source = file_paths
+        self.file_paths: List[str] = [] if self.scanning else list(file_paths)
+        # 检查点日志的键，为空时使用文件列表本身
+        self.journal_key = journal_key
+        # 需要从向量库中删除的来源（如目录监视发现的已删除文件）
+        self.deleted = list(deleted or [])
+        self.status = "queued"
+        self.files_done = 0
+        self.files_failed = 0
+        self.files_deleted = 0
+        self.chunks_written = 0
+        self.bytes_total = sum(os.path.getsize(path) for path in self.file_paths if os.path.isfile(path))
+        self.bytes_done = 0
+        self.errors: List[Dict[str, str]] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "cancelled", "failed")
+
+    def cancel(self):
+        """请求取消：排队中的任务不再执行，运行中的任务在当前文件完成后停止"""
+        self._cancel.set()
+
+    def discover(self, file_path: str, size: int):
+        """记录扫描过程中发现的文件"""
+        self.file_paths.append(file_path)
+        self.bytes_total += size
+
+    def record(self, file_path: str, result: Dict[str, Any]):
+        """记录单个文件的处理结果"""
+        self.files_done += 1
+        if os.path.isfile(file_path):
+            self.bytes_done += os.path.getsize(file_path)
+        if result.get("success"):
+            self.chunks_written += result.get("chunks_count", 0)
+        else:
+            self.files_failed += 1
+            self.errors.append({"file_path": file_path, "error": result.get("error", "未知错误")})
+
+    def progress(self) -> Dict[str, Any]:
+        """进度：完成文件数、写入块数、吞吐和预计剩余时间"""
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        files_per_s = self.files_done / elapsed if elapsed else 0.0
+        bytes_per_s = self.bytes_done / elapsed if elapsed else 0.0
+
+        eta = None
+        if not self.finished and self.started_at and not self.scanning:
+            # 按字节估算，文件大小差异大时比按文件数更准确
+            if bytes_per_s and self.bytes_total:
+                eta = max(0.0, (self.bytes_total - self.bytes_done) / bytes_per_s)
+            elif files_per_s:
+                eta = (len(self.file_paths) - self.files_done) / files_per_s
+
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "status": self.status,
+            "scanning": self.scanning,
+            "files_total": len(self.file_paths),
+            "files_done": self.files_done,
+            "files_failed": self.files_failed,
+            "files_deleted": self.files_deleted,
+            "chunks_written": self.chunks_written,
+            "elapsed_s": elapsed,
+            "files_per_s": files_per_s,
+            "chunks_per_s": self.chunks_written / elapsed if elapsed else 0.0,
+            "eta_s": eta,
+            "errors": self.errors[-5:]
+        }
+
+
+class IngestionJobQueue:
+    """导入任务队列
+
+    任务在给定的事件循环（``SimpleDocumentQA`` 的常驻循环）中按提交顺序逐个执行，
+    同一任务内最多 ``concurrency`` 个文件并发处理。``submit``、``cancel`` 等方法可以在任意线程调用。
+    """
+
+    def __init__(self, document_agent, loop: asyncio.AbstractEventLoop, concurrency: int = 2, max_jobs: int = 100):
+        self.document_agent = document_agent
+        self.loop = loop
+        self.concurrency = max(1, concurrency)
+        self.max_jobs = max_jobs
+
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._ready = threading.Event()
+        self._worker = asyncio.run_coroutine_threadsafe(self._run_worker(), loop)
+        self._ready.wait()
+
+    def submit(self, file_paths: Union[List[str], Iterable[str]], journal_key: Optional[str] = None,
+               deleted: Optional[List[str]] = None, name: Optional[str] = None) -> IngestionJob:
+        """提交导入任务，立即返回；file_paths 可以是列表或产出路径（或 (路径, 大小)）的迭代器"""
+        job = IngestionJob(file_paths, journal_key=journal_key, deleted=deleted, name=name)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._trim_finished()
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_jobs(self) -> List[IngestionJob]:
+        return [job for job in self.list_jobs() if not job.finished]
+
+    def cancel(self, job_id: str) -> bool:
+        """取消任务，任务不存在或已结束时返回 False"""
+        job = self.get_job(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+
+    def cancel_all(self, wait: float = 0) -> int:
+        """取消所有未结束的任务，wait > 0 时最多等待该秒数让进行中的文件完成"""
+        jobs = self.active_jobs()
+        for job in jobs:
+            job.cancel()
+        deadline = time.monotonic() + wait
+        while wait > 0 and any(not job.finished for job in jobs) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return len(jobs)
+
+    def close(self, wait: float = 0):
+        """取消所有任务并停止后台worker"""
+        self.cancel_all(wait)
+        self._worker.cancel()
+        # 让事件循环处理worker的取消
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), self.loop).result(timeout=1)
+
+    def _trim_finished(self):
+        """只保留最近的 max_jobs 个已结束任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    async def _run_worker(self):
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                job.status = "failed"
+                job.errors.append({"file_path": "", "error": str(e)})
+            finally:
+                job.finished_at = job.finished_at or time.time()
+
+    async def _run_job(self, job: IngestionJob):
+        if job.cancelled:
+            job.status = "cancelled"
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+        loop = asyncio.get_running_loop()
+
+        # 检查点日志：重新提交同一批文件时跳过已完成的文件，回滚上次中断时写入一半的文件
+        journal_key = job.journal_key if job.journal_key is not None else job.file_paths
+        journal = await loop.run_in_executor(None, self.document_agent.open_journal, journal_key)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 4)
+        worker_count = self.concurrency if job.scanning else min(self.concurrency, len(job.file_paths)) or 1
+
+        async def feed():
+            # 列表直接入队；迭代器分批在线程池中取出，扫描和导入同时进行
+            if not job.scanning:
+                for file_path in job.file_paths:
+                    await queue.put(file_path)
+            else:
+                iterator = iter(job._source)
+                while not job.cancelled:
+                    batch = await loop.run_in_executor(None, _take, iterator, _FEED_BATCH)
+                    if not batch:
+                        break
+                    for file_path, size in batch:
+                        job.discover(file_path, size)
+                        await queue.put(file_path)
+                job.scanning = False
+            for _ in range(worker_count):
+                await queue.put(None)
+
+        async def worker():
+            while True:
+                file_path = await queue.get()
+                # 取消后不再处理新文件
+                if file_path is None or job.cancelled:
+                    return
+                result = await self.document_agent.process_journaled_async(file_path, journal)
+                job.record(file_path, result)
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            await self.document_agent.rollback_uncommitted(journal)
+            for source in job.deleted:
+                await self.document_agent.remove_source_async(source, journal)
+                job.files_deleted += 1
+            await asyncio.gather(*[worker() for _ in range(worker_count)])
+        finally:
+            feeder.cancel()
+            job.scanning = False
+            journal.close()
+        job.finished_at = time.time()
+        job.status = "cancelled" if job.cancelled and job.files_done < len(job.file_paths) else "completed"
+
+
+def _take(iterator, count: int) -> List[tuple]:
+    """从迭代器中取出最多 count 个 (路径, 大小)"""
+    batch = []
+    for item in iterator:
+        if isinstance(item, str):
+            item = (item, os.path.getsize(item) if os.path.isfile(item) else 0)
+        batch.append(item)
+        if len(batch) >= count:
+            break
+    return batch
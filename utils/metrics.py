@@ -0,0 +1,201 @@
+"""轻量级指标与阶段计时 - 计数器、直方图和计时span，支持Prometheus文本格式和JSON导出
+
+用法：
+    from utils.metrics import metrics
+
+    with metrics.span("vector_store.search"):
+        ...
+    metrics.inc("documents_processed_total", labels={"processor": "pdf"})
+
+默认关闭，关闭时 ``span()`` 返回共享的空上下文管理器、``inc()``/``observe()`` 直接返回，开销接近于零。
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Any, Optional, Tuple
+
+# 默认的耗时直方图桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> Tuple:
+    if not labels:
+        return ()
+    return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: Tuple, extra: Optional[Tuple] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+class Histogram:
+    """固定桶直方图"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, total = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class _NullSpan:
+    """关闭指标时使用的空span"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """阶段计时span：结束时写入 <name>_seconds 直方图，异常时额外计数"""
+
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Optional[Dict[str, Any]]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(f"{self.name}_seconds", time.perf_counter() - self.start, self.labels)
+        if exc_type is not None:
+            self.registry.inc(f"{self.name}_errors_total", labels=self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self, enabled: bool = False, prefix: str = "docmate"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._buckets: Dict[str, tuple] = {}
+
+    def configure(self, config: Optional[Dict[str, Any]] = None):
+        """根据配置文件中的 metrics 段启用或关闭"""
+        config = config or {}
+        self.enabled = bool(config.get("enabled", False))
+        self.prefix = config.get("prefix", self.prefix)
+
+    def set_buckets(self, name: str, buckets):
+        """为指定直方图设置自定义桶（需在首次记录前调用）"""
+        self._buckets[name] = tuple(sorted(buckets))
+
+    def span(self, name: str, labels: Optional[Dict[str, Any]] = None):
+        """阶段计时上下文管理器"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, Any]] = None):
+        """计数器增加"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None):
+        """直方图记录一个观测值"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def reset(self):
+        """清空所有指标"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为可JSON序列化的字典"""
+        with self._lock:
+            return {
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "histograms": {
+                    name: [dict(labels=dict(key), **histogram.to_dict()) for key, histogram in series.items()]
+                    for name, series in self._histograms.items()
+                }
+            }
+
+    def to_json(self) -> str:
+        """导出为JSON文本"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """导出为Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full_name = self._full_name(name)
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in series.items():
+                    lines.append(f"{full_name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                full_name = self._full_name(name)
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+                    lines.append(f"{full_name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _full_name(self, name: str) -> str:
+        name = name.replace(".", "_").replace("-", "_")
+        return f"{self.prefix}_{name}" if self.prefix else name
+
+
+# 进程内共享的全局注册表
+metrics = MetricsRegistry()
@@ -0,0 +1,200 @@
+"""操作级性能剖析 - 为单次导入或检索采集 cProfile 统计和 tracemalloc 内存峰值/分配热点
+
+用法：
+    profiler = OperationProfiler(enabled=True, output_dir="./profiles", time_threshold=10)
+    with profiler.profile("ingest", {"file": path, "processor": "pdf"}):
+        processor.process_file(path)
+
+超过耗时或内存阈值的操作自动写入输出目录：``<时间>_<操作>_<标签>.prof``（可用 pstats / snakeviz 打开）
+和同名 ``.json`` 摘要（耗时、内存峰值、最耗时的函数、分配最多的代码行）。
+
+注意：
+- cProfile 只采集当前线程，应在实际执行工作的线程中（如线程池任务内部）进入 ``profile()``；
+- tracemalloc 是进程级的，多个操作并发时内存峰值会包含同时进行的其他操作；
+- 默认关闭，关闭时 ``profile()`` 返回共享的空上下文管理器。
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+
+class _NullProfile:
+    """关闭剖析时使用的空上下文管理器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PROFILE = _NullProfile()
+
+
+class _OperationProfile:
+    """单次操作的剖析上下文"""
+
+    def __init__(self, profiler: "OperationProfiler", operation: str, tags: Dict[str, Any]):
+        self.profiler = profiler
+        self.operation = operation
+        self.tags = tags
+        self.cpu_profile: Optional[cProfile.Profile] = None
+        self.snapshot_start = None
+        self.memory_start = 0
+        self.start = 0.0
+
+    def __enter__(self):
+        if self.profiler.trace_memory:
+            self.profiler._start_tracemalloc()
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            if self.profiler.top_allocations:
+                self.snapshot_start = tracemalloc.take_snapshot()
+
+        self.cpu_profile = cProfile.Profile()
+        try:
+            self.cpu_profile.enable()
+        except ValueError:
+            # Python 3.12+ 同一时刻只允许一个 cProfile 处于启用状态，并发时跳过CPU剖析
+            self.cpu_profile = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if self.cpu_profile is not None:
+            self.cpu_profile.disable()
+
+        peak_bytes, top_allocations = 0, []
+        if self.profiler.trace_memory:
+            try:
+                peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - self.memory_start)
+                if self.snapshot_start is not None:
+                    stats = tracemalloc.take_snapshot().compare_to(self.snapshot_start, "lineno")
+                    top_allocations = [
+                        {"location": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                        for stat in stats[:self.profiler.top_allocations]
+                    ]
+            finally:
+                self.profiler._stop_tracemalloc()
+
+        self.profiler._finish(self, duration, peak_bytes, top_allocations, error=exc_type is not None)
+        return False
+
+
+class OperationProfiler:
+    """可选开启的操作级剖析器，超阈值的剖析结果自动落盘"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        output_dir: str = "./profiles",
+        time_threshold: float = 10.0,
+        memory_threshold_mb: float = 200.0,
+        trace_memory: bool = True,
+        top_functions: int = 30,
+        top_allocations: int = 10,
+        keep_recent: int = 100
+    ):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.time_threshold = time_threshold
+        self.memory_threshold_bytes = int(memory_threshold_mb * 1024 * 1024)
+        self.trace_memory = trace_memory
+        self.top_functions = top_functions
+        self.top_allocations = top_allocations
+
+        # 最近的剖析摘要（不含统计数据本身），供状态查询
+        self.recent: deque = deque(maxlen=keep_recent)
+        self._lock = threading.Lock()
+        self._tracing = 0
+        self._started_tracemalloc = False
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "OperationProfiler":
+        """根据配置文件中的 profiling 段创建剖析器"""
+        config = config or {}
+        return cls(
+            enabled=bool(config.get("enabled", False)),
+            output_dir=config.get("output_dir", "./profiles"),
+            time_threshold=config.get("time_threshold", 10.0),
+            memory_threshold_mb=config.get("memory_threshold_mb", 200.0),
+            trace_memory=config.get("trace_memory", True),
+            top_functions=config.get("top_functions", 30),
+            top_allocations=config.get("top_allocations", 10)
+        )
+
+    def profile(self, operation: str, tags: Optional[Dict[str, Any]] = None):
+        """剖析上下文管理器，tags 用于标记文件、处理器类型等"""
+        if not self.enabled:
+            return _NULL_PROFILE
+        return _OperationProfile(self, operation, dict(tags or {}))
+
+    def get_recent(self) -> List[Dict[str, Any]]:
+        """最近的剖析摘要"""
+        with self._lock:
+            return list(self.recent)
+
+    def _start_tracemalloc(self):
+        with self._lock:
+            if self._tracing == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._tracing += 1
+
+    def _stop_tracemalloc(self):
+        with self._lock:
+            self._tracing -= 1
+            # 只停止由剖析器自己启动的 tracemalloc
+            if self._tracing == 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def _finish(self, context: _OperationProfile, duration: float, peak_bytes: int,
+                top_allocations: List[Dict[str, Any]], error: bool):
+        summary = {
+            "operation": context.operation,
+            "tags": context.tags,
+            "duration_s": duration,
+            "peak_memory_bytes": peak_bytes,
+            "error": error,
+            "timestamp": time.time(),
+            "dumped": None
+        }
+        if duration >= self.time_threshold or (self.trace_memory and peak_bytes >= self.memory_threshold_bytes):
+            try:
+                summary["dumped"] = self._dump(context, summary, top_allocations)
+            except Exception as e:
+                print(f"⚠️ 剖析结果写入失败: {str(e)}")
+        with self._lock:
+            self.recent.append(summary)
+
+    def _dump(self, context: _OperationProfile, summary: Dict[str, Any],
+              top_allocations: List[Dict[str, Any]]) -> str:
+        """写入 .prof 和 .json 摘要，返回文件路径前缀"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        tag_text = "_".join(os.path.basename(str(value)) for value in context.tags.values())
+        slug = re.sub(r"[^\w.-]+", "-", f"{context.operation}_{tag_text}")[:120]
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(summary["timestamp"]))
+        prefix = os.path.join(self.output_dir, f"{stamp}_{int(summary['timestamp'] * 1000) % 1000:03d}_{slug}")
+
+        report = dict(summary, top_allocations=top_allocations, top_functions=None)
+        if context.cpu_profile is not None:
+            context.cpu_profile.dump_stats(prefix + ".prof")
+            stream = io.StringIO()
+            pstats.Stats(context.cpu_profile, stream=stream).sort_stats("cumulative").print_stats(self.top_functions)
+            report["top_functions"] = stream.getvalue()
+
+        with open(prefix + ".json", "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2, default=str)
+        return prefix
@@ -0,0 +1,281 @@
+"""共享只读索引 - 单个写入进程发布索引世代，多个服务进程内存映射同一份快照并发检索
+
+目录结构：
+    <root>/CURRENT           当前世代指针（JSON：世代号、目录名、快照ID、增量链长度），写完临时文件后原子替换
+    <root>/gen-<世代号>/     世代快照目录（完整快照，或相对上一世代的增量快照）
+    <root>/publish.lock      发布锁，同一时刻只允许一个写入进程发布
+
+嵌入矩阵、ID、文本和元数据列都通过 mmap 只读打开，同一份文件的页缓存由所有 worker 进程共享，
+增加 worker 时常驻内存基本不变，每个进程只额外持有解释器、嵌入模型和增量链的少量簿记。
+CURRENT 只在世代目录完整写入后替换，读端按检查间隔发现新世代并切换引用；正在执行的查询继续使用旧的
+``Snapshot`` 对象。超出保留数且不再被保留世代作为基准的旧世代目录会被删除（已映射的文件删除后仍然可读）。
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List
+
+from utils.embedding_service import INTERACTIVE
+from utils.embeddings import QueryEmbeddingCache
+from utils.metrics import metrics
+from utils.snapshot import Snapshot, read_manifest, embedding_model_id
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，只能依靠部署保证单个写入进程
+    fcntl = None
+
+CURRENT = "CURRENT"
+LOCK_FILE = "publish.lock"
+GENERATION_PREFIX = "gen-"
+
+
+def read_current(root: str) -> Optional[Dict[str, Any]]:
+    """读取当前世代指针，还没有发布过时返回 None"""
+    try:
+        with open(os.path.join(root, CURRENT), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _base_paths(path: str) -> List[str]:
+    """快照及其基准链上所有目录的绝对路径"""
+    paths = []
+    current = os.path.abspath(path)
+    while current is not None:
+        paths.append(current)
+        base = read_manifest(current).get("base")
+        current = os.path.normpath(os.path.join(current, base["path"])) if base else None
+    return paths
+
+
+class IndexPublisher:
+    """索引发布者（单写入进程）
+
+    每次发布把向量库导出为一个新世代：增量链长度未达到 compact_every 时只导出相对当前世代的增量，
+    否则导出完整快照（压缩增量链，读端打开时不必合并过多的段）。
+    """
+
+    def __init__(self, root: str, keep_generations: int = 3, compact_every: int = 8):
+        self.root = root
+        self.keep_generations = max(1, keep_generations)
+        self.compact_every = max(1, compact_every)
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None) -> "IndexPublisher":
+        """根据配置文件中的 serving 段创建发布者"""
+        serving_config = (config or {}).get("serving", {})
+        return cls(
+            root=serving_config.get("index_dir", "./shared_index"),
+            keep_generations=serving_config.get("keep_generations", 3),
+            compact_every=serving_config.get("compact_every", 8)
+        )
+
+    @contextmanager
+    def _writer_lock(self):
+        with open(os.path.join(self.root, LOCK_FILE), "a") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    raise RuntimeError(f"已有其他进程正在发布索引: {self.root}")
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def publish(self, vector_store, full: bool = False) -> Dict[str, Any]:
+        """导出并发布新世代，返回新的世代指针；与当前世代相比没有变化时不发布，返回当前指针"""
+        with self._writer_lock(), metrics.span("shared_index.publish"):
+            current = read_current(self.root)
+            generation = current["generation"] + 1 if current else 1
+            name = f"{GENERATION_PREFIX}{generation:06d}"
+            path = os.path.join(self.root, name)
+            if os.path.exists(path):
+                # 上次发布中途失败留下的目录
+                shutil.rmtree(path)
+
+            base = None
+            if current and not full and current["chain_length"] < self.compact_every:
+                base = os.path.join(self.root, current["path"])
+            manifest = vector_store.export_snapshot(path, base=base)
+            if base is not None and not manifest["count"] and not manifest["deleted"]:
+                shutil.rmtree(path)
+                return current
+
+            pointer = {
+                "generation": generation,
+                "path": name,
+                "snapshot_id": manifest["snapshot_id"],
+                "chain_length": current["chain_length"] + 1 if base is not None else 1,
+                "published_at": time.time()
+            }
+            temp_path = os.path.join(self.root, CURRENT + ".tmp")
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(pointer, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, os.path.join(self.root, CURRENT))
+            self._collect_garbage(generation)
+
+        metrics.inc("shared_index_generations_published_total")
+        print(f"🚀 已发布索引世代 {generation}（{'增量' if base else '完整'}快照，{manifest['count']} 行）")
+        return pointer
+
+    def _collect_garbage(self, generation: int):
+        """删除超出保留数、且不再被保留世代作为基准的旧世代目录"""
+        names = sorted(name for name in os.listdir(self.root) if name.startswith(GENERATION_PREFIX))
+        keep = set()
+        for name in names:
+            number = int(name[len(GENERATION_PREFIX):])
+            if generation - number < self.keep_generations:
+                try:
+                    keep.update(_base_paths(os.path.join(self.root, name)))
+                except (OSError, ValueError):
+                    # 没有 manifest 的目录是未完成的发布
+                    pass
+        for name in names:
+            path = os.path.abspath(os.path.join(self.root, name))
+            if path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+class SharedIndexReader:
+    """共享索引读端（只读 worker 进程使用）
+
+    提供与 VectorStore 相同的 search / get_collection_info 接口，可以直接交给 QAAgent。
+    检索前按 check_interval 检查 CURRENT，发现新世代时打开新快照并替换引用，切换失败时继续使用旧世代。
+    """
+
+    def __init__(self, root: str, embedding_function=None, check_interval: float = 1.0, embedding_service=None,
+                 query_cache_size: int = 1024):
+        self.root = root
+        # 为空时使用Chroma默认的嵌入模型，必须与发布时向量库的嵌入模型一致
+        self.embedding_function = embedding_function
+        # 嵌入服务：设置后并发查询的嵌入由服务线程合并批量计算
+        self.embedding_service = embedding_service
+        self.query_cache = QueryEmbeddingCache(query_cache_size) if query_cache_size > 0 else None
+        self.check_interval = check_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._pointer: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]] = None, embedding_function=None,
+                    embedding_service=None) -> "SharedIndexReader":
+        """根据配置文件中的 serving 段创建读端"""
+        serving_config = (config or {}).get("serving", {})
+        return cls(
+            root=serving_config.get("index_dir", "./shared_index"),
+            embedding_function=embedding_function,
+            check_interval=serving_config.get("check_interval", 1.0),
+            embedding_service=embedding_service,
+            query_cache_size=(config or {}).get("vector_store", {}).get("query_cache_size", 1024)
+        )
+
+    @property
+    def generation(self) -> int:
+        """当前使用的世代号，还没有打开任何世代时为 0"""
+        return self._pointer["generation"] if self._pointer else 0
+
+    def refresh(self, force: bool = False) -> bool:
+        """检查并切换到最新世代，返回是否发生了切换"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        # 只有一个线程负责切换，其他线程继续使用当前世代
+        if not self._lock.acquire(blocking=force):
+            return False
+        try:
+            self._checked_at = now
+            pointer = read_current(self.root)
+            if pointer is None or (self._pointer and pointer["snapshot_id"] == self._pointer["snapshot_id"]):
+                return False
+            with metrics.span("shared_index.open"):
+                snapshot = Snapshot(os.path.join(self.root, pointer["path"]))
+            expected = embedding_model_id(self.embedding_function)
+            if snapshot.manifest["embedding_model"] != expected:
+                raise ValueError(f"索引的嵌入模型 {snapshot.manifest['embedding_model']} 与当前 {expected} 不一致")
+            self._snapshot, self._pointer = snapshot, pointer
+            metrics.inc("shared_index_generation_switches_total")
+            return True
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 切换索引世代失败，继续使用世代 {self.generation}: {str(e)}")
+            return False
+        finally:
+            self._lock.release()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """计算查询的嵌入向量"""
+        if self.embedding_service is not None:
+            with metrics.span("vector_store.embed"):
+                return self.embedding_service.embed(texts, INTERACTIVE)
+        if self.embedding_function is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+            self.embedding_function = DefaultEmbeddingFunction()
+        with metrics.span("vector_store.embed"):
+            return self.embedding_function(texts)
+
+    def embed_query(self, query: str):
+        """计算查询的嵌入（先查查询嵌入缓存）"""
+        embedding = self.query_cache.get(query) if self.query_cache is not None else None
+        if embedding is None:
+            embedding = self.embed([query])[0]
+            if self.query_cache is not None:
+                self.query_cache.put(query, embedding)
+        return embedding
+
+    def warmup(self, questions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """预热：加载嵌入模型，打开当前世代并完整扫描一次（把映射的文件读入页缓存），预先计算常见问题的嵌入"""
+        report = {}
+        start = time.perf_counter()
+        probe = self.embed(["warmup"])[0]
+        report["model_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.refresh(force=True)
+        if self._snapshot is not None:
+            self._snapshot.search(probe, 1)
+        report["index_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        questions = [question for question in questions or [] if question.strip()]
+        if questions and self.query_cache is not None:
+            for question, embedding in zip(questions, self.embed(questions)):
+                self.query_cache.put(question, embedding)
+        report["questions"] = len(questions) if self.query_cache is not None else 0
+        report["questions_seconds"] = time.perf_counter() - start
+        return report
+
+    def search(self, query: str, n_results: int = 5, top_documents: Optional[int] = None) -> List[Dict[str, Any]]:
+        """在当前世代中检索（top_documents 仅为与 VectorStore 接口一致，快照始终精确检索全部文档块）"""
+        self.refresh(force=self._snapshot is None)
+        # 先取出引用，检索期间发生世代切换也不影响本次查询
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+        with metrics.span("vector_store.search"):
+            query_embedding = self.embed_query(query)
+            return snapshot.search(query_embedding, n_results)
+
+    def get_collection_info(self) -> Dict[str, Any]:
+        """获取当前世代的信息"""
+        self.refresh(force=self._snapshot is None)
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"count": 0, "name": None, "generation": 0}
+        return {
+            "count": len(snapshot),
+            "name": snapshot.manifest["collection_name"],
+            "generation": self.generation,
+            "snapshot_id": snapshot.snapshot_id
+        }
@@ -0,0 +1,489 @@
+"""向量库快照 - 把集合导出为紧凑的二进制目录，在其他节点上批量导入，或直接内存映射后只读检索
+
+快照目录结构：
+    manifest.json              格式版本、快照ID、集合名、嵌入模型ID、维度、行数、基准快照（增量快照）和各文件的SHA-256
+    embeddings.npy             (行数, 维度) float32 连续数组，np.load(mmap_mode="r") 直接映射
+    norms.npy                  每行嵌入的L2范数，检索时不必扫描整个矩阵计算
+    ids.bin / ids.idx          ID 的UTF-8拼接和 int64 偏移（行数+1）
+    documents.bin / .idx       块文本，同上
+    meta.<序号>.npy            元数据按列存储：整数/浮点/布尔的稠密列为数值数组，其他列为字典编码（int32，-1 表示缺失），
+                               字典和列类型记录在 manifest 的 columns 中
+    deleted.bin / .idx         （增量快照）相对基准快照删除的ID
+
+增量快照只包含相对基准快照新增、文本或元数据有变化的行，以及删除的ID。
+``Snapshot`` 沿基准链打开所有快照段，后面的段覆盖前面段中同ID的行；导入时只应用目标向量库尚未应用的段。
+"""
+import hashlib
+import json
+import mmap
+import os
+import time
+import uuid
+from array import array
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from utils.metrics import metrics
+
+FORMAT = "docmate-snapshot"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def embedding_model_id(embedding_function) -> str:
+    """嵌入模型标识：名称加配置，导入时用于确认快照和目标向量库使用同一个嵌入模型"""
+    if embedding_function is None:
+        # VectorStore 未指定嵌入函数时使用Chroma默认模型
+        return "default"
+    name = embedding_function.name() if hasattr(embedding_function, "name") else type(embedding_function).__name__
+    try:
+        config = embedding_function.get_config()
+    except Exception:
+        config = None
+    return f"{name}:{json.dumps(config, sort_keys=True)}" if config else name
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _StringColumnWriter:
+    """变长字符串列：UTF-8 拼接写入 .bin，偏移写入 .idx"""
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        self._file = open(os.path.join(directory, f"{name}.bin"), "wb")
+        self._offsets = array("q", [0])
+
+    def append(self, value: str):
+        data = (value or "").encode("utf-8")
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def close(self, directory: str) -> List[str]:
+        import numpy as np
+
+        self._file.close()
+        np.save(os.path.join(directory, f"{self.name}.idx.npy"), np.frombuffer(self._offsets, dtype=np.int64))
+        return [f"{self.name}.bin", f"{self.name}.idx.npy"]
+
+
+class _MetadataColumns:
+    """元数据列式编码：边读边做字典编码，结束时把稠密的数值列转换为数值数组"""
+
+    def __init__(self):
+        self.rows = 0
+        # key -> (值 -> 编码, 编码数组)
+        self._columns: Dict[str, Tuple[Dict[Any, int], array]] = {}
+
+    def append(self, metadata: Optional[Dict[str, Any]]):
+        for key, value in (metadata or {}).items():
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = ({}, array("i", [-1]) * self.rows)
+            dictionary, codes = column
+            # 布尔值和整数在字典中要区分开
+            token = (type(value).__name__, value)
+            code = dictionary.get(token)
+            if code is None:
+                code = dictionary[token] = len(dictionary)
+            codes.append(code)
+        self.rows += 1
+        for _, codes in self._columns.values():
+            if len(codes) < self.rows:
+                codes.append(-1)
+
+    def write(self, directory: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        import numpy as np
+
+        schema, files = [], []
+        for i, (key, (dictionary, codes)) in enumerate(self._columns.items()):
+            file_name = f"meta.{i}.npy"
+            codes = np.frombuffer(codes, dtype=np.int32)
+            values = [value for (_, value) in sorted(dictionary, key=dictionary.get)]
+            kinds = {kind for (kind, _) in dictionary}
+            if len(kinds) == 1 and kinds <= {"int", "float", "bool"} and (codes >= 0).all():
+                kind = kinds.pop()
+                dtype = {"int": np.int64, "float": np.float64, "bool": np.bool_}[kind]
+                np.save(os.path.join(directory, file_name), np.asarray(values, dtype=dtype)[codes])
+                schema.append({"key": key, "kind": kind, "file": file_name})
+            else:
+                np.save(os.path.join(directory, file_name), codes)
+                schema.append({"key": key, "kind": "dict", "file": file_name, "values": values})
+            files.append(file_name)
+        return schema, files
+
+
+class _Segment:
+    """快照链中的一个快照（一个目录），数组全部内存映射"""
+
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        self.count = manifest["count"]
+        self.embeddings = self._load("embeddings.npy")
+        self.norms = self._load("norms.npy")
+        self._ids = self._open_strings("ids")
+        self._documents = self._open_strings("documents")
+        self._deleted = self._open_strings("deleted") if manifest.get("deleted", 0) else None
+        self.columns = []
+        for column in manifest["columns"]:
+            self.columns.append((column, self._load(column["file"])))
+        # 被后续快照段删除或覆盖的行，为空表示全部有效
+        self.dead = None
+
+    def _load(self, name: str):
+        import numpy as np
+
+        return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+    def _open_strings(self, name: str):
+        offsets = self._load(f"{name}.idx.npy")
+        with open(os.path.join(self.path, f"{name}.bin"), "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            blob = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        return offsets, blob
+
+    @staticmethod
+    def _string(column, row: int) -> str:
+        offsets, blob = column
+        return blob[int(offsets[row]):int(offsets[row + 1])].decode("utf-8")
+
+    def id(self, row: int) -> str:
+        return self._string(self._ids, row)
+
+    def ids(self) -> List[str]:
+        return [self._string(self._ids, row) for row in range(self.count)]
+
+    def deleted_ids(self) -> List[str]:
+        if self._deleted is None:
+            return []
+        return [self._string(self._deleted, row) for row in range(len(self._deleted[0]) - 1)]
+
+    def document(self, row: int) -> str:
+        return self._string(self._documents, row)
+
+    def metadata(self, row: int) -> Optional[Dict[str, Any]]:
+        metadata = {}
+        for column, values in self.columns:
+            if column["kind"] == "dict":
+                code = int(values[row])
+                if code >= 0:
+                    metadata[column["key"]] = column["values"][code]
+            else:
+                metadata[column["key"]] = values[row].item()
+        # Chroma 不接受空字典元数据
+        return metadata or None
+
+
+class Snapshot:
+    """只读快照：沿基准链打开所有快照段，嵌入矩阵内存映射，可直接检索或导入向量库"""
+
+    def __init__(self, path: str, verify: bool = False):
+        self.path = os.path.abspath(path)
+        manifests = []
+        current = self.path
+        while current is not None:
+            manifest = read_manifest(current)
+            if verify:
+                verify_snapshot(current, manifest)
+            manifests.append((current, manifest))
+            base = manifest.get("base")
+            if base is None:
+                current = None
+                continue
+            current = os.path.normpath(os.path.join(current, base["path"]))
+            if read_manifest(current)["snapshot_id"] != base["snapshot_id"]:
+                raise ValueError(f"快照 {manifest['snapshot_id']} 的基准快照已被替换: {current}")
+        manifests.reverse()
+
+        self.manifest = manifests[-1][1]
+        self.segments = [_Segment(segment_path, manifest) for segment_path, manifest in manifests]
+        self._mark_superseded()
+
+    @property
+    def snapshot_id(self) -> str:
+        return self.manifest["snapshot_id"]
+
+    @property
+    def chain(self) -> List[str]:
+        """从完整快照到当前快照的快照ID"""
+        return [segment.manifest["snapshot_id"] for segment in self.segments]
+
+    def _mark_superseded(self):
+        """后面的段删除或重新写入的ID，在前面的段中标记为无效"""
+        import numpy as np
+
+        if len(self.segments) == 1:
+            return
+        later_ids = set()
+        for segment in reversed(self.segments):
+            if later_ids:
+                dead = np.fromiter((chunk_id in later_ids for chunk_id in segment.ids()), dtype=bool, count=segment.count)
+                segment.dead = dead if dead.any() else None
+            later_ids.update(segment.deleted_ids())
+            later_ids.update(segment.ids())
+
+    def __len__(self):
+        return sum(
+            segment.count - (int(segment.dead.sum()) if segment.dead is not None else 0)
+            for segment in self.segments
+        )
+
+    def iter_rows(self, segments: Optional[List[_Segment]] = None) -> Iterator[Tuple[_Segment, int]]:
+        """遍历有效行 (快照段, 行号)"""
+        for segment in segments or self.segments:
+            for row in range(segment.count):
+                if segment.dead is None or not segment.dead[row]:
+                    yield segment, row
+
+    def search(self, query_embedding, n_results: int = 5, block_rows: int = 65536) -> List[Dict[str, Any]]:
+        """按余弦相似度暴力检索（分块矩阵乘，内存占用与快照大小无关），返回格式与 VectorStore.search 相同"""
+        import numpy as np
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows: List[Tuple[int, int]] = []
+        with metrics.span("snapshot.search"):
+            for index, segment in enumerate(self.segments):
+                for start in range(0, segment.count, block_rows):
+                    end = min(start + block_rows, segment.count)
+                    scores = segment.embeddings[start:end] @ query / (segment.norms[start:end] + 1e-12)
+                    if segment.dead is not None:
+                        scores[segment.dead[start:end]] = -np.inf
+                    top = np.argpartition(-scores, min(n_results, len(scores) - 1))[:n_results]
+                    best_scores = np.concatenate([best_scores, scores[top]])
+                    best_rows.extend((index, start + int(row)) for row in top)
+                    keep = np.argsort(-best_scores)[:n_results]
+                    best_scores = best_scores[keep]
+                    best_rows = [best_rows[i] for i in keep]
+
+        return [
+            {
+                "content": self.segments[index].document(row),
+                "metadata": self.segments[index].metadata(row),
+                "id": self.segments[index].id(row)
+            }
+            for (index, row), score in zip(best_rows, best_scores) if score > -np.inf
+        ]
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("format") != FORMAT or manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"不支持的快照格式: {path}")
+    return manifest
+
+
+def verify_snapshot(path: str, manifest: Optional[Dict[str, Any]] = None):
+    """按 manifest 中的SHA-256校验快照文件，不一致时抛出 ValueError"""
+    manifest = manifest or read_manifest(path)
+    for name, expected in manifest["files"].items():
+        file_path = os.path.join(path, name)
+        if not os.path.exists(file_path) or _sha256(file_path) != expected["sha256"]:
+            raise ValueError(f"快照文件校验失败: {file_path}")
+
+
+def export_snapshot(vector_store, path: str, base: Optional[str] = None, page_size: int = 5000) -> Dict[str, Any]:
+    """导出集合为快照；指定 base 时只导出相对基准快照的变化（增量快照），返回 manifest"""
+    import numpy as np
+
+    collection = vector_store.collection
+    base_snapshot = Snapshot(base) if base else None
+    base_rows: Dict[str, Tuple[_Segment, int]] = {}
+    if base_snapshot is not None:
+        base_rows = {segment.id(row): (segment, row) for segment, row in base_snapshot.iter_rows()}
+
+    os.makedirs(path, exist_ok=True)
+    start = time.perf_counter()
+    total = collection.count()
+    ids = _StringColumnWriter(path, "ids")
+    documents = _StringColumnWriter(path, "documents")
+    columns = _MetadataColumns()
+    # 完整快照的行数已知，嵌入直接写入映射文件；增量快照行数未知但通常很小，先放在内存中
+    embeddings_file = None
+    blocks = []
+    rows, dim, seen = 0, None, set()
+
+    with metrics.span("snapshot.export"):
+        offset = 0
+        while offset < total:
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            offset += len(page["ids"])
+            page_embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if dim is None:
+                dim = page_embeddings.shape[1]
+                if base_snapshot is None:
+                    embeddings_file = np.lib.format.open_memmap(
+                        os.path.join(path, "embeddings.npy"), mode="w+", dtype=np.float32, shape=(total, dim)
+                    )
+            selected = []
+            for i, (chunk_id, document, metadata) in enumerate(zip(page["ids"], page["documents"], page["metadatas"])):
+                seen.add(chunk_id)
+                previous = base_rows.get(chunk_id)
+                if previous is not None:
+                    segment, row = previous
+                    if segment.document(row) == (document or "") and segment.metadata(row) == (metadata or None):
+                        continue
+                ids.append(chunk_id)
+                documents.append(document)
+                columns.append(metadata)
+                selected.append(i)
+            if embeddings_file is not None:
+                embeddings_file[rows:rows + len(selected)] = page_embeddings[selected]
+            else:
+                blocks.append(page_embeddings[selected])
+            rows += len(selected)
+
+    dim = dim or (base_snapshot.manifest["dim"] if base_snapshot else 0)
+    if embeddings_file is not None:
+        embeddings_file.flush()
+        del embeddings_file
+        if rows < total:
+            # 导出期间有块被删除，截断到实际行数
+            data = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")[:rows].copy()
+            np.save(os.path.join(path, "embeddings.npy"), data)
+        embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+    else:
+        embeddings = np.concatenate(blocks) if blocks else np.zeros((0, dim), dtype=np.float32)
+        np.save(os.path.join(path, "embeddings.npy"), embeddings)
+    norms = np.concatenate([
+        np.linalg.norm(embeddings[i:i + 65536], axis=1) for i in range(0, rows, 65536)
+    ]).astype(np.float32) if rows else np.zeros(0, dtype=np.float32)
+    np.save(os.path.join(path, "norms.npy"), norms)
+    del embeddings
+
+    files = ["embeddings.npy", "norms.npy"] + ids.close(path) + documents.close(path)
+    schema, column_files = columns.write(path)
+    files += column_files
+
+    deleted = [chunk_id for chunk_id in base_rows if chunk_id not in seen]
+    if base_snapshot is not None:
+        deleted_column = _StringColumnWriter(path, "deleted")
+        for chunk_id in deleted:
+            deleted_column.append(chunk_id)
+        files += deleted_column.close(path)
+
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "snapshot_id": uuid.uuid4().hex,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "collection_name": vector_store.collection_name,
+        "embedding_model": embedding_model_id(vector_store.embedding_function),
+        "dim": int(dim),
+        "dtype": "float32",
+        "count": rows,
+        "deleted": len(deleted),
+        "base": {
+            "path": os.path.relpath(base_snapshot.path, os.path.abspath(path)),
+            "snapshot_id": base_snapshot.snapshot_id
+        } if base_snapshot is not None else None,
+        "columns": schema,
+        "files": {
+            name: {"bytes": os.path.getsize(os.path.join(path, name)), "sha256": _sha256(os.path.join(path, name))}
+            for name in files
+        }
+    }
+    # manifest 最后写入并原子替换，没有 manifest 的目录不是完整的快照
+    temp_path = os.path.join(path, MANIFEST + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    os.replace(temp_path, os.path.join(path, MANIFEST))
+
+    elapsed = time.perf_counter() - start
+    metrics.inc("snapshot_exported_rows_total", rows)
+    print(f"📦 快照已导出: {path}（{rows} 行，删除 {len(deleted)} 行，{elapsed:.1f}s）")
+    return manifest
+
+
+def _marker_path(vector_store) -> str:
+    return os.path.join(vector_store.persist_directory, f"snapshot-{vector_store.collection_name}.json")
+
+
+def applied_snapshot(vector_store) -> Optional[str]:
+    """向量库当前已应用的快照ID（集合被删除重建后失效）"""
+    try:
+        with open(_marker_path(vector_store), "r", encoding="utf-8") as file:
+            marker = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if marker.get("collection_id") != vector_store.get_collection_id():
+        return None
+    return marker.get("snapshot_id")
+
+
+def import_snapshot(vector_store, path: str, verify: bool = True) -> Dict[str, Any]:
+    """导入快照：向量库已应用过基准链中的某个快照时只应用之后的增量段，否则清空集合后导入全部有效行"""
+    snapshot = Snapshot(path, verify=verify)
+    expected = embedding_model_id(vector_store.embedding_function)
+    if snapshot.manifest["embedding_model"] != expected:
+        raise ValueError(f"快照的嵌入模型 {snapshot.manifest['embedding_model']} 与当前向量库 {expected} 不一致")
+
+    start = time.perf_counter()
+    chain = snapshot.chain
+    current = applied_snapshot(vector_store)
+    if current in chain:
+        mode = "delta"
+        segments = snapshot.segments[chain.index(current) + 1:]
+    else:
+        mode = "full"
+        segments = snapshot.segments
+        if vector_store.collection.count():
+            vector_store.delete_collection()
+
+    collection = vector_store.collection
+    batch_size = vector_store.client.get_max_batch_size() if hasattr(vector_store.client, "get_max_batch_size") else 5000
+    rows = deleted = 0
+    with metrics.span("snapshot.import"):
+        for segment in segments:
+            if mode == "delta":
+                deleted_ids = segment.deleted_ids()
+                for i in range(0, len(deleted_ids), batch_size):
+                    collection.delete(ids=deleted_ids[i:i + batch_size])
+                deleted += len(deleted_ids)
+            # 全量导入时只写入有效行；增量导入逐段 upsert
+            batch: List[Tuple[_Segment, int]] = []
+            for item in snapshot.iter_rows([segment]) if mode == "full" else ((segment, row) for row in range(segment.count)):
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    rows += _write_rows(collection, batch)
+                    batch = []
+            if batch:
+                rows += _write_rows(collection, batch)
+
+    with open(_marker_path(vector_store), "w", encoding="utf-8") as file:
+        json.dump({"collection_id": vector_store.get_collection_id(), "snapshot_id": snapshot.snapshot_id}, file)
+    if vector_store.doc_index:
+        vector_store.rebuild_doc_index()
+
+    elapsed = time.perf_counter() - start
+    metrics.inc("snapshot_imported_rows_total", rows)
+    print(f"📥 快照已导入: {path}（{mode}，写入 {rows} 行，删除 {deleted} 行，{elapsed:.1f}s）")
+    return {"mode": mode, "rows": rows, "deleted": deleted, "snapshot_id": snapshot.snapshot_id, "seconds": elapsed}
+
+
+def _write_rows(collection, batch: List[Tuple[_Segment, int]]) -> int:
+    """按段连续的行整块切片嵌入矩阵，批量 upsert（嵌入直接来自快照，不重新计算）"""
+    import numpy as np
+
+    segment = batch[0][0]
+    rows = [row for _, row in batch]
+    if rows[-1] - rows[0] == len(rows) - 1:
+        embeddings = np.asarray(segment.embeddings[rows[0]:rows[-1] + 1])
+    else:
+        embeddings = np.asarray(segment.embeddings[rows])
+    collection.upsert(
+        ids=[segment.id(row) for row in rows],
+        embeddings=embeddings,
+        documents=[segment.document(row) for row in rows],
+        metadatas=[segment.metadata(row) for row in rows]
+    )
+    return len(rows)
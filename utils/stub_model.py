@@ -0,0 +1,43 @@
+"""本地桩模型 - 用于离线测试、压测和基准测试，替代DashScope API"""
+import asyncio
+import random
+from typing import List, Dict, Any, Optional
+
+
+class StubChatModel:
+    """本地桩聊天模型
+
+    调用方式与 DashScopeChatModel 一致（``await model(messages)``），
+    返回包含 ``text`` 键的字典。延迟服从对数正态分布，用于模拟真实模型的响应时间。
+    """
+
+    def __init__(
+        self,
+        reply: str = "这是桩模型生成的回答。",
+        latency_median: float = 0.0,
+        latency_sigma: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.reply = reply
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.model_name = "stub"
+        self.stream = False
+        self.call_count = 0
+        self._random = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """采样一次调用延迟（秒）"""
+        if self.latency_median <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency_median
+        return self.latency_median * self._random.lognormvariate(0, self.latency_sigma)
+
+    async def __call__(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """模拟一次模型调用"""
+        self.call_count += 1
+        latency = self.sample_latency()
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return {"text": self.reply}
@@ -1,42 +1,263 @@
-"""向量存储工具类"""
-import chromadb
-from chromadb.config import Settings
-from typing import List, Dict, Any
+"""向量存储工具类
+
+开启文档级索引（``doc_index``）时，另有一个 ``<collection_name>_docs`` 集合为每个来源保存一个摘要向量
+（该来源所有块嵌入的归一化均值），在导入同步时更新。
+检索分两阶段：先在文档级索引中选出最相关的 ``top_documents`` 个来源，再按 ``source`` 分页取出这些来源的块嵌入，
+在本地按余弦相似度精确排序（Chroma 限定范围的向量查询在候选集较小时反而很慢）。
+
+按ID读取都分页进行：Chroma 单次查询的ID数受SQLite变量数限制（约3.2万个）。
+"""
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Sequence, Iterable, TYPE_CHECKING
 import uuid
 
+from utils.embedding_service import INTERACTIVE, BULK
+from utils.embeddings import QueryEmbeddingCache
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from processors.chunk import ChunkBatch
+
 
 class VectorStore:
     """向量存储管理类"""
     
-    def __init__(self, persist_directory: str = "./chroma_db", collection_name: str = "documents"):
+    def __init__(self, persist_directory: str = "./chroma_db", collection_name: str = "documents", embedding_function=None,
+                 write_batch_size: int = 512, doc_index: bool = False, top_documents: int = 20, embedding_service=None,
+                 query_cache_size: int = 1024):
         self.persist_directory = persist_directory
         self.collection_name = collection_name
-        self.client = chromadb.PersistentClient(
-            path=persist_directory,
-            settings=Settings(anonymized_telemetry=False)
-        )
-        self.collection = self.client.get_or_create_collection(name=collection_name)
-    
-    def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, ids: List[str] = None):
-        """添加文档到向量存储"""
+        # 为空时使用Chroma默认的嵌入模型
+        self.embedding_function = embedding_function
+        # 每次嵌入和写入的最大块数，大文件分窗口写入，嵌入向量和元数据不会一次全部驻留内存
+        self.write_batch_size = write_batch_size
+        # 文档级索引：检索时先选出最相关的 top_documents 个来源，再在其中检索文档块
+        self.doc_index = doc_index
+        self.top_documents = top_documents
+        # 嵌入服务（EmbeddingService）：设置后查询和写入的嵌入都交给服务线程合并批量计算，查询优先
+        self.embedding_service = embedding_service
+        # 查询嵌入缓存，0 表示不缓存
+        self.query_cache = QueryEmbeddingCache(query_cache_size) if query_cache_size > 0 else None
+        # Chroma客户端和集合在首次使用时才打开
+        self._client = None
+        self._collection = None
+        self._doc_collection = None
+        self._lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """Chroma客户端"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import chromadb
+                    from chromadb.config import Settings
+                    
+                    self._client = chromadb.PersistentClient(
+                        path=self.persist_directory,
+                        settings=Settings(anonymized_telemetry=False)
+                    )
+        return self._client
+    
+    @property
+    def collection(self):
+        """文档集合"""
+        if self._collection is None:
+            client = self.client
+            with self._lock:
+                if self._collection is None:
+                    self._collection = client.get_or_create_collection(
+                        name=self.collection_name,
+                        embedding_function=self.embedding_function
+                    )
+        return self._collection
+    
+    @property
+    def doc_collection(self):
+        """文档级索引集合（每个来源一条）"""
+        if self._doc_collection is None:
+            client = self.client
+            with self._lock:
+                if self._doc_collection is None:
+                    self._doc_collection = client.get_or_create_collection(
+                        name=f"{self.collection_name}_docs",
+                        embedding_function=self.embedding_function
+                    )
+        return self._doc_collection
+    
+    def embed(self, texts: List[str], priority: int = BULK) -> List[List[float]]:
+        """计算文本的嵌入向量（与集合使用同一个嵌入函数），priority 为嵌入服务中的优先级"""
+        if self.embedding_service is not None:
+            with metrics.span("vector_store.embed"):
+                embeddings = self.embedding_service.embed(texts, priority)
+            metrics.inc("vector_store_embedded_texts_total", len(texts))
+            return embeddings
+        if self.embedding_function is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+            
+            self.embedding_function = DefaultEmbeddingFunction()
+        with metrics.span("vector_store.embed"):
+            embeddings = self.embedding_function(texts)
+        metrics.inc("vector_store_embedded_texts_total", len(texts))
+        return embeddings
+    
+    def embed_query(self, query: str):
+        """计算查询的嵌入（先查查询嵌入缓存）"""
+        if self.query_cache is not None:
+            embedding = self.query_cache.get(query)
+            if embedding is not None:
+                metrics.inc("vector_store_query_cache_hits_total")
+                return embedding
+            metrics.inc("vector_store_query_cache_misses_total")
+        embedding = self.embed([query], INTERACTIVE)[0]
+        if self.query_cache is not None:
+            self.query_cache.put(query, embedding)
+        return embedding
+    
+    def warmup(self, questions: Optional[List[str]] = None) -> Dict[str, Any]:
+        """预热：加载嵌入模型、打开集合并执行一次查询（Chroma在首次查询时把HNSW索引载入内存），
+        再把常见问题的嵌入预先计算放入查询缓存，返回各阶段耗时"""
+        report = {}
+        start = time.perf_counter()
+        probe = self.embed(["warmup"], INTERACTIVE)
+        report["model_seconds"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        if self.collection.count():
+            self.collection.query(query_embeddings=probe, n_results=1)
+        if self.doc_index and self.doc_collection.count():
+            self.doc_collection.query(query_embeddings=probe, n_results=1)
+        report["index_seconds"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        questions = [question for question in questions or [] if question.strip()]
+        if questions and self.query_cache is not None:
+            for offset in range(0, len(questions), self.write_batch_size):
+                window = questions[offset:offset + self.write_batch_size]
+                for question, embedding in zip(window, self.embed(window, BULK)):
+                    self.query_cache.put(question, embedding)
+        report["questions"] = len(questions) if self.query_cache is not None else 0
+        report["questions_seconds"] = time.perf_counter() - start
+        return report
+    
+    def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, ids: List[str] = None, embeddings=None,
+                      upsert: bool = False):
+        """添加文档到向量存储，embeddings 为空时使用集合的嵌入函数计算；upsert 为真时覆盖同ID的文档块"""
         if ids is None:
             ids = [str(uuid.uuid4()) for _ in texts]
         
         if metadatas is None:
             metadatas = [{"source": "unknown"} for _ in texts]
         
-        self.collection.add(
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids
-        )
+        for start in range(0, len(texts), self.write_batch_size):
+            end = start + self.write_batch_size
+            self._write(texts[start:end], metadatas[start:end], ids[start:end],
+                        embeddings[start:end] if embeddings is not None else None, upsert)
+    
+    def add_chunks(self, chunks: "ChunkBatch", positions: Optional[Sequence[int]] = None,
+                   extra_metadata: Optional[Dict[str, Any]] = None, upsert: bool = True):
+        """写入文档块批次中指定位置（默认全部）的块，文本、ID和元数据按窗口取出，不复制整个批次"""
+        if positions is None:
+            positions = range(len(chunks))
+        
+        for start in range(0, len(positions), self.write_batch_size):
+            window = positions[start:start + self.write_batch_size]
+            metadatas = chunks.metadatas(window)
+            if extra_metadata:
+                for metadata in metadatas:
+                    metadata.update(extra_metadata)
+            self._write([chunks.texts[i] for i in window], metadatas, [chunks.ids[i] for i in window], None, upsert)
     
-    def search(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """搜索相关文档"""
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+    def _write(self, texts: List[str], metadatas: List[Dict[str, Any]], ids: List[str], embeddings, upsert: bool):
+        # 显式计算嵌入，使嵌入和写入两个阶段可以分别计时
+        if embeddings is None and texts:
+            embeddings = self.embed(texts)
+        
+        with metrics.span("vector_store.add"):
+            write = self.collection.upsert if upsert else self.collection.add
+            write(
+                documents=texts,
+                metadatas=metadatas,
+                ids=ids,
+                embeddings=embeddings
+            )
+        metrics.inc("vector_store_added_chunks_total", len(texts))
+    
+    def sync_source(self, chunks: "ChunkBatch") -> Dict[str, int]:
+        """按文档块ID增量同步一个来源：只嵌入和写入新的块，删除已消失的块，保留的块只更新元数据
+
+        文档块ID由内容哈希生成时，文件局部修改后只有变化的块需要重新嵌入。
+        先写入新块再删除旧块，同步过程中的检索不会出现该来源的内容空缺。
+        """
+        with metrics.span("vector_store.sync"):
+            plan = self.plan_sync(chunks)
+            if plan["new"]:
+                self.add_chunks(chunks, plan["new"])
+            return self.finish_sync(chunks, plan)
+    
+    def plan_sync(self, chunks: "ChunkBatch") -> Dict[str, list]:
+        """同步的读取阶段：返回需要写入的新块位置（new）、只需更新元数据的块位置（moved）和已消失的块ID（stale）"""
+        ids = chunks.ids
+        existing_metadatas = {}
+        for page in self._pages(where={"source": chunks.source}, include=["metadatas"]):
+            existing_metadatas.update(zip(page["ids"], page["metadatas"]))
+        
+        new_positions = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_metadatas]
+        # 内容未变的块位置可能移动，只更新元数据（不重新嵌入）
+        moved = [
+            i for i, chunk_id in enumerate(ids)
+            if chunk_id in existing_metadatas and existing_metadatas[chunk_id] != chunks.metadata(i)
+        ]
+        current = set(ids)
+        stale = [chunk_id for chunk_id in existing_metadatas if chunk_id not in current]
+        return {"new": new_positions, "moved": moved, "stale": stale}
+    
+    def finish_sync(self, chunks: "ChunkBatch", plan: Dict[str, list]) -> Dict[str, int]:
+        """同步的收尾阶段（新块写入之后执行）：更新移动块的元数据，删除已消失的块，更新文档级向量"""
+        ids = chunks.ids
+        moved, stale = plan["moved"], plan["stale"]
+        for start in range(0, len(moved), self.write_batch_size):
+            window = moved[start:start + self.write_batch_size]
+            self.collection.update(ids=[ids[i] for i in window], metadatas=chunks.metadatas(window))
+        
+        for start in range(0, len(stale), self.write_batch_size):
+            self.collection.delete(ids=stale[start:start + self.write_batch_size])
+        
+        if self.doc_index and (plan["new"] or stale):
+            self._update_doc_vector(chunks.source, ids)
+        
+        return self.sync_stats(chunks, plan)
+    
+    @staticmethod
+    def sync_stats(chunks: "ChunkBatch", plan: Dict[str, list]) -> Dict[str, int]:
+        """同步的统计（不访问集合，没有需要更新或删除的块时收尾阶段只需要这一步）"""
+        added = len(plan["new"])
+        metrics.inc("vector_store_reused_chunks_total", len(chunks.ids) - added)
+        return {"added": added, "kept": len(chunks.ids) - added, "deleted": len(plan["stale"])}
+    
+    def search(self, query: str, n_results: int = 5, top_documents: Optional[int] = None) -> List[Dict[str, Any]]:
+        """搜索相关文档（查询嵌入和向量检索分别计时）
+
+        开启文档级索引时先选出 top_documents 个来源（为空时使用配置值，0 表示直接检索全部文档块）。
+        """
+        if top_documents is None:
+            top_documents = self.top_documents if self.doc_index else 0
+        
+        with metrics.span("vector_store.search"):
+            query_embeddings = [self.embed_query(query)]
+            candidates = None
+            if top_documents:
+                candidates = self._select_documents(query_embeddings, top_documents)
+            with metrics.span("vector_store.query"):
+                if candidates is not None:
+                    return self._search_within(query_embeddings[0], candidates, n_results)
+                results = self.collection.query(
+                    query_embeddings=query_embeddings,
+                    n_results=n_results
+                )
         
         return [
             {
@@ -51,13 +272,204 @@ class VectorStore:
             )
         ]
     
+    def _select_documents(self, query_embeddings, top_documents: int) -> Optional[List[str]]:
+        """粗检索：返回最相关的来源；文档数不超过 top_documents（限定范围没有意义）或索引为空时返回 None"""
+        with metrics.span("vector_store.coarse"):
+            results = self.doc_collection.query(
+                query_embeddings=query_embeddings,
+                n_results=top_documents,
+                include=["metadatas"]
+            )
+        metadatas = results["metadatas"][0]
+        if len(metadatas) < top_documents:
+            return None
+        return [metadata["source"] for metadata in metadatas]
+    
+    def _search_within(self, query_embedding, sources: List[str], n_results: int) -> List[Dict[str, Any]]:
+        """细检索：分页取出候选来源的块嵌入，按余弦相似度排序后只读取前 n_results 个块的内容"""
+        import numpy as np
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query) + 1e-12
+        ids, scores = [], []
+        for page in self._pages(where={"source": {"$in": sources}}, include=["embeddings"]):
+            matrix = np.asarray(page["embeddings"], dtype=np.float32)
+            ids.extend(page["ids"])
+            scores.append(matrix @ query / (np.linalg.norm(matrix, axis=1) * query_norm))
+        if not ids:
+            return []
+        top = np.argsort(-np.concatenate(scores))[:n_results]
+        top_ids = [ids[i] for i in top]
+        
+        details = self.collection.get(ids=top_ids, include=["documents", "metadatas"])
+        by_id = {
+            doc_id: (doc, meta)
+            for doc_id, doc, meta in zip(details["ids"], details["documents"], details["metadatas"])
+        }
+        return [
+            {"content": by_id[doc_id][0], "metadata": by_id[doc_id][1], "id": doc_id}
+            for doc_id in top_ids if doc_id in by_id
+        ]
+    
+    @staticmethod
+    def _doc_id(source: str) -> str:
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _doc_vector(embeddings):
+        import numpy as np
+        
+        vector = np.asarray(embeddings, dtype=np.float32).mean(axis=0)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+    
+    def refresh_doc_vectors(self, sources: Iterable[str]):
+        """按来源当前的文档块重新计算文档向量，来源已没有文档块时从文档级索引中删除"""
+        if not self.doc_index:
+            return
+        for source in sources:
+            ids = [chunk_id for page in self._pages(where={"source": source}) for chunk_id in page["ids"]]
+            self._update_doc_vector(source, ids)
+    
+    def _update_doc_vector(self, source: str, chunk_ids: List[str]):
+        """按块ID分页读取嵌入并更新来源的文档向量（按ID读取比按 source 过滤快得多）"""
+        import numpy as np
+        
+        doc_id = self._doc_id(source)
+        with metrics.span("vector_store.doc_index"):
+            if not chunk_ids:
+                self.doc_collection.delete(ids=[doc_id])
+                return
+            total = None
+            for start in range(0, len(chunk_ids), self.write_batch_size):
+                existing = self.collection.get(ids=chunk_ids[start:start + self.write_batch_size], include=["embeddings"])
+                if len(existing["ids"]):
+                    page_sum = np.asarray(existing["embeddings"], dtype=np.float32).sum(axis=0)
+                    total = page_sum if total is None else total + page_sum
+            if total is None:
+                self.doc_collection.delete(ids=[doc_id])
+                return
+            self.doc_collection.upsert(
+                ids=[doc_id],
+                embeddings=[self._doc_vector([total])],
+                metadatas=[{"source": source, "chunks": len(chunk_ids)}],
+                documents=[source]
+            )
+    
+    def rebuild_doc_index(self, page_size: int = 5000) -> int:
+        """从全部文档块重建文档级索引（开启文档级索引前已有数据时使用），返回文档数"""
+        import numpy as np
+        
+        sums, counts = {}, {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas", "embeddings"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for metadata, embedding in zip(page["metadatas"], page["embeddings"]):
+                source = metadata.get("source", "unknown")
+                if source in sums:
+                    sums[source] += embedding
+                    counts[source] += 1
+                else:
+                    sums[source] = np.array(embedding, dtype=np.float32)
+                    counts[source] = 1
+            offset += len(page["ids"])
+        
+        self._drop_doc_collection()
+        sources = list(sums)
+        for start in range(0, len(sources), self.write_batch_size):
+            window = sources[start:start + self.write_batch_size]
+            self.doc_collection.add(
+                ids=[self._doc_id(source) for source in window],
+                embeddings=[self._doc_vector([sums[source]]) for source in window],
+                metadatas=[{"source": source, "chunks": counts[source]} for source in window],
+                documents=window
+            )
+        return len(sources)
+    
+    def delete_by_source(self, source: str) -> int:
+        """删除指定来源的所有文档块，返回删除数量"""
+        with metrics.span("vector_store.delete"):
+            ids = [chunk_id for page in self._pages(where={"source": source}) for chunk_id in page["ids"]]
+            for start in range(0, len(ids), self.write_batch_size):
+                self.collection.delete(ids=ids[start:start + self.write_batch_size])
+            if self.doc_index:
+                self._update_doc_vector(source, [])
+        metrics.inc("vector_store_deleted_chunks_total", len(ids))
+        return len(ids)
+    
+    def get_sources(self, where: Optional[Dict[str, Any]] = None) -> List[str]:
+        """返回元数据满足条件的文档块的来源（去重，如某个压缩包的所有成员），where 为空时返回所有来源"""
+        sources = set()
+        for page in self._pages(where=where, include=["metadatas"]):
+            sources.update(metadata["source"] for metadata in page["metadatas"] if metadata and "source" in metadata)
+        return sorted(sources)
+    
+    def _pages(self, where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None):
+        """按条件分页读取文档块（单次读取的结果数受SQLite变量数限制，不能一次取出大来源的全部块）"""
+        offset = 0
+        while True:
+            page = self.collection.get(where=where, include=include or [], limit=self.write_batch_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page
+            offset += len(page["ids"])
+    
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """更新文档块的元数据（合并字段，不重新嵌入）"""
+        with metrics.span("vector_store.update"):
+            self.collection.update(ids=ids, metadatas=metadatas)
+    
+    def delete_ids(self, ids: List[str]):
+        """按ID删除文档块"""
+        with metrics.span("vector_store.delete"):
+            for start in range(0, len(ids), self.write_batch_size):
+                self.collection.delete(ids=ids[start:start + self.write_batch_size])
+        metrics.inc("vector_store_deleted_chunks_total", len(ids))
+    
+    @contextmanager
+    def writing(self):
+        """由多次调用组成的写入操作（如去重同步）；在索引世代（IndexGenerations）上保证整体不跨越世代切换，这里不需要额外处理"""
+        yield
+    
+    def export_snapshot(self, path: str, base: Optional[str] = None) -> Dict[str, Any]:
+        """导出集合为快照目录；指定 base 时导出相对基准快照的增量快照"""
+        from utils.snapshot import export_snapshot
+        
+        return export_snapshot(self, path, base)
+    
+    def import_snapshot(self, path: str, verify: bool = True) -> Dict[str, Any]:
+        """从快照导入（嵌入直接来自快照，不重新计算），已应用过基准快照时只应用增量"""
+        from utils.snapshot import import_snapshot
+        
+        return import_snapshot(self, path, verify)
+    
     def delete_collection(self):
-        """删除集合"""
+        """删除集合（包括文档级索引）"""
         self.client.delete_collection(name=self.collection_name)
+        self._collection = None
+        if self.doc_index:
+            self._drop_doc_collection()
+    
+    def _drop_doc_collection(self):
+        try:
+            self.client.delete_collection(name=f"{self.collection_name}_docs")
+        except Exception:
+            # 文档级索引集合还未创建
+            pass
+        self._doc_collection = None
+    
+    def get_collection_id(self) -> str:
+        """集合的唯一ID，集合被删除重建后会变化"""
+        return str(self.collection.id)
     
     def get_collection_info(self) -> Dict[str, Any]:
         """获取集合信息"""
-        return {
+        info = {
             "count": self.collection.count(),
             "name": self.collection_name
-        }
\ No newline at end of file
+        }
+        if self.doc_index:
+            info["documents"] = self.doc_collection.count()
+        return info
\ No newline at end of file